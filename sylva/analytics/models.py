@@ -1,9 +1,53 @@
 # -*- coding: utf-8 -*-
+import os
+import tempfile
+
+from contextlib import contextmanager
+
 from django.db import models
 from django.utils.translation import gettext as _
 
+from data.counters import (EDGE_CREATED, EDGE_DELETED, NODE_DELETED,
+                           EDGES_RESET)
 from graphs.models import Graph
 
+EDGE_ACTIONS = (
+    (EDGE_CREATED, _("Relationship created")),
+    (EDGE_DELETED, _("Relationship deleted")),
+    (NODE_DELETED, _("Node deleted")),
+    (EDGES_RESET, _("Relationships changed without log")),
+)
+
+
+@contextmanager
+def local_path(field_file):
+    """
+    Context manager with the path of "field_file". For those storages that
+    don't support absolute paths the file is downloaded to a temporary file,
+    removed at the end of the block, since the dumps and the results are
+    mapped into memory and can't be read from an URL
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        yield path
+        return
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        field_file.open("rb")
+        try:
+            for chunk in field_file.chunks():
+                temp_file.write(chunk)
+        finally:
+            field_file.close()
+        temp_file.close()
+        yield temp_file.name
+    finally:
+        temp_file.close()
+        os.remove(temp_file.name)
+
 
 def get_upload_to_analytics(self, filename):
     return u"%s/analytics/%s" % (self.dump.graph.slug, filename)
@@ -21,20 +65,38 @@ class Dump(models.Model):
     data_file = models.FileField(_("data file"), upload_to=get_upload_to_dump,
                                  null=True, blank=True, max_length=255)
     data_hash = models.CharField(_("data hash"), max_length=255)
+    edges = models.IntegerField(_("edges"), null=True, blank=True)
+    # Id of the last change of the log included in the dump, only for the
+    # dumps of the whole graph that can be patched
+    last_change_id = models.IntegerField(_("last change id"), null=True,
+                                         blank=True)
+    subgraph = models.BooleanField(_("subgraph"), default=False)
 
     class Meta:
         get_latest_by = "creation_date"
 
     def get_data_file_path(self):
         """
-        Returns self.data_file.path or download the file for those storages
-        that don't support absolute paths and return a temporary file path
+        Context manager with self.data_file.path, or the path of a temporary
+        copy for those storages that don't support absolute paths
         """
-        try:
-            data_file_path = self.data_file.path
-        except NotImplementedError:
-            data_file_path = self.data_file.url
-        return data_file_path
+        return local_path(self.data_file)
+
+
+class EdgeChange(models.Model):
+    """
+    Log of the changes of the relationships of a graph since its last dump,
+    so the dump can be patched instead of written again.
+    "element_id" is the id of the relationship, or of the node deleted.
+    """
+    graph = models.ForeignKey(Graph, verbose_name=_("graph"),
+                              related_name='edge_changes')
+    action = models.CharField(_("action"), max_length=1,
+                              choices=EDGE_ACTIONS)
+    element_id = models.BigIntegerField(_("element id"), null=True,
+                                        blank=True)
+    source_id = models.BigIntegerField(_("source id"), null=True, blank=True)
+    target_id = models.BigIntegerField(_("target id"), null=True, blank=True)
 
 
 class Analytic(models.Model):
@@ -66,14 +128,10 @@ class Analytic(models.Model):
 
     def get_raw_path(self):
         """
-        Returns self.raw.path or download the file for those storages
-        that don't support absolute paths and return a temporary file path
+        Context manager with self.raw.path, or the path of a temporary copy
+        for those storages that don't support absolute paths
         """
-        try:
-            raw_path = self.raw.path
-        except NotImplementedError:
-            raw_path = self.raw.url
-        return raw_path
+        return local_path(self.raw)
 
 
 class AnalysisManager(models.Manager):
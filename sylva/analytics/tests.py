@@ -4,9 +4,13 @@ when you run "manage.py test".
 
 Replace this with more appropriate tests for your application.
 """
+import tempfile
 
 from django.test import TestCase
 
+from engines.gdb.analysis import sparse
+from engines.gdb.analysis.results import AnalyticResults, write_results
+
 
 class SimpleTest(TestCase):
     def test_basic_addition(self):
@@ -14,3 +18,112 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class SparseAnalysisTest(TestCase):
+    """
+    A set of tests for the algorithms over CSR adjacency matrices.
+    """
+
+    def setUp(self):
+        # A triangle with a tail, and a separated edge
+        self.edges = sparse.EdgeList([1, 2, 3, 3, 5], [2, 3, 1, 4, 6])
+
+    def test_edge_list(self):
+        self.assertEqual(list(self.edges.node_ids), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.edges.undirected().nnz, 10)
+
+    def test_dump(self):
+        relationships = [(11, 1, 2), (12, 2, 3), (13, 3, 1), (14, 3, 4),
+                         (15, 5, 6)]
+        with tempfile.NamedTemporaryFile() as dump_file:
+            data_hash, count = sparse.write_dump(iter(relationships),
+                                                 dump_file)
+            edges = sparse.EdgeList.load(dump_file.name)
+            self.assertEqual(count, 5)
+            self.assertEqual(list(edges.node_ids), list(self.edges.node_ids))
+            self.assertEqual(list(edges.sources), list(self.edges.sources))
+            self.assertEqual(list(edges.targets), list(self.edges.targets))
+            self.assertEqual(list(edges.relationship_ids),
+                             [11, 12, 13, 14, 15])
+        with tempfile.NamedTemporaryFile() as dump_file:
+            other_hash, count = sparse.write_dump(iter(relationships),
+                                                  dump_file,
+                                                  node_ids=[1, 2, 3])
+            edges = sparse.EdgeList.load(dump_file.name)
+            self.assertEqual(list(edges.node_ids), [1, 2, 3])
+            self.assertEqual(count, 3)
+        self.assertNotEqual(data_hash, other_hash)
+
+    def test_patch_dump(self):
+        with tempfile.NamedTemporaryFile() as dump_file:
+            sparse.write_dump([(11, 1, 2), (12, 2, 3), (13, 3, 1),
+                               (14, 3, 4), (15, 5, 6)], dump_file)
+            edges = sparse.EdgeList.load(dump_file.name)
+        with tempfile.NamedTemporaryFile() as dump_file:
+            data_hash, count = sparse.patch_dump(
+                edges, {14: (4, 2), 16: (4, 1)}, set([12]), set([5]),
+                dump_file)
+            edges = sparse.EdgeList.load(dump_file.name)
+            patched = sorted(zip(edges.relationship_ids.tolist(),
+                                 edges.node_ids[edges.sources].tolist(),
+                                 edges.node_ids[edges.targets].tolist()))
+        self.assertEqual(count, 4)
+        self.assertEqual(patched,
+                         [(11, 1, 2), (13, 3, 1), (14, 4, 2), (16, 4, 1)])
+        # The checksum doesn't depend on the order of the edges
+        with tempfile.NamedTemporaryFile() as dump_file:
+            written_hash, count = sparse.write_dump(reversed(patched),
+                                                    dump_file)
+        self.assertEqual(data_hash, written_hash)
+
+    def test_connected_components(self):
+        self.assertEqual(list(sparse.connected_components(self.edges)),
+                         [1, 1, 1, 1, 5, 5])
+
+    def test_kcore(self):
+        self.assertEqual(list(sparse.kcore(self.edges)), [2, 2, 2, 1, 1, 1])
+
+    def test_triangle_counting(self):
+        self.assertEqual(list(sparse.triangle_counting(self.edges)),
+                         [1, 1, 1, 0, 0, 0])
+
+    def test_graph_coloring(self):
+        colors = sparse.graph_coloring(self.edges)
+        for source, target in zip(self.edges.sources, self.edges.targets):
+            self.assertNotEqual(colors[source], colors[target])
+
+    def test_pagerank(self):
+        values = sparse.pagerank(self.edges, tolerance=1e-9)
+        self.assertAlmostEqual(values[4], 0.15)
+        self.assertAlmostEqual(values[5], 0.15 + 0.85 * 0.15)
+        self.assertAlmostEqual(values[3], 0.15 + 0.85 * values[2] / 2)
+
+    def test_betweenness_centrality(self):
+        values = sparse.betweenness_centrality(self.edges)
+        for value, expected in zip(values, [0.05, 0.1, 0.15, 0, 0, 0]):
+            self.assertAlmostEqual(value, expected)
+        self.assertEqual(sparse.betweenness_samples(6), 6)
+        self.assertLess(sparse.betweenness_samples(10 ** 6), 10 ** 6)
+
+    def test_results(self):
+        with tempfile.NamedTemporaryFile() as results_file:
+            write_results([1, 2, 3, 4, 5, 6],
+                          [2, 1, 3, 1, 0.5, float("inf")], results_file)
+            results = AnalyticResults(results_file.name)
+            self.assertEqual(results.value(4), 1)
+            self.assertIsNone(results.value(7))
+            self.assertEqual(list(results.top(2)),
+                             [(6, float("inf")), (3, 3)])
+            self.assertEqual(results.in_range(1, 2), [2, 4, 1])
+            self.assertEqual(results.in_bin(1), [2, 4])
+            self.assertEqual(results.in_bin(1.5), [])
+            self.assertEqual([count for low, high, count
+                              in results.histogram()], [1, 2, 1, 1, 1])
+        with tempfile.NamedTemporaryFile() as results_file:
+            write_results(range(1000), range(1000), results_file)
+            results = AnalyticResults(results_file.name)
+            counts = [count for low, high, count in results.histogram()]
+            self.assertEqual(len(counts), 100)
+            self.assertEqual(sum(counts), 1000)
+            self.assertEqual(len(results.in_bin(0)), counts[0])
@@ -23,6 +23,14 @@ urlpatterns = patterns(
     url(r'^(?P<graph_slug>[\w-]+)/analytic/$',
         'analytics_analytic', name="analytics_analytic"),
 
+    # Get the histogram of the results of an analytic
+    url(r'^(?P<graph_slug>[\w-]+)/histogram/$',
+        'analytics_histogram', name="analytics_histogram"),
+
+    # Look up the nodes and values of the results of an analytic
+    url(r'^(?P<graph_slug>[\w-]+)/values/$',
+        'analytics_values', name="analytics_values"),
+
     # Get the list of nodes or relationships of a specific dump
     url(r'^(?P<graph_slug>[\w-]+)/dump/$',
         'analytics_dump', name="analytics_dump"),
@@ -4,17 +4,20 @@ try:
 except ImportError:
     import json  # NOQA
 
-import csv
+import math
 from celery.result import AsyncResult
 from sylva.celery import app
 
 from django.conf import settings
+from django.core.urlresolvers import reverse
 from django.shortcuts import get_object_or_404, HttpResponse
-from django.http import StreamingHttpResponse
+from django.http import Http404, StreamingHttpResponse
 
 from guardian.decorators import permission_required
 
 from analytics.models import Analytic
+from engines.gdb.analysis.results import AnalyticResults
+from engines.gdb.analysis.sparse import DUMP_CHUNK_SIZE, EdgeList
 from sylva.decorators import is_enabled
 from graphs.models import Graph, Data
 
@@ -77,12 +80,13 @@ def analytics_status(request, graph_slug):
                     analytic = Analytic.objects.filter(
                         dump__graph__slug=graph_slug,
                         task_id=task_id).latest()
+                    results_url, values_url = _get_results_urls(analytic)
                     analytics_results[task_id] = [STATUS_OK,
-                                                  analytic.results.url,
+                                                  results_url,
                                                   analytic.id,
                                                   analytic.task_start,
                                                   analytic.algorithm,
-                                                  analytic.values.url]
+                                                  values_url]
                 except ValueError:
                     analytics_results[task_id] = [REVOKED]
             elif task.status == REVOKED:
@@ -100,7 +104,90 @@ def analytics_analytic(request, graph_slug):
     analytic_id = request.GET.get('id')
     if request.is_ajax() and analytic_id is not None:
         analytic = Analytic.objects.get(pk=analytic_id)
-        data = [analytic.results.url, analytic.algorithm, analytic.values.url]
+        results_url, values_url = _get_results_urls(analytic)
+        data = [results_url, analytic.algorithm, values_url]
+    json_data = json.dumps(data)
+    return HttpResponse(json_data, content_type='application/json')
+
+
+def _get_results_urls(analytic):
+    graph_slug = analytic.dump.graph.slug
+    query = "?id={0}".format(analytic.id)
+    return (reverse("analytics_histogram", args=[graph_slug]) + query,
+            reverse("analytics_values", args=[graph_slug]) + query)
+
+
+def _format_value(value):
+    # The same keys the charts got when the values were saved as strings
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _json_value(value):
+    # Infinite distances are not valid JSON
+    if value is None or math.isinf(value) or math.isnan(value):
+        return None
+    return value
+
+
+@is_enabled(settings.ENABLE_ANALYTICS)
+@permission_required("graphs.view_graph_analytics",
+                     (Graph, "slug", "graph_slug"), return_403=True)
+def analytics_histogram(request, graph_slug):
+    analytic = get_object_or_404(Analytic, pk=request.GET.get('id'),
+                                 dump__graph__slug=graph_slug)
+    if analytic.results:
+        # Analytics saved before the results were binary
+        return HttpResponse(analytic.results.read(),
+                            content_type='application/json')
+    with analytic.get_raw_path() as raw_path:
+        results = AnalyticResults(raw_path)
+        data = dict((_format_value(low), count)
+                    for low, high, count in results.histogram())
+    json_data = json.dumps(data)
+    return HttpResponse(json_data, content_type='application/json')
+
+
+def _lookup_results(results, params):
+    if 'value' in params:
+        return results.in_bin(float(params['value']))
+    elif 'min' in params and 'max' in params:
+        return results.in_range(float(params['min']), float(params['max']))
+    elif 'top' in params:
+        return [(node_id, _json_value(value))
+                for node_id, value in results.top(int(params['top']))]
+    elif 'node' in params:
+        return _json_value(results.value(int(params['node'])))
+    raise ValueError
+
+
+@is_enabled(settings.ENABLE_ANALYTICS)
+@permission_required("graphs.view_graph_analytics",
+                     (Graph, "slug", "graph_slug"), return_403=True)
+def analytics_values(request, graph_slug):
+    """
+    Look up the results of an analytic: the ids of the nodes in the bin of
+    the histogram of "value", in the range from "min" to "max", the "top"
+    nodes with their values, or the value of the node "node".
+    """
+    analytic = get_object_or_404(Analytic, pk=request.GET.get('id'),
+                                 dump__graph__slug=graph_slug)
+    try:
+        if analytic.values:
+            # Analytics saved before the results were binary
+            value = float(request.GET['value'])
+            values = json.loads(analytic.values.read())
+            data = []
+            for key, node_ids in values.items():
+                if float(key) == value:
+                    data = node_ids
+        else:
+            with analytic.get_raw_path() as raw_path:
+                data = _lookup_results(AnalyticResults(raw_path),
+                                       request.GET)
+    except (KeyError, ValueError):
+        raise Http404
     json_data = json.dumps(data)
     return HttpResponse(json_data, content_type='application/json')
 
@@ -111,39 +198,32 @@ def analytics_analytic(request, graph_slug):
                      (Graph, "slug", "graph_slug"), return_403=True)
 def analytics_dump(request, graph_slug):
 
-    def stream_response_generator(data_file, rels=False, duplicated=False,
-                                  headers=False):
-        stream_reader = csv.reader(data_file.file, delimiter=",")
-        if rels is True:
-            if headers is False:
-                # We take the headers for eliminate them of the returned value
-                headers_element = stream_reader.next()
-            for row in stream_reader:
-                yield json.dumps(row)
-        else:
-            # We take the headers for eliminate them of the returned value
-            headers = stream_reader.next()
-            if duplicated:
-                for row in stream_reader:
-                    for col in row:
-                        yield 'data: ' + json.dumps(col) + '\n\n'
+    def stream_response_generator(dump, rels=False):
+        # The local copy of the dump is kept until the stream ends
+        with dump.get_data_file_path() as dump_path:
+            edges = EdgeList.load(dump_path)
+            # Only a chunk of the mapped arrays is read at a time
+            if rels is True:
+                for start in range(0, len(edges.sources), DUMP_CHUNK_SIZE):
+                    chunk = slice(start, start + DUMP_CHUNK_SIZE)
+                    sources = edges.node_ids[edges.sources[chunk]].tolist()
+                    targets = edges.node_ids[edges.targets[chunk]].tolist()
+                    for source_id, target_id in zip(sources, targets):
+                        yield json.dumps([str(source_id), str(target_id)])
             else:
-                nodes = set()
-                for row in stream_reader:
-                    for col in row:
-                        if col not in nodes:
-                            yield 'data: ' + json.dumps(col) + '\n\n'
-                            nodes.add(col)
+                # The ids of the nodes are already unique in the dumps
+                for start in range(0, edges.size, DUMP_CHUNK_SIZE):
+                    node_ids = edges.node_ids[start:start + DUMP_CHUNK_SIZE]
+                    for node_id in node_ids.tolist():
+                        yield 'data: ' + json.dumps(str(node_id)) + '\n\n'
         yield 'data: "close"\n\n'
 
     analytic_id = request.GET.get('id')
     rels = bool(request.GET.get('rels'))
     if analytic_id is not None:
         analytic = Analytic.objects.get(pk=analytic_id)
-        analytic_dump = analytic.dump
-        data_file = analytic_dump.data_file
         return StreamingHttpResponse(stream_response_generator(
-            data_file, rels), content_type='text/event-stream')
+            analytic.dump, rels), content_type='text/event-stream')
     else:
         return StreamingHttpResponse([], content_type='text/event-stream')
 
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from schemas.models import NodeType, RelationshipType
+
+# Actions of the log of changes of the relationships
+EDGE_CREATED = "c"
+EDGE_DELETED = "d"
+NODE_DELETED = "n"
+EDGES_RESET = "r"
+
+
+class Counters(object):
+    """
+    Changes in the number of nodes and relationships of the graph of "data",
+    and of its types, added up in memory and written at once by flush() as
+    F() expressions, so concurrent writers don't overwrite their totals.
+    Out of a batch() the changes are flushed as soon as they are added.
+    The totals can be reconciled with the graph database by the command
+    sync_graphs_totals.
+    If the analytics are enabled, the relationships created and deleted
+    are logged as well, to patch the dumps of the graph.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._batches = 0
+        self._reset()
+
+    def _reset(self):
+        self.nodes = 0
+        self.relationships = 0
+        self.types = {}
+        self.nodes_modified = None
+        self.relationships_modified = None
+        self.edge_changes = []
+
+    def add_nodes(self, count=1, label=None):
+        self.nodes += count
+        if label is not None:
+            self._add_type(NodeType, label, count)
+        self.touch_nodes()
+
+    def add_relationships(self, count=1, label=None):
+        self.relationships += count
+        if label is not None:
+            self._add_type(RelationshipType, label, count)
+        self.touch_relationships()
+
+    def log_created_relationships(self, relationships):
+        """
+        Log the tuples of "relationships" with the ids of the relationship,
+        its source and its target, to be written with the next flush.
+        """
+        self._log_edges((EDGE_CREATED, relationship_id, source_id, target_id)
+                        for relationship_id, source_id, target_id
+                        in relationships)
+
+    def log_deleted_relationships(self, ids):
+        self._log_edges((EDGE_DELETED, relationship_id, None, None)
+                        for relationship_id in ids)
+
+    def log_deleted_nodes(self, ids):
+        # The relationships of the nodes are deleted with them
+        self._log_edges((NODE_DELETED, node_id, None, None)
+                        for node_id in ids)
+
+    def log_reset_relationships(self):
+        """
+        Log that the relationships changed in a way that can't be logged,
+        so the next dump has to be written from scratch. Out of a batch()
+        it is written at once, since no other change may flush it.
+        """
+        self._log_edges([(EDGES_RESET, None, None, None)])
+        self._flush_out_of_batch()
+
+    def _log_edges(self, changes):
+        if settings.ENABLE_ANALYTICS:
+            self.edge_changes.extend(changes)
+
+    def touch_nodes(self):
+        self.nodes_modified = datetime.now()
+        self._flush_out_of_batch()
+
+    def touch_relationships(self):
+        self.relationships_modified = datetime.now()
+        self._flush_out_of_batch()
+
+    def _add_type(self, model, label, count):
+        key = (model, int(label))
+        self.types[key] = self.types.get(key, 0) + count
+
+    def _flush_out_of_batch(self):
+        if not self._batches:
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """
+        Keep the changes in memory until the end of the block.
+        """
+        self._batches += 1
+        try:
+            yield self
+        finally:
+            self._batches -= 1
+            self._flush_out_of_batch()
+
+    def flush(self):
+        data = self.data
+        updates = {}
+        if self.nodes:
+            updates["total_nodes"] = F("total_nodes") + self.nodes
+        if self.relationships:
+            updates["total_relationships"] = (F("total_relationships")
+                                              + self.relationships)
+        if self.nodes_modified:
+            updates["last_modified_nodes"] = self.nodes_modified
+        if self.relationships_modified:
+            updates["last_modified_relationships"] = \
+                self.relationships_modified
+        if not updates and not self.types and not self.edge_changes:
+            return
+        # The analytics import the graphs, which use the counters
+        from analytics.models import EdgeChange
+        modified = [date for date in (self.nodes_modified,
+                                      self.relationships_modified)
+                    if date is not None]
+        last_modified = max(modified) if modified else None
+        with transaction.atomic():
+            for (model, pk), count in self.types.items():
+                if count:
+                    model.objects.filter(pk=pk).update(
+                        total=F("total") + count)
+            if updates:
+                type(data).objects.filter(pk=data.pk).update(**updates)
+            if self.edge_changes:
+                EdgeChange.objects.bulk_create([
+                    EdgeChange(graph=data.graph, action=action,
+                               element_id=element_id, source_id=source_id,
+                               target_id=target_id)
+                    for action, element_id, source_id, target_id
+                    in self.edge_changes])
+            if last_modified:
+                graph = data.graph
+                type(graph).objects.filter(
+                    Q(last_modified__isnull=True)
+                    | Q(last_modified__lt=last_modified),
+                    pk=graph.pk).update(last_modified=last_modified)
+                if (graph.last_modified is None
+                        or graph.last_modified < last_modified):
+                    graph.last_modified = last_modified
+        # The instance is kept close to the database for later checks
+        data.total_nodes += self.nodes
+        data.total_relationships += self.relationships
+        if self.nodes_modified:
+            data.last_modified_nodes = self.nodes_modified
+        if self.relationships_modified:
+            data.last_modified_relationships = self.relationships_modified
+        self._reset()
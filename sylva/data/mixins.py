@@ -2,6 +2,7 @@
 from django.core.exceptions import ObjectDoesNotExist
 
 from accounts.models import Account
+from data.counters import Counters
 from engines.gdb.utils import get_gdb
 
 
@@ -10,6 +11,7 @@ class DataMixin(object):
     def __init__(self, *args, **kwargs):
         super(DataMixin, self).__init__(*args, **kwargs)
         self._gdb = None
+        self._counters = None
 
     def get_gdb(self):
         if not self._gdb:
@@ -25,7 +27,13 @@ class DataMixin(object):
                     self._gdb = get_gdb()
         return self._gdb
 
-    def can_add_nodes(self):
+    def _get_counters(self):
+        if self._counters is None:
+            self._counters = Counters(self)
+        return self._counters
+    counters = property(_get_counters)
+
+    def can_add_nodes(self, count=1):
         user = self.graph.owner
         if user.is_superuser or user.is_staff:
             return True
@@ -34,11 +42,11 @@ class DataMixin(object):
                 profile = user.profile
                 # HACK: Avoid the QuerySet cache
                 account = Account.objects.get(pk=profile.account.id)
-                return (self.total_nodes < account.nodes)
+                return (self.total_nodes + count <= account.nodes)
             except:
                 return False
 
-    def can_add_relationships(self):
+    def can_add_relationships(self, count=1):
         user = self.graph.owner
         if user.is_superuser or user.is_staff:
             return True
@@ -47,6 +55,7 @@ class DataMixin(object):
                 profile = user.profile
                 # HACK: Avoid the QuerySet cache
                 account = Account.objects.get(pk=profile.account.id)
-                return (self.total_relationships < account.relationships)
+                return (self.total_relationships + count
+                        <= account.relationships)
             except:
                 return False
@@ -1,34 +1,28 @@
 # -*- coding: utf-8 -*-
-import json
-import graphlab
 import math
-import networkx as nx
-import os
+import numpy as np
 import pandas as pd
 import tempfile
 import time
 
 from datetime import datetime
-from hashlib import sha1
 
 from django.conf import settings
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files import File
+from django.db.models import Max
 from django.utils.translation import gettext as _
 
 from analytics.models import Dump
+from data.counters import EDGE_CREATED, EDGE_DELETED, NODE_DELETED
 from engines.gdb.analysis import (
     BaseAnalysis, LOAD_FILE, RUN_ALGOS, PROC_FINA
 )
+from engines.gdb.analysis import sparse
+from engines.gdb.analysis.results import write_results
 from graphs.models import Graph
 
 INST_TIME = 1e-04
 
-if (hasattr(settings, "AWS_ACCESS_KEY_ID")
-        and hasattr(settings, "AWS_SECRET_ACCESS_KEY")):
-    graphlab.aws.set_credentials(
-        settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY
-    )
-
 
 class Analysis(BaseAnalysis):
 
@@ -45,64 +39,148 @@ class Analysis(BaseAnalysis):
 
     def get_dump(self, graph_id, subgraph=None):
         """
-        Dump the content of the graph into an edgelist file
+        Dump the content of the graph into an edgelist file. The latest dump
+        of the whole graph is reused if its relationships didn't change, or
+        patched with the log of changes since it was written.
         """
         graph = Graph.objects.get(id=graph_id)
-        lines = "src,dest\n"
-        last_modified_relationships = graph.data.last_modified_relationships
-        if last_modified_relationships is None:
-            dumps = graph.dumps.all()
-        else:
-            dumps = graph.dumps.filter(
-                creation_date__gte=graph.data.last_modified_relationships
-            )
-        # We get the lines, for the sha or for create the dump
-        relationships = graph.relationships.all()
+        creation_date = datetime.now()
         if subgraph:
-            # We treat the subgraph here. Subgraph is a list of ids
-            for relationship in relationships:
-                source_id = relationship.source.id
-                target_id = relationship.target.id
-                if source_id in subgraph and target_id in subgraph:
-                    lines += "{0},{1}\n".format(source_id, target_id)
-        else:
-            for relationship in relationships:
-                lines += "{0},{1}\n".format(relationship.source.id,
-                                            relationship.target.id)
-        # We get the latest dump or we create a new dump
-        lines_hash = sha1(lines).hexdigest()
-        existed_dumps = dumps.filter(data_hash=lines_hash)
-        if dumps.count() == 0 or existed_dumps.count() == 0:
-            # TODO: Write to a temp file instad of in memory
-            timestamp = "{:.0f}".format(time.time() * 1000)
-            dump_file_name = "{0}_dump_{1}.csv".format(graph.slug, timestamp)
-            dump_file = SimpleUploadedFile(dump_file_name, lines,
-                                           "text/csv")
-            data_hash = sha1(lines).hexdigest()
-            dump = Dump.objects.create(graph=graph,
-                                       creation_date=datetime.now(),
-                                       data_file=dump_file,
-                                       data_hash=data_hash)
-            dump.save()
+            return self._get_subgraph_dump(graph, subgraph, creation_date)
+        data = graph.data
+        dumps = graph.dumps.filter(subgraph=False,
+                                   last_change_id__isnull=False)
+        try:
+            dump = dumps.latest()
+        except Dump.DoesNotExist:
+            return self._write_dump(graph, creation_date)
+        last_modified_relationships = data.last_modified_relationships
+        if (dump.edges == data.total_relationships
+                and (last_modified_relationships is None
+                     or dump.creation_date >= last_modified_relationships)):
+            return dump
+        # The changes are replayed in order, so "created" keeps only the
+        # relationships that still exist, and the deletions apply to the
+        # relationships of the dump
+        changes = graph.edge_changes.filter(
+            id__gt=dump.last_change_id
+        ).order_by("id").values_list("id", "action", "element_id",
+                                     "source_id", "target_id")
+        last_change_id = dump.last_change_id
+        created = {}
+        deleted = set()
+        deleted_nodes = set()
+        for change_id, action, element_id, source_id, target_id in changes:
+            last_change_id = change_id
+            if action == EDGE_CREATED:
+                created[element_id] = (source_id, target_id)
+            elif action == EDGE_DELETED:
+                created.pop(element_id, None)
+                deleted.add(element_id)
+            elif action == NODE_DELETED:
+                for relationship_id, endpoints in created.items():
+                    if element_id in endpoints:
+                        del created[relationship_id]
+                deleted_nodes.add(element_id)
+            else:
+                return self._write_dump(graph, creation_date)
+        if last_change_id != dump.last_change_id:
+            with dump.get_data_file_path() as dump_path, \
+                    tempfile.TemporaryFile() as dump_file:
+                dump_edges = sparse.EdgeList.load(dump_path)
+                data_hash, edges = sparse.patch_dump(
+                    dump_edges, created, deleted, deleted_nodes, dump_file)
+                if (data_hash != dump.data_hash
+                        and edges == data.total_relationships):
+                    return self._save_dump(graph, dump_file, data_hash,
+                                           edges, creation_date,
+                                           last_change_id=last_change_id)
         else:
-            dump = existed_dumps.latest()
+            edges = dump.edges
+        # Relationships changed out of the log can't be patched
+        if edges != data.total_relationships:
+            return self._write_dump(graph, creation_date)
+        # Only properties changed, or the changes cancelled each other
+        dump.creation_date = creation_date
+        dump.last_change_id = last_change_id
+        dump.save(update_fields=["creation_date", "last_change_id"])
+        return dump
+
+    def _get_subgraph_dump(self, graph, subgraph, creation_date):
+        last_modified_relationships = graph.data.last_modified_relationships
+        dumps = graph.dumps.filter(subgraph=True)
+        if last_modified_relationships is not None:
+            dumps = dumps.filter(
+                creation_date__gte=last_modified_relationships
+            )
+        # The edges are written to a temp file, for the hash or for the dump
+        relationships = graph.gdb.get_relationships_endpoints()
+        with tempfile.TemporaryFile() as dump_file:
+            data_hash, edges = sparse.write_dump(relationships, dump_file,
+                                                 subgraph)
+            # We get the latest dump or we create a new dump
+            existed_dumps = dumps.filter(data_hash=data_hash)
+            if existed_dumps.exists():
+                return existed_dumps.latest()
+            return self._save_dump(graph, dump_file, data_hash, edges,
+                                   creation_date, subgraph=True)
+
+    def _write_dump(self, graph, creation_date):
+        # Taken before reading the relationships, since replaying again
+        # the changes made meanwhile leaves the dump the same
+        last_change_id = graph.edge_changes.aggregate(
+            Max("id"))["id__max"] or 0
+        relationships = graph.gdb.get_relationships_endpoints()
+        with tempfile.TemporaryFile() as dump_file:
+            data_hash, edges = sparse.write_dump(relationships, dump_file)
+            return self._save_dump(graph, dump_file, data_hash, edges,
+                                   creation_date,
+                                   last_change_id=last_change_id)
+
+    def _save_dump(self, graph, dump_file, data_hash, edges, creation_date,
+                   subgraph=False, last_change_id=None):
+        timestamp = "{:.0f}".format(time.time() * 1000)
+        dump_file_name = "{0}_dump_{1}.edges".format(graph.slug, timestamp)
+        dump = Dump(graph=graph, creation_date=creation_date,
+                    data_hash=data_hash, edges=edges, subgraph=subgraph,
+                    last_change_id=last_change_id)
+        dump_file.seek(0)
+        dump.data_file.save(dump_file_name, File(dump_file))
+        if last_change_id:
+            # The changes are only needed to patch the latest dump
+            graph.edge_changes.filter(id__lte=last_change_id).delete()
         return dump
 
+    def _run_kernel(self, analytic, kernel, column):
+        """
+        Run the function "kernel" of the module sparse over the dump of
+        the analytic and return a data frame with its value for every node
+        in "column"
+        """
+        with analytic.dump.get_data_file_path() as dump_path:
+            try:
+                edges = sparse.EdgeList.load(dump_path)
+            except Exception as e:
+                raise Exception(LOAD_FILE, "Error loading the file")
+            try:
+                if edges.size:
+                    values = kernel(edges)
+                else:
+                    values = []
+            except Exception as e:
+                raise Exception(RUN_ALGOS, "Error executing the task")
+            try:
+                # The ids are copied out of the dump before it's released
+                return pd.DataFrame({'__id': np.array(edges.node_ids),
+                                     column: values},
+                                    columns=['__id', column])
+            except Exception as e:
+                raise Exception(PROC_FINA,
+                                "Error finishing the task: " + str(e))
+
     def run_connected_components(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            cc = graphlab.connected_components.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return cc.get('componentid')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.connected_components,
+                                'componentid')
 
     def estimate_connected_components(self, graph):
         nodes = graph.nodes.count()
@@ -114,20 +192,7 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_graph_coloring(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            gc = graphlab.graph_coloring.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return gc.get('colorid')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.graph_coloring, 'colorid')
 
     def estimate_graph_coloring(self, graph):
         nodes = graph.nodes.count()
@@ -137,20 +202,7 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_kcore(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            kc = graphlab.kcore.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return kc.get('coreid')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.kcore, 'coreid')
 
     def estimate_kcore(self, graph):
         nodes = graph.nodes.count()
@@ -161,20 +213,7 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_pagerank(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            pr = graphlab.pagerank.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return pr.get('pagerank')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.pagerank, 'pagerank')
 
     def estimate_pagerank(self, graph):
         nodes = graph.nodes.count()
@@ -185,20 +224,7 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_shortest_path(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            sp = graphlab.shortest_path.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return sp.get('distance')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.shortest_path, 'distance')
 
     def estimate_shortest_path(self, graph):
         # Min priority-queue: |E| + |V|log(|V|)
@@ -210,20 +236,8 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_triangle_counting(self, analytic):
-        try:
-            sf = graphlab.SFrame.read_csv(analytic.dump.get_data_file_path())
-            g = graphlab.SGraph()
-            g = g.add_edges(sf, 'src', 'dest')
-        except Exception as e:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            tc = graphlab.triangle_counting.create(g)
-        except Exception as e:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return tc.get('triangle_count')
-        except Exception as e:
-            raise Exception(PROC_FINA, "Error finishing the task: " + str(e))
+        return self._run_kernel(analytic, sparse.triangle_counting,
+                                'triangle_count')
 
     def estimate_triangle_counting(self, graph):
         nodes = graph.nodes.count()
@@ -234,44 +248,25 @@ class Analysis(BaseAnalysis):
         return result
 
     def run_betweenness_centrality(self, analytic):
-        try:
-            dump_df = pd.read_csv(analytic.dump.get_data_file_path(),
-                                  delimiter=",")
-            g = nx.DiGraph()
-            for row in dump_df.iterrows():
-                g.add_edge(*row[1].values)
-        except Exception:
-            raise Exception(LOAD_FILE, "Error loading the file")
-        try:
-            bc = nx.betweenness_centrality(g).items()
-            bc = pd.DataFrame(bc, columns=['__id',
-                                           'betweenness_centrality'])
-        except Exception:
-            raise Exception(RUN_ALGOS, "Error executing the task")
-        try:
-            return bc
-        except Exception as e:
-            raise Exception(PROC_FINA,
-                            "Error finishing the task: " % str(e))
+        def betweenness_centrality(edges):
+            return sparse.betweenness_centrality(
+                edges, error=settings.BETWEENNESS_ERROR,
+                processes=settings.BETWEENNESS_PROCESSES)
+        return self._run_kernel(analytic, betweenness_centrality,
+                                'betweenness_centrality')
 
     def estimate_betweenness_centrality(self, graph):
+        # A BFS from every sampled source, split among the processes
         nodes = graph.nodes.count()
         rels = graph.relationships.count()
-        result = (nodes * rels) * INST_TIME
+        samples = sparse.betweenness_samples(nodes,
+                                             settings.BETWEENNESS_ERROR)
+        processes = max(1, min(samples, settings.BETWEENNESS_PROCESSES))
+        result = (samples * (nodes + rels) / processes) * INST_TIME
         if result < 1:
             result += 1
         return result
 
-    def _get_values_dict(self, values):
-        values_dict = dict()
-        for key, val in values.iteritems():
-            if val in values_dict:
-                if key not in values_dict[val]:
-                    values_dict[val].append(key)
-            else:
-                values_dict[val] = [key]
-        return values_dict
-
     def save(self, results, analytic):
         result = ''
         algorithm = analytic.algorithm
@@ -289,50 +284,15 @@ class Analysis(BaseAnalysis):
             result = 'triangle_count'
         elif algorithm == 'betweenness_centrality':
             result = 'betweenness_centrality'
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        temp_file.close()
-        if not isinstance(results, pd.DataFrame):
-            results = results.to_dataframe()
-        results.rename(columns={
-            "__id": "node_id",
-            result: algorithm,
-        }, inplace=True)
-        # Cast to string because otherwise 0.15000 is converted to 0.14999 :-?
-        results = results.astype(str)
-        # A better solution could be to store it as JSON
-        results.to_csv(temp_file.name,
-                       index=False,
-                       header=['node_id', algorithm])  # float_format='%.12f'
-        results.set_index('node_id', inplace=True)
-        values = results[algorithm]
-        freq_dist = values.value_counts()
-        values_dict = self._get_values_dict(values)
-        temp_file_name = temp_file.name
         timestamp = "{:.0f}".format(time.time() * 1000)
-        suf_name = "{0}_{1}_{2}".format(
+        results_name = "{0}_{1}_{2}.results".format(
             analytic.dump.graph.slug, analytic.algorithm, timestamp
         )
-        suf_values_name = "{0}_{1}_values_{2}".format(
-            analytic.dump.graph.slug, analytic.algorithm, timestamp
-        )
-        suf_raw = SimpleUploadedFile(
-            "{0}.csv".format(suf_name),
-            open(temp_file_name, 'r').read(),
-            "text/csv"
-        )
-        analytic.raw = suf_raw
-        suf_results = SimpleUploadedFile(
-            "{0}.json".format(suf_name),
-            freq_dist.to_json(),
-            "application/json")
-        analytic.results = suf_results
-        suf_values = SimpleUploadedFile(
-            "{0}.json".format(suf_values_name),
-            json.dumps(values_dict),
-            "application/json")
-        analytic.values = suf_values
+        # A single file with the values sorted by value and by node, and
+        # their histogram, instead of the CSV and the JSON files
+        with tempfile.TemporaryFile() as results_file:
+            write_results(results['__id'].values, results[result].values,
+                          results_file)
+            results_file.seek(0)
+            analytic.raw.save(results_name, File(results_file), save=False)
         analytic.save()
-        # Remove the two temp files
-        if temp_file_name != temp_file.name:
-            os.unlink(temp_file_name)
-        os.unlink(temp_file.name)
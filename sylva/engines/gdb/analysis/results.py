@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Results of the analytics as binary columns of node ids and values, sorted
+by value and by node id so they can be looked up with binary searches, and
+a histogram of the values computed when they are saved.
+
+The files have a header (the magic string and the number of nodes and of
+bins of the histogram) followed by little-endian arrays of 8 bytes: the
+values in ascending order and their node ids, the node ids in ascending
+order and their values, and the lowest value, the highest value and the
+number of nodes of every bin of the histogram.
+"""
+import struct
+
+import numpy as np
+
+RESULTS_MAGIC = b"SYLVARS1"
+RESULTS_HEADER = struct.Struct("<8sqq")
+IDS_DTYPE = np.dtype("<i8")
+VALUES_DTYPE = np.dtype("<f8")
+# Max number of bins of the histograms. If there are no more distinct
+# values, every value has its own bin
+HISTOGRAM_SIZE = 100
+
+
+def _histogram(values, size=HISTOGRAM_SIZE):
+    """
+    Bins of the sorted array "values", as arrays of the lowest value, the
+    highest value and the number of values of every bin.
+    """
+    if not len(values):
+        return values, values, np.zeros(0, dtype=IDS_DTYPE)
+    changes = np.flatnonzero(values[1:] != values[:-1]) + 1
+    if len(changes) < size:
+        keys = None
+    else:
+        # Bins of the same width between the finite values, and another
+        # one for the infinite distances
+        finite = np.isfinite(values)
+        edges = np.linspace(values[finite].min(), values[finite].max(),
+                            size + 1)
+        keys = np.searchsorted(edges[1:-1], values, side="right")
+        keys[~finite] = size
+        changes = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate([[0], changes])
+    ends = np.concatenate([changes, [len(values)]])
+    return values[starts], values[ends - 1], ends - starts
+
+
+def write_results(node_ids, values, results_file):
+    """
+    Write the arrays "node_ids" and "values" of an analytic to the file
+    "results_file".
+    """
+    node_ids = np.asarray(node_ids, dtype=IDS_DTYPE)
+    values = np.asarray(values, dtype=VALUES_DTYPE)
+    by_value = np.lexsort((node_ids, values))
+    by_node = np.argsort(node_ids, kind="mergesort")
+    sorted_values = values[by_value]
+    lows, highs, counts = _histogram(sorted_values)
+    results_file.write(RESULTS_HEADER.pack(RESULTS_MAGIC, len(node_ids),
+                                           len(counts)))
+    results_file.flush()
+    for array, dtype in ((sorted_values, VALUES_DTYPE),
+                         (node_ids[by_value], IDS_DTYPE),
+                         (node_ids[by_node], IDS_DTYPE),
+                         (values[by_node], VALUES_DTYPE),
+                         (lows, VALUES_DTYPE), (highs, VALUES_DTYPE),
+                         (counts, IDS_DTYPE)):
+        array.astype(dtype).tofile(results_file)
+    results_file.flush()
+
+
+class AnalyticResults(object):
+    """
+    Results of an analytic saved by "write_results" in "path", mapped into
+    memory, so only the pages of the arrays that are read are loaded.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as results_file:
+            header = results_file.read(RESULTS_HEADER.size)
+        magic, self.size, bins = RESULTS_HEADER.unpack(header)
+        if magic != RESULTS_MAGIC:
+            raise ValueError("Not a file of results of analytics")
+        arrays = []
+        offset = RESULTS_HEADER.size
+        for dtype, length in ((VALUES_DTYPE, self.size),
+                              (IDS_DTYPE, self.size),
+                              (IDS_DTYPE, self.size),
+                              (VALUES_DTYPE, self.size),
+                              (VALUES_DTYPE, bins), (VALUES_DTYPE, bins),
+                              (IDS_DTYPE, bins)):
+            if length:
+                arrays.append(np.memmap(path, dtype=dtype, mode="r",
+                                        offset=offset, shape=(length,)))
+            else:
+                arrays.append(np.zeros(0, dtype=dtype))
+            offset += dtype.itemsize * length
+        (self.values, self.value_node_ids, self.node_ids, self.node_values,
+         self.lows, self.highs, self.counts) = arrays
+
+    def value(self, node_id):
+        """
+        Value of the node "node_id", or None if it is not in the results.
+        """
+        position = np.searchsorted(self.node_ids, node_id)
+        if position < self.size and self.node_ids[position] == node_id:
+            return float(self.node_values[position])
+        return None
+
+    def top(self, count):
+        """
+        List of tuples of the ids and the values of the "count" nodes with
+        the highest values.
+        """
+        start = max(self.size - count, 0)
+        return zip(self.value_node_ids[start:][::-1].tolist(),
+                   self.values[start:][::-1].tolist())
+
+    def in_range(self, low, high):
+        """
+        List of the ids of the nodes with values between "low" and "high",
+        both included, in ascending order of value.
+        """
+        start = np.searchsorted(self.values, low, side="left")
+        end = np.searchsorted(self.values, high, side="right")
+        return self.value_node_ids[start:end].tolist()
+
+    def in_bin(self, value):
+        """
+        List of the ids of the nodes in the bin of the histogram with
+        "value", which is the lowest value of the bin for the charts.
+        """
+        position = np.searchsorted(self.lows, value, side="right") - 1
+        if position < 0 or value > self.highs[position]:
+            return []
+        return self.in_range(self.lows[position], self.highs[position])
+
+    def histogram(self):
+        """
+        List of tuples with the lowest value, the highest value and the
+        number of nodes of every bin of the histogram.
+        """
+        return zip(self.lows.tolist(), self.highs.tolist(),
+                   self.counts.tolist())
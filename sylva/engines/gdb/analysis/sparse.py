@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Graph algorithms over the edge lists of the dumps, kept as CSR adjacency
+matrices of SciPy with the nodes numbered from 0 to n - 1. Every algorithm
+returns an array with a value for each of those positions.
+
+The dumps are binary files with a header (the magic string and the number
+of nodes and edges) followed by four arrays of little-endian int64: the
+ids of the nodes, the positions in it of the sources and the targets of
+the edges, and the ids of the relationships, so the dumps can be patched
+with the changes of the graph. They are loaded with memory maps instead of
+being parsed.
+"""
+import math
+import os
+import shutil
+import struct
+import tempfile
+from itertools import chain, islice
+
+from billiard import Pool
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+RESET_PROBABILITY = 0.15
+PAGERANK_TOLERANCE = 1e-2
+PAGERANK_MAX_ITERATIONS = 100
+BETWEENNESS_ERROR = 0.05
+# Probability that the error of some node is above BETWEENNESS_ERROR
+BETWEENNESS_FAILURE = 0.1
+DUMP_MAGIC = b"SYLVAEL2"
+DUMP_HEADER = struct.Struct("<8sqq")
+DUMP_DTYPE = np.dtype("<i8")
+# Number of edges read and written at once while dumping
+DUMP_CHUNK_SIZE = 65536
+# Constants of the mixing function of SplitMix64, for the checksums
+MIX_SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31))
+MIX_MULTIPLIERS = (np.uint64(0xbf58476d1ce4e5b9),
+                   np.uint64(0x94d049bb133111eb))
+CHECKSUM_MASK = 0xffffffffffffffff
+
+
+class EdgeList(object):
+    """
+    Edges of a dump, with the ids of the nodes in "node_ids" and the
+    edges as positions in it. If "node_ids" is not provided, "sources" and
+    "targets" are node ids and the positions are computed from them.
+    The ids of the relationships are in "relationship_ids", if known.
+    """
+
+    def __init__(self, sources, targets, node_ids=None,
+                 relationship_ids=None):
+        if node_ids is None:
+            sources = np.asarray(sources, dtype=np.int64)
+            targets = np.asarray(targets, dtype=np.int64)
+            node_ids, positions = np.unique(
+                np.concatenate([sources, targets]), return_inverse=True)
+            sources = positions[:len(sources)]
+            targets = positions[len(sources):]
+        self.node_ids = node_ids
+        self.sources = sources
+        self.targets = targets
+        self.relationship_ids = relationship_ids
+        self.size = len(self.node_ids)
+        self._directed = None
+        self._undirected = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the dump in "path", mapping its arrays into memory. Dumps in
+        the former CSV format are parsed.
+        """
+        with open(path, "rb") as dump_file:
+            header = dump_file.read(DUMP_HEADER.size)
+        if len(header) < DUMP_HEADER.size or \
+                not header.startswith(DUMP_MAGIC):
+            return cls.from_csv(path)
+        magic, nodes, edges = DUMP_HEADER.unpack(header)
+        if not nodes:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, node_ids=empty, relationship_ids=empty)
+        arrays = np.memmap(path, dtype=DUMP_DTYPE, mode="r",
+                           offset=DUMP_HEADER.size, shape=(nodes + 3 * edges,))
+        return cls(arrays[nodes:nodes + edges],
+                   arrays[nodes + edges:nodes + 2 * edges],
+                   node_ids=arrays[:nodes],
+                   relationship_ids=arrays[nodes + 2 * edges:])
+
+    @classmethod
+    def from_csv(cls, path):
+        edges = pd.read_csv(path, delimiter=",", dtype=np.int64)
+        return cls(edges["src"].values, edges["dest"].values)
+
+    def directed(self):
+        """
+        Adjacency matrix with a 1 for every pair of nodes with at least a
+        relationship from the first to the second.
+        """
+        if self._directed is None:
+            data = np.ones(len(self.sources), dtype=np.int8)
+            matrix = sparse.coo_matrix((data, (self.sources, self.targets)),
+                                       shape=(self.size, self.size)).tocsr()
+            matrix.data[:] = 1
+            self._directed = matrix
+        return self._directed
+
+    def undirected(self):
+        """
+        Symmetric adjacency matrix, without loops.
+        """
+        if self._undirected is None:
+            directed = self.directed()
+            matrix = (directed + directed.T).tocsr()
+            matrix.setdiag(0)
+            matrix.eliminate_zeros()
+            matrix.data[:] = 1
+            matrix.sort_indices()
+            self._undirected = matrix
+        return self._undirected
+
+
+def _mix(values):
+    for shift, multiplier in zip(MIX_SHIFTS, MIX_MULTIPLIERS):
+        values = (values ^ (values >> shift)) * multiplier
+    return values ^ (values >> MIX_SHIFTS[-1])
+
+
+def edges_checksum(relationship_ids, source_ids, target_ids):
+    """
+    Checksum of the edges as the sum of a hash of every one of them, so it
+    doesn't depend on their order and the dumps of the same edges written
+    from scratch or patched have the same one.
+    """
+    total = 0
+    for start in range(0, len(relationship_ids), DUMP_CHUNK_SIZE):
+        chunk = slice(start, start + DUMP_CHUNK_SIZE)
+        values = np.zeros(len(relationship_ids[chunk]), dtype=np.uint64)
+        for ids in (relationship_ids, source_ids, target_ids):
+            ids = np.asarray(ids[chunk], dtype=DUMP_DTYPE)
+            values = _mix(values ^ ids.view(np.uint64))
+        total = (total + int(values.sum(dtype=np.uint64))) & CHECKSUM_MASK
+    return "{0:016x}".format(total)
+
+
+def _write_edges(dump_file, relationship_ids, source_ids, target_ids):
+    """
+    Write the dump of the edges to "dump_file" and return its checksum.
+    """
+    edges = len(relationship_ids)
+    if edges:
+        ids, positions = np.unique(
+            np.concatenate([source_ids, target_ids]), return_inverse=True)
+    else:
+        ids = positions = np.zeros(0, dtype=DUMP_DTYPE)
+    positions = positions.astype(DUMP_DTYPE)
+    dump_file.write(DUMP_HEADER.pack(DUMP_MAGIC, len(ids), edges))
+    dump_file.flush()
+    ids.astype(DUMP_DTYPE).tofile(dump_file)
+    positions.tofile(dump_file)
+    np.asarray(relationship_ids, dtype=DUMP_DTYPE).tofile(dump_file)
+    dump_file.flush()
+    return edges_checksum(relationship_ids, source_ids, target_ids)
+
+
+def write_dump(relationships, dump_file, node_ids=None):
+    """
+    Write the edges of the iterable "relationships" of tuples with the ids
+    of the relationship, its source and its target to the file "dump_file",
+    keeping only those between the nodes in "node_ids" if provided. The
+    edges are spooled in chunks to a temporary file, so they are never
+    held as Python objects. Return the checksum and the number of edges.
+    """
+    if node_ids is not None:
+        node_ids = np.asarray(list(node_ids), dtype=np.int64)
+    relationships = iter(relationships)
+    edges = 0
+    spool = tempfile.TemporaryFile()
+    try:
+        while True:
+            chunk = np.fromiter(
+                chain.from_iterable(islice(relationships, DUMP_CHUNK_SIZE)),
+                dtype=DUMP_DTYPE).reshape(-1, 3)
+            if not len(chunk):
+                break
+            if node_ids is not None:
+                chunk = chunk[np.in1d(chunk[:, 1], node_ids)
+                              & np.in1d(chunk[:, 2], node_ids)]
+            chunk.tofile(spool)
+            edges += len(chunk)
+        spool.flush()
+        if edges:
+            spooled = np.memmap(spool, dtype=DUMP_DTYPE, mode="r",
+                                shape=(edges, 3))
+            data_hash = _write_edges(dump_file, spooled[:, 0],
+                                     spooled[:, 1], spooled[:, 2])
+            del spooled
+        else:
+            empty = np.zeros(0, dtype=DUMP_DTYPE)
+            data_hash = _write_edges(dump_file, empty, empty, empty)
+    finally:
+        spool.close()
+    return data_hash, edges
+
+
+def patch_dump(edges, created, deleted, deleted_nodes, dump_file):
+    """
+    Write to "dump_file" the EdgeList "edges" of a dump without the
+    relationships with ids in "deleted" or with an endpoint in
+    "deleted_nodes", and with those of "created", a dictionary of the ids
+    of the relationships and the tuples of their source and target ids,
+    which replace the relationships with the same id. Return the checksum
+    and the number of edges.
+    """
+    source_ids = edges.node_ids[edges.sources]
+    target_ids = edges.node_ids[edges.targets]
+    relationship_ids = np.asarray(edges.relationship_ids)
+    removed = np.asarray(list(deleted) + list(created), dtype=DUMP_DTYPE)
+    keep = ~np.in1d(relationship_ids, removed)
+    if deleted_nodes:
+        nodes = np.asarray(list(deleted_nodes), dtype=DUMP_DTYPE)
+        keep &= ~(np.in1d(source_ids, nodes) | np.in1d(target_ids, nodes))
+    created_ids = np.asarray(list(created.keys()), dtype=DUMP_DTYPE)
+    endpoints = np.asarray(list(created.values()),
+                           dtype=DUMP_DTYPE).reshape(-1, 2)
+    relationship_ids = np.concatenate([relationship_ids[keep], created_ids])
+    data_hash = _write_edges(
+        dump_file, relationship_ids,
+        np.concatenate([source_ids[keep], endpoints[:, 0]]),
+        np.concatenate([target_ids[keep], endpoints[:, 1]]))
+    return data_hash, len(relationship_ids)
+
+
+def pagerank(edges, reset_probability=RESET_PROBABILITY,
+             tolerance=PAGERANK_TOLERANCE,
+             max_iterations=PAGERANK_MAX_ITERATIONS):
+    """
+    Power iteration of pagerank, with the scale in which every node gets at
+    least "reset_probability", until no value changes more than
+    "tolerance".
+    """
+    matrix = edges.directed().astype(np.float64)
+    out_degrees = np.asarray(matrix.sum(axis=1)).ravel()
+    inverse = np.zeros(edges.size)
+    inverse[out_degrees > 0] = 1.0 / out_degrees[out_degrees > 0]
+    # Transposed and scaled by the out degrees once, so every iteration is
+    # a single product
+    transition = (sparse.diags(inverse, 0) * matrix).T.tocsr()
+    values = np.ones(edges.size)
+    for iteration in range(max_iterations):
+        previous = values
+        values = (reset_probability
+                  + (1.0 - reset_probability) * (transition * previous))
+        if np.abs(values - previous).max() <= tolerance:
+            break
+    return values
+
+
+def connected_components(edges):
+    """
+    Weakly connected components, identified by the lowest node id in them.
+    """
+    count, labels = csgraph.connected_components(edges.undirected(),
+                                                 directed=False)
+    lowest = np.empty(count, dtype=np.int64)
+    lowest.fill(np.iinfo(np.int64).max)
+    np.minimum.at(lowest, labels, edges.node_ids)
+    return lowest[labels]
+
+
+def graph_coloring(edges):
+    """
+    Greedy coloring in order of decreasing degree, giving every node the
+    lowest color not used by its neighbors.
+    """
+    matrix = edges.undirected()
+    indptr, indices = matrix.indptr, matrix.indices
+    degrees = np.diff(indptr)
+    colors = np.empty(edges.size, dtype=np.int64)
+    colors.fill(-1)
+    for node in np.argsort(-degrees, kind="mergesort"):
+        neighbor_colors = colors[indices[indptr[node]:indptr[node + 1]]]
+        used = np.zeros(degrees[node] + 1, dtype=bool)
+        used[neighbor_colors[(neighbor_colors >= 0)
+                             & (neighbor_colors <= degrees[node])]] = True
+        colors[node] = np.argmin(used)
+    return colors
+
+
+def kcore(edges):
+    """
+    Core number of every node, removing the nodes of lowest degree first
+    with the nodes kept in buckets by degree (Batagelj and Zaversnik).
+    """
+    matrix = edges.undirected()
+    indptr, indices = matrix.indptr, matrix.indices
+    degrees = np.diff(indptr).astype(np.int64)
+    size = edges.size
+    if not size:
+        return degrees
+    # Nodes sorted by degree, with the start of every degree in "bins"
+    order = np.argsort(degrees, kind="mergesort")
+    positions = np.empty(size, dtype=np.int64)
+    positions[order] = np.arange(size)
+    bins = np.searchsorted(degrees[order], np.arange(degrees.max() + 1))
+    for index in range(size):
+        node = order[index]
+        node_degree = degrees[node]
+        for neighbor in indices[indptr[node]:indptr[node + 1]].tolist():
+            neighbor_degree = degrees[neighbor]
+            if neighbor_degree > node_degree:
+                # Swap the neighbor with the first node of its degree and
+                # move that bucket one position ahead
+                first = bins[neighbor_degree]
+                first_node = order[first]
+                if first_node != neighbor:
+                    neighbor_position = positions[neighbor]
+                    order[first] = neighbor
+                    order[neighbor_position] = first_node
+                    positions[neighbor] = first
+                    positions[first_node] = neighbor_position
+                bins[neighbor_degree] += 1
+                degrees[neighbor] -= 1
+    return degrees
+
+
+def triangle_counting(edges):
+    """
+    Number of triangles of every node. The edges are oriented from the
+    node of lower degree to the node of higher degree, so every triangle
+    (u, v, w) is found once as the intersection of the sorted rows of u
+    and v, through sparse products masked by the edges.
+    """
+    matrix = edges.undirected()
+    degrees = np.diff(matrix.indptr)
+    ranks = np.empty(edges.size, dtype=np.int64)
+    ranks[np.lexsort((np.arange(edges.size), degrees))] = np.arange(
+        edges.size)
+    coo = matrix.tocoo()
+    forward = ranks[coo.row] < ranks[coo.col]
+    oriented = sparse.csr_matrix(
+        (np.ones(forward.sum(), dtype=np.int64),
+         (coo.row[forward], coo.col[forward])),
+        shape=matrix.shape)
+    # For every edge u -> w, the nodes v with u -> v -> w
+    closing = oriented.multiply(oriented * oriented)
+    # For every edge v -> w, the nodes u with u -> v and u -> w
+    middle = oriented.multiply(oriented.T * oriented)
+    counts = (np.asarray(closing.sum(axis=1)).ravel()
+              + np.asarray(closing.sum(axis=0)).ravel()
+              + np.asarray(middle.sum(axis=1)).ravel())
+    return counts.astype(np.int64)
+
+
+def shortest_path(edges, source=None):
+    """
+    Number of hops from the node in position "source", the first one by
+    default, to every node, infinite for the nodes out of reach.
+    """
+    if not edges.size:
+        return np.zeros(0)
+    return csgraph.shortest_path(edges.directed(), directed=True,
+                                 unweighted=True, indices=source or 0)
+
+
+def betweenness_samples(size, error=BETWEENNESS_ERROR,
+                        failure=BETWEENNESS_FAILURE):
+    """
+    Number of sources needed to estimate the normalized betweenness of
+    "size" nodes with at most "error", except with probability "failure",
+    by the Hoeffding bound for every node. All the nodes are used if that
+    is not less.
+    """
+    if size < 2:
+        return size
+    samples = math.log(2.0 * size / failure) / (2.0 * error ** 2)
+    return min(size, int(math.ceil(samples)))
+
+
+def _dependencies(indptr, indices, sources):
+    """
+    Sum of the dependencies of every node on the BFS of Brandes from each
+    of the positions in "sources", over the CSR arrays "indptr" and
+    "indices". Every level of the BFS is expanded at once.
+    """
+    size = len(indptr) - 1
+    total = np.zeros(size)
+    for source in sources:
+        distances = np.empty(size, dtype=np.int64)
+        distances.fill(-1)
+        distances[source] = 0
+        paths = np.zeros(size)
+        paths[source] = 1
+        frontier = np.array([source], dtype=np.int64)
+        levels = []
+        level = 0
+        while len(frontier):
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            owners = np.repeat(frontier, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts)
+            neighbors = indices[np.repeat(starts, counts) + offsets]
+            unseen = neighbors[distances[neighbors] < 0]
+            distances[unseen] = level + 1
+            # Edges in the shortest paths, from this level to the next one
+            shortest = distances[neighbors] == level + 1
+            owners = owners[shortest]
+            neighbors = neighbors[shortest]
+            paths += np.bincount(neighbors, weights=paths[owners],
+                                 minlength=size)
+            levels.append((owners, neighbors))
+            frontier = np.unique(neighbors)
+            level += 1
+        dependencies = np.zeros(size)
+        for owners, neighbors in reversed(levels):
+            dependencies += np.bincount(
+                owners, minlength=size,
+                weights=(paths[owners] / paths[neighbors]
+                         * (1.0 + dependencies[neighbors])))
+        dependencies[source] = 0
+        total += dependencies
+    return total
+
+
+def _dependencies_worker(args):
+    indptr_path, indices_path, sources = args
+    indptr = np.load(indptr_path, mmap_mode="r")
+    indices = np.load(indices_path, mmap_mode="r")
+    return _dependencies(indptr, indices, sources)
+
+
+def betweenness_centrality(edges, error=BETWEENNESS_ERROR,
+                           failure=BETWEENNESS_FAILURE, processes=1,
+                           seed=None):
+    """
+    Betweenness centrality normalized by (n - 1)(n - 2), as for directed
+    graphs in NetworkX, estimated from the BFS of Brandes from a random
+    sample of sources (the pivots of Brandes and Pich). The sources are
+    split among "processes" processes, which map the CSR arrays from
+    temporary files instead of receiving a copy.
+    """
+    size = edges.size
+    if size < 3:
+        return np.zeros(size)
+    matrix = edges.directed()
+    samples = betweenness_samples(size, error, failure)
+    if samples < size:
+        random = np.random.RandomState(seed)
+        sources = np.sort(random.choice(size, samples, replace=False))
+    else:
+        sources = np.arange(size)
+    if processes > 1 and samples > 1:
+        directory = tempfile.mkdtemp()
+        try:
+            indptr_path = os.path.join(directory, "indptr.npy")
+            indices_path = os.path.join(directory, "indices.npy")
+            np.save(indptr_path, matrix.indptr.astype(np.int64))
+            np.save(indices_path, matrix.indices.astype(np.int64))
+            chunks = np.array_split(sources, processes)
+            pool = Pool(processes)
+            try:
+                totals = pool.map(_dependencies_worker, [
+                    (indptr_path, indices_path, chunk)
+                    for chunk in chunks if len(chunk)])
+            finally:
+                pool.terminate()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        total = np.sum(totals, axis=0)
+    else:
+        total = _dependencies(matrix.indptr.astype(np.int64),
+                              matrix.indices.astype(np.int64), sources)
+    scale = float(size) / samples / ((size - 1) * (size - 2))
+    return total * scale
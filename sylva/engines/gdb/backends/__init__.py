@@ -33,6 +33,15 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def create_nodes(self, nodes):
+        """
+        Create several nodes at once.
+        "nodes" is an iterable of tuples (label, properties), where
+        "properties" is a dictionary or None.
+        Return the list of ids of the nodes created, in the same order.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     def delete_node(self, id):
         """
         Delete the node "id".
@@ -139,6 +148,60 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def get_nodes_by_ids(self, ids):
+        """
+        Get an iterator of tuples for the nodes with "id" in the list "ids",
+        with the "id", a dictionary containing the properties and the label.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
+    def get_nodes_labels(self, ids):
+        """
+        Get a dictionary with the label of every node of the graph with "id"
+        in the list "ids". The ids of nodes that don't exist are left out.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
+    def get_relationships_endpoints(self):
+        """
+        Get an iterator of tuples with the ids of every relationship, its
+        source and its target, without their properties.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
+    def get_nodes_degrees(self, label=None):
+        """
+        Get an iterator of tuples with the "id" and the number of
+        relationships of every node.
+        If "label" is provided, nodes will be filtered.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
+    def get_relationships_between(self, ids, limit=None):
+        """
+        Get an iterator of tuples for the relationships whose source and
+        target are both in the list of node ids "ids", with the "id", the
+        properties and the label of the relationship and the dictionaries of
+        its source and target. If "limit" is provided, only that number of
+        relationships is returned.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
+    def get_neighbors(self, ids, node_label=None, relationship_label=None,
+                      limit=None):
+        """
+        Get an iterator of the neighbors of the nodes with "id" in the list
+        "ids". Every neighbor is a tuple with the tuple of the node of "ids",
+        the tuple of the relationship between them, with the "id",
+        properties, label, source "id" and target "id", and the tuple of the
+        neighbor. The tuples of the nodes are as those of "get_nodes_by_ids".
+        If "node_label" or "relationship_label" are provided, only neighbors
+        and relationships with those labels are returned.
+        If "limit" is provided, only that number of neighbors of every node
+        is returned.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     def delete_nodes(self, ids):
         """
         Delete all the nodes whose "id" is on the list "ids".
@@ -172,6 +235,13 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def get_filtered_nodes_count(self, lookups, label=None):
+        """
+        Get the number of nodes matching "lookups" and "label", without
+        fetching them.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     # Relationships methdos
 
     def create_relationship(self, id1, id2, label, properties=None, type=None):
@@ -184,6 +254,16 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def create_relationships(self, relationships):
+        """
+        Create several relationships at once.
+        "relationships" is an iterable of tuples (id1, id2, label,
+        properties), where "properties" is a dictionary or None.
+        Return the list of ids of the relationships created, in the same
+        order.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     def get_relationship_label(self, id):
         """
         Get the label of the relationship "id".
@@ -321,6 +401,13 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def get_filtered_relationships_count(self, lookups, label=None):
+        """
+        Get the number of relationships matching "lookups" and "label",
+        without fetching them.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     # Quering
 
     def nodes_query(self, *args, **kwargs):
@@ -344,6 +431,13 @@ class BaseGraphDatabase(object):
         """
         raise NotImplementedError("Method has to be implemented")
 
+    def query_count(self, query_dict, only_ids=None):
+        """
+        Get the number of rows of the query built from "query_dict", without
+        fetching them.
+        """
+        raise NotImplementedError("Method has to be implemented")
+
     def lookup_builder(self):
         """
         Get a constructor for Q objects in order to make lookups in filters
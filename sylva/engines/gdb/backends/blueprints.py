@@ -158,6 +158,10 @@ class BlueprintsGraphDatabase(BaseGraphDatabase):
         self.node_index.put("graph", self.graph_id, vertex)
         return vertex.getId()
 
+    def create_nodes(self, nodes):
+        return [self.create_node(label, properties)
+                for label, properties in nodes]
+
     def delete_node(self, id):
         vertex = self._get_vertex(id)
         self.gdb.removeVertex(vertex)
@@ -317,6 +321,10 @@ class BlueprintsGraphDatabase(BaseGraphDatabase):
         self.relationship_index.put("graph", self.graph_id, edge)
         return edge.getId()
 
+    def create_relationships(self, relationships):
+        return [self.create_relationship(id1, id2, label, properties)
+                for id1, id2, label, properties in relationships]
+
     def get_relationship_label(self, id):
         edge = self._get_edge(id)
         return self._get_element_label(edge)
@@ -1,16 +1,25 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import json
 import re
 
 from django.template.defaultfilters import slugify
 from lucenequerybuilder import Q
+from neo4jrestclient import request as neo4j_request
 from neo4jrestclient.exceptions import NotFoundError
+from neo4jrestclient.request import Request
 from pyblueprints.neo4j import Neo4jIndexableGraph as Neo4jGraphDatabase
 from pyblueprints.neo4j import Neo4jDatabaseConnectionError
 
-from engines.gdb.backends import (GraphDatabaseConnectionError,
+from engines.gdb.backends import (GraphDatabaseError,
+                                  GraphDatabaseConnectionError,
                                   GraphDatabaseInitializationError)
 from engines.gdb.backends.blueprints import BlueprintsGraphDatabase
+from engines.gdb.cache import LRUCache
 from engines.gdb.lookups.neo4j import Q as q_lookup_builder
+from engines.gdb.pool import mount_pool, session
+from engines.gdb.registry import registry
+from engines.gdb.utils import chunked
 try:
     from engines.gdb.analysis.neo4j import Analysis
 except ImportError:
@@ -19,6 +28,19 @@ except ImportError:
 
 WILDCARD_TYPE = -1
 AGGREGATES = ["Count", "Max", "Min", "Sum", "Average", "Deviation"]
+# Number of elements created per request to the batch endpoint
+BATCH_SIZE = 500
+# Number of rows fetched per request when running queries
+QUERY_PAGE_SIZE = 1000
+# Number of compiled queries kept per process
+COMPILED_QUERIES_SIZE = 1000
+
+# All the requests done by neo4jrestclient (Cypher, Gremlin, indices, batch
+# and REST calls) go through the pooled session
+neo4j_request.session = session
+
+# Scripts and parameters generated for the queries, shared by all graphs
+compiled_queries = LRUCache(max_size=COMPILED_QUERIES_SIZE)
 
 
 class GraphDatabase(BlueprintsGraphDatabase):
@@ -30,8 +52,10 @@ class GraphDatabase(BlueprintsGraphDatabase):
         if not self.graph:
             raise GraphDatabaseInitializationError("graph parameter required")
         self.graph_id = str(self.graph.id)
+        mount_pool(self.url, self.params)
         try:
-            self.gdb = Neo4jGraphDatabase(self.url)
+            self.gdb = registry.get_connection(self.url,
+                                               Neo4jGraphDatabase)
         except Neo4jDatabaseConnectionError:
             raise GraphDatabaseConnectionError(self.url)
         self.setup_indexes()
@@ -161,6 +185,224 @@ class GraphDatabase(BlueprintsGraphDatabase):
         for rel in rels:
             yield rel
 
+    def get_node_relationships(self, id, incoming=False, outgoing=False,
+                               include_properties=False, label=None):
+        """
+        Get a list of tuples with all relationships of the node "id".
+        If "include_properties" is True, the tuples are the same than those
+        of "get_filtered_relationships", with the id, properties and label of
+        the relationship and the dictionaries of the source and the target,
+        all of them fetched in just one Cypher query.
+        """
+        if not include_properties:
+            return super(GraphDatabase, self).get_node_relationships(
+                id, incoming=incoming, outgoing=outgoing, label=label)
+        if isinstance(label, (list, tuple)):
+            if not label:
+                return []
+            labels = [str(label_id) for label_id in label]
+        elif label:
+            labels = [str(label)]
+        else:
+            labels = None
+        if not incoming and outgoing:
+            script = u"start n=node({node_id}) match n-[r]->m"
+            returns = u"n, m"
+        elif incoming and not outgoing:
+            script = u"start n=node({node_id}) match n<-[r]-m"
+            returns = u"m, n"
+        else:
+            script = u"start n=node({node_id}) match n-[r]-m"
+            returns = u"startNode(r), endNode(r)"
+        params = {"node_id": int(id)}
+        if labels:
+            script = u"%s where type(r) in {labels}" % script
+            params["labels"] = labels
+        script = u"%s return distinct id(r), r, %s" % (script, returns)
+        try:
+            result = self.cypher(query=script, params=params)
+        except:
+            return []
+        relationships = []
+        for element in result.get("data", []):
+            properties = element[1]["data"]
+            properties.pop("_id", None)
+            properties.pop("_graph", None)
+            elto_label = properties.pop("_label", None)
+            relationships.append((element[0], properties, elto_label,
+                                  self._get_node_dict(element[2]),
+                                  self._get_node_dict(element[3])))
+        return relationships
+
+    def _get_node_dict(self, node):
+        properties = node["data"]
+        node_id = properties.pop("_id")
+        node_label = properties.pop("_label")
+        properties.pop("_graph", None)
+        return {
+            "id": node_id,
+            "properties": properties,
+            "label": node_label
+        }
+
+    def get_nodes_by_ids(self, ids):
+        ids = [int(node_id) for node_id in ids]
+        if not ids:
+            return
+        script = u"start n=node({ids}) return n"
+        try:
+            result = self.cypher(query=script, params={"ids": ids})
+        except:
+            # Some of the nodes don't exist anymore, so the ids are looked
+            # for among those in the index
+            script = self._prepare_script(for_node=True)
+            script = u"%s where id(n) in {ids} return n" % script
+            try:
+                result = self.cypher(query=script, params={"ids": ids})
+            except:
+                result = None
+        if result:
+            for element in result.get("data", []):
+                node = self._get_node_dict(element[0])
+                yield (node["id"], node["properties"], node["label"])
+
+    def get_nodes_labels(self, ids):
+        ids = [int(node_id) for node_id in ids]
+        if not ids:
+            return {}
+        script = (u"start n=node({ids}) where n._graph! = {graph} "
+                  u"return id(n), n._label")
+        params = {"ids": ids, "graph": self.graph_id}
+        try:
+            result = self.cypher(query=script, params=params)
+        except:
+            # Some of the nodes don't exist, so the ids are looked for among
+            # those in the index
+            script = self._prepare_script(for_node=True)
+            script = u"%s where id(n) in {ids} return id(n), n._label" % script
+            try:
+                result = self.cypher(query=script, params={"ids": ids})
+            except:
+                result = None
+        if not result:
+            return {}
+        return dict((node_id, label)
+                    for node_id, label in result.get("data", []))
+
+    def get_relationships_endpoints(self):
+        script = self._prepare_script(for_node=False)
+        script = u"%s match a-[r]->b return id(r), id(a), id(b)" % script
+        skip = 0
+        while True:
+            paged_script = u"%s skip %s limit %s" % (script, skip,
+                                                     QUERY_PAGE_SIZE)
+            try:
+                result = self.cypher(query=paged_script)
+            except:
+                result = None
+            if not result or not result.get("data"):
+                break
+            for relationship_id, source_id, target_id in result["data"]:
+                yield (relationship_id, source_id, target_id)
+            if len(result["data"]) < QUERY_PAGE_SIZE:
+                break
+            skip += QUERY_PAGE_SIZE
+
+    def get_nodes_degrees(self, label=None):
+        if isinstance(label, (list, tuple)) and not label:
+            return
+        script = self._prepare_script(for_node=True, label=label)
+        script = u"%s match n-[r?]-() return id(n), count(r)" % script
+        try:
+            result = self.cypher(query=script)
+        except:
+            result = None
+        if result:
+            for node_id, degree in result.get("data", []):
+                yield (node_id, degree)
+
+    def get_relationships_between(self, ids, limit=None):
+        ids = [int(node_id) for node_id in ids]
+        if not ids:
+            return
+        script = (u"start a=node({ids}) match a-[r]->b where id(b) in {ids} "
+                  u"return distinct id(r), r, a, b")
+        if limit:
+            script = u"%s limit %s" % (script, int(limit))
+        try:
+            result = self.cypher(query=script, params={"ids": ids})
+        except:
+            result = None
+        if result:
+            for element in result.get("data", []):
+                properties = element[1]["data"]
+                properties.pop("_id", None)
+                properties.pop("_graph", None)
+                elto_label = properties.pop("_label", None)
+                yield (element[0], properties, elto_label,
+                       self._get_node_dict(element[2]),
+                       self._get_node_dict(element[3]))
+
+    def get_neighbors(self, ids, node_label=None, relationship_label=None,
+                      limit=None):
+        ids = [int(node_id) for node_id in ids]
+        if not ids:
+            return
+        script = (u"start a=node({id}) match a-[r]-b "
+                  u"where a._graph! = {graph}")
+        params = {"graph": self.graph_id}
+        if node_label is not None:
+            if not isinstance(node_label, (list, tuple)):
+                node_label = [node_label]
+            script = u"%s and b._label in {node_labels}" % script
+            params["node_labels"] = [str(label) for label in node_label]
+        if relationship_label is not None:
+            if not isinstance(relationship_label, (list, tuple)):
+                relationship_label = [relationship_label]
+            script = u"%s and type(r) in {rel_labels}" % script
+            params["rel_labels"] = [str(label)
+                                    for label in relationship_label]
+        script = u"%s return a, r, b" % script
+        if limit:
+            script = u"%s limit %s" % (script, int(limit))
+        # Every node is limited by its own query, all of them sent to the
+        # batch endpoint in chunks of BATCH_SIZE nodes
+        cypher_path = self._batch_path(self.gdb.neograph._cypher)
+        for start in range(0, len(ids), BATCH_SIZE):
+            jobs = []
+            for node_id in ids[start:start + BATCH_SIZE]:
+                node_params = dict(params, id=node_id)
+                jobs.append({"method": "POST", "to": cypher_path,
+                             "body": {"query": script,
+                                      "params": node_params},
+                             "id": len(jobs)})
+            try:
+                results = self._batch(jobs)
+            except GraphDatabaseError:
+                # Some of the nodes don't exist
+                continue
+            for result in results:
+                for node, element, neighbor in result["body"]["data"]:
+                    yield self._get_neighbor_tuples(node, element, neighbor)
+
+    def _get_neighbor_tuples(self, node, element, neighbor):
+        node = self._get_node_dict(node)
+        neighbor = self._get_node_dict(neighbor)
+        properties = element["data"]
+        properties.pop("_id", None)
+        properties.pop("_graph", None)
+        elto_label = properties.pop("_label", None)
+        relationship = (
+            self._get_url_id(element["self"]), properties, elto_label,
+            self._get_url_id(element["start"]),
+            self._get_url_id(element["end"]))
+        return ((node["id"], node["properties"], node["label"]),
+                relationship,
+                (neighbor["id"], neighbor["properties"], neighbor["label"]))
+
+    def _get_url_id(self, url):
+        return int(url.rpartition("/")[2])
+
     def get_node_relationships_count(self, id, incoming=False, outgoing=False,
                                      label=None):
         """
@@ -184,6 +426,56 @@ class GraphDatabase(BlueprintsGraphDatabase):
         count = gremlin(script=script)
         return self._clean_count(count)
 
+    def _get_lookups_where(self, lookups, var):
+        where = None
+        params = []
+        if lookups:
+            wheres = q_lookup_builder()
+            for lookup in lookups:
+                if isinstance(lookup, q_lookup_builder):
+                    wheres &= lookup
+                elif isinstance(lookup, dict):
+                    wheres &= q_lookup_builder(**lookup)
+            where, params = wheres.get_query_objects(var=var)
+        return where, params
+
+    def get_filtered_nodes_count(self, lookups, label=None):
+        """
+        Get the number of nodes matching "lookups" and "label", without
+        fetching them.
+        """
+        if isinstance(label, (list, tuple)) and not label:
+            return 0
+        script = self._prepare_script(for_node=True, label=label)
+        where, params = self._get_lookups_where(lookups, var="n")
+        if where:
+            script = u"%s where %s" % (script, where)
+        script = u"%s return count(n)" % script
+        try:
+            count = self.cypher(query=script, params=params)
+        except:
+            return 0
+        return self._clean_count(count)
+
+    def get_filtered_relationships_count(self, lookups, label=None):
+        """
+        Get the number of relationships matching "lookups" and "label",
+        without fetching them.
+        """
+        if isinstance(label, (list, tuple)) and not label:
+            return 0
+        script = self._prepare_script(for_node=False, label=label)
+        script = u"%s match a-[r]->b" % script
+        where, params = self._get_lookups_where(lookups, var="r")
+        if where:
+            script = u"%s where %s" % (script, where)
+        script = u"%s return count(distinct r)" % script
+        try:
+            count = self.cypher(query=script, params=params)
+        except:
+            return 0
+        return self._clean_count(count)
+
     def get_nodes_by_label(self, label, include_properties=False,
                            limit=None, offset=None, order_by=None):
         return self.get_filtered_nodes([], label=label,
@@ -198,16 +490,7 @@ class GraphDatabase(BlueprintsGraphDatabase):
         if isinstance(label, (list, tuple)) and not label:
             return
         script = self._prepare_script(for_node=True, label=label)
-        where = None
-        params = []
-        if lookups:
-            wheres = q_lookup_builder()
-            for lookup in lookups:
-                if isinstance(lookup, q_lookup_builder):
-                    wheres &= lookup
-                elif isinstance(lookup, dict):
-                    wheres &= q_lookup_builder(**lookup)
-            where, params = wheres.get_query_objects(var="n")
+        where, params = self._get_lookups_where(lookups, var="n")
         if where:
             script = u"%s where %s return " % (script, where)
         else:
@@ -218,11 +501,10 @@ class GraphDatabase(BlueprintsGraphDatabase):
             script = u"%s id(n)" % script
         if order_by:
             script = u"%s order by n.`%s` %s " % (script, order_by[0][0].replace('`', '\`'), order_by[0][1])
-        page = 1000
+        page = limit or 1000
         skip = offset or 0
-        limit = limit or page
         try:
-            paged_script = "%s skip %s limit %s" % (script, skip, limit)
+            paged_script = "%s skip %s limit %s" % (script, skip, page)
             result = cypher(query=paged_script, params=params)
         except:
             result = None
@@ -240,11 +522,12 @@ class GraphDatabase(BlueprintsGraphDatabase):
                         yield (element[0], None, element[1])
                     else:
                         yield (element[0], None, None)
-            skip += limit
-            if len(result["data"]) == limit:
+            skip += page
+            # If a limit is provided, only that window is fetched
+            if limit is None and len(result["data"]) == page:
                 try:
                     paged_script = "%s skip %s limit %s" % (script, skip,
-                                                            limit)
+                                                            page)
                     result = cypher(query=paged_script, params=params)
                 except:
                     result = None
@@ -266,16 +549,7 @@ class GraphDatabase(BlueprintsGraphDatabase):
             return
         script = self._prepare_script(for_node=False, label=label)
         script = """%s match a-[r]->b """ % script
-        where = None
-        params = []
-        if lookups:
-            wheres = q_lookup_builder()
-            for lookup in lookups:
-                if isinstance(lookup, q_lookup_builder):
-                    wheres &= lookup
-                elif isinstance(lookup, dict):
-                    wheres &= q_lookup_builder(**lookup)
-            where, params = wheres.get_query_objects(var="r")
+        where, params = self._get_lookups_where(lookups, var="r")
         if include_properties:
             type_or_r = "r"
         else:
@@ -288,11 +562,10 @@ class GraphDatabase(BlueprintsGraphDatabase):
                      % (script, type_or_r)
         if order_by:
             script = u"%s order by n.`%s` %s " % (script, order_by[0][0].replace('`', '\`'), order_by[0][1])
-        page = 1000
+        page = limit or 1000
         skip = offset or 0
-        limit = limit or page
         try:
-            paged_script = "%s skip %s limit %s" % (script, skip, limit)
+            paged_script = "%s skip %s limit %s" % (script, skip, page)
             result = cypher(query=paged_script, params=params)
         except:
             result = None
@@ -326,67 +599,222 @@ class GraphDatabase(BlueprintsGraphDatabase):
                 for element in result["data"]:
                     yield (element[0], None, element[1])
             skip += page
-            if len(result["data"]) == limit:
+            # If a limit is provided, only that window is fetched
+            if limit is None and len(result["data"]) == page:
                 try:
                     paged_script = "%s skip %s limit %s" % (script, skip,
-                                                            limit)
+                                                            page)
                     result = cypher(query=paged_script, params=params)
                 except:
                     result = None
             else:
                 break
 
+    def _batch(self, jobs):
+        """
+        Send the list of "jobs" to the batch endpoint in just one request.
+        Neo4j executes all of them in the same transaction.
+        """
+        neograph = self.gdb.neograph
+        response = Request(**neograph._auth).post(neograph._batch, data=jobs)
+        if response.status_code != 200:
+            raise GraphDatabaseError("Batch request failed with status %s"
+                                     % response.status_code)
+        return response.json()
+
+    def _batch_path(self, url):
+        return u"/%s" % url.replace(self.gdb.neograph.url, u"").lstrip(u"/")
+
+    def _batch_create(self, elements, index_url, create_job):
+        """
+        Create "elements" using two batch requests: the first one creates
+        the elements and indexes them by label and graph, and the second one
+        sets the internal "_id" property and indexes them by id.
+        """
+        index_path = self._batch_path(index_url)
+        jobs = []
+        element_jobs = []
+        for element in elements:
+            job_id = len(jobs)
+            label, to, body = create_job(*element)
+            jobs.append({"method": "POST", "to": to, "body": body,
+                         "id": job_id})
+            element_jobs.append(job_id)
+            for key, value in (("label", label),
+                               ("graph", self.graph_id)):
+                jobs.append({"method": "POST", "to": index_path,
+                             "body": {"key": key, "value": value,
+                                      "uri": u"{%s}" % job_id},
+                             "id": len(jobs)})
+        results = dict((result["id"], result) for result in self._batch(jobs))
+        ids = []
+        jobs = []
+        for job_id in element_jobs:
+            url = results[job_id]["body"]["self"]
+            element_id = int(url.rpartition("/")[2])
+            ids.append(element_id)
+            jobs.append({"method": "PUT",
+                         "to": u"%s/properties/_id" % self._batch_path(url),
+                         "body": element_id, "id": len(jobs)})
+            jobs.append({"method": "POST", "to": index_path,
+                         "body": {"key": "id", "value": str(element_id),
+                                  "uri": url},
+                         "id": len(jobs)})
+        if jobs:
+            self._batch(jobs)
+        return ids
+
+    def _get_batch_properties(self, label, properties):
+        # Label must be a string
+        if not label or not isinstance(label, basestring):
+            raise TypeError("label must be a string")
+        body = {}
+        if isinstance(properties, dict):
+            # Properties starting with _ are not allowed
+            for key in properties.keys():
+                self._validate_property(key)
+            body.update(properties)
+        body["%slabel" % self.PRIVATE_PREFIX] = label
+        body["%sgraph" % self.PRIVATE_PREFIX] = self.graph_id
+        return body
+
+    def create_nodes(self, nodes):
+        """
+        Create the nodes in the iterable "nodes" of tuples (label,
+        properties) using batch requests of BATCH_SIZE nodes.
+        Return the list of ids created.
+        """
+        def create_job(label, properties):
+            return (label, u"/node",
+                    self._get_batch_properties(label, properties))
+
+        ids = []
+        for chunk in chunked(nodes, BATCH_SIZE):
+            ids += self._batch_create(chunk, self.nidx.url, create_job)
+        return ids
+
+    def create_relationships(self, relationships):
+        """
+        Create the relationships in the iterable "relationships" of tuples
+        (id1, id2, label, properties) using batch requests of BATCH_SIZE
+        relationships. Return the list of ids created.
+        """
+        nodes_url = self.gdb.neograph._node
+
+        def create_job(id1, id2, label, properties):
+            return (label, u"/node/%s/relationships" % id1, {
+                "to": u"%s/%s" % (nodes_url, id2),
+                "type": label,
+                "data": self._get_batch_properties(label, properties),
+            })
+
+        ids = []
+        for chunk in chunked(relationships, BATCH_SIZE):
+            ids += self._batch_create(chunk, self.ridx.url, create_job)
+        return ids
+
     def lookup_builder(self):
         return q_lookup_builder
 
     def query(self, query_dict, limit=None, offset=None, order_by=None,
-              headers=None, only_ids=None):
-        results_list = []
-        script, query_params = self._query_generator(query_dict, only_ids)
-        cypher = self.cypher
-        page = 1000
+              headers=None, only_ids=None, lazy=False):
+        """
+        Run the query built from "query_dict" and return a list of rows.
+        If "limit" is provided, only that many rows starting at "offset" are
+        fetched. Otherwise, all the rows are fetched in pages.
+        If "headers" is True, the first row is the list of columns.
+        If "lazy" is True, return a generator that fetches the pages while
+        the rows are consumed, instead of a list.
+        """
+        rows = self._query_rows(query_dict, limit, offset, order_by, headers,
+                                only_ids)
+        if lazy:
+            return rows
+        return list(rows)
+
+    def _query_rows(self, query_dict, limit=None, offset=None, order_by=None,
+                    headers=None, only_ids=None):
+        script, query_params = self._compile_query(query_dict, order_by,
+                                                   only_ids)
         skip = offset or 0
-        limit = limit or page
-        if order_by is not None:
-            alias = order_by[0]
-            # We check if it is an aggregate
-            if alias == 'aggregate':
-                script = u"%s order by `%s` %s " % (script,
-                                                    order_by[1],
-                                                    order_by[2])
-            else:
-                script = u"%s order by `%s`.`%s` %s " % (script,
-                                                         alias.replace
-                                                         ('`', '\`'),
-                                                         order_by[1].replace
-                                                         ('`', '\`'),
-                                                         order_by[2])
-        try:
-            paged_script = "%s skip %s limit %s" % (script, skip, limit)
-            result = cypher(query=paged_script, params=query_params)
-        except:
-            result = None
+        page = limit or QUERY_PAGE_SIZE
+        result = self._query_page(script, query_params, skip, page)
         if headers is True and result and "columns" in result:
-                results_list.append(result["columns"])
+                yield result["columns"]
         while result and "data" in result and len(result["data"]) > 0:
             for element in result["data"]:
                 if "data" in element:
-                    results_list.append(element["data"])
+                    yield element["data"]
                 else:
-                    results_list.append(element)
-            skip += page
-            if len(result["data"]) == limit:
-                try:
-                    paged_script = "%s skip %s limit %s" % (script, skip,
-                                                            limit)
-                    result = cypher(query=paged_script, params=query_params)
-                except:
-                    result = None
-            else:
+                    yield element
+            if limit is not None or len(result["data"]) < page:
                 break
-        return results_list
+            skip += page
+            result = self._query_page(script, query_params, skip, page)
 
-    def _query_generator(self, query_dict, only_ids):
+    def query_count(self, query_dict, only_ids=None):
+        """
+        Get the number of rows of the query built from "query_dict", without
+        fetching them.
+        """
+        script, query_params = self._compile_query(query_dict,
+                                                   only_ids=only_ids,
+                                                   count=True)
+        try:
+            result = self.cypher(query=script, params=query_params)
+        except:
+            return 0
+        return self._clean_count(result)
+
+    def _compile_query(self, query_dict, order_by=None, only_ids=None,
+                       count=False):
+        """
+        Return the script and the parameters of the query built from
+        "query_dict". They are cached by graph, version of the schema,
+        query and options, so editing the schema invalidates them.
+        """
+        query_hash = hashlib.sha1(json.dumps(query_dict, sort_keys=True))
+        key = (self.graph_id, self.graph.schema.get_version(),
+               query_hash.hexdigest(), json.dumps(order_by), bool(only_ids),
+               count)
+        compiled = compiled_queries.get(key)
+        if compiled is None:
+            script, query_params = self._query_generator(query_dict, only_ids,
+                                                         count=count)
+            if not count:
+                script = self._query_order_by(script, order_by)
+            compiled = (script, query_params)
+            compiled_queries.set(key, compiled)
+        script, query_params = compiled
+        # A copy, so changes in the parameters don't alter the cached ones
+        return script, dict(query_params)
+
+    def _query_order_by(self, script, order_by):
+        if order_by is None:
+            return script
+        alias = order_by[0]
+        # We check if it is an aggregate
+        if alias == 'aggregate':
+            script = u"%s order by `%s` %s " % (script,
+                                                order_by[1],
+                                                order_by[2])
+        else:
+            script = u"%s order by `%s`.`%s` %s " % (script,
+                                                     alias.replace
+                                                     ('`', '\`'),
+                                                     order_by[1].replace
+                                                     ('`', '\`'),
+                                                     order_by[2])
+        return script
+
+    def _query_page(self, script, query_params, skip, limit):
+        try:
+            paged_script = u"%s skip %s limit %s" % (script, skip, limit)
+            return self.cypher(query=paged_script, params=query_params)
+        except:
+            return None
+
+    def _query_generator(self, query_dict, only_ids, count=False):
         distinct = ""
         conditions_dict = query_dict["conditions"]
         conditions_result = self._query_generator_conditions(conditions_dict)
@@ -399,7 +827,8 @@ class GraphDatabase(BlueprintsGraphDatabase):
         origins_dict = query_dict["origins"]
         origins = self._query_generator_origins(origins_dict, conditions_alias)
         results_dict = query_dict["results"]
-        results = self._query_generator_results(results_dict, only_ids)
+        results = self._query_generator_results(results_dict, only_ids,
+                                                count=count)
         patterns_list = []
         if "patterns" in query_dict:
             patterns_dict = query_dict["patterns"]
@@ -433,8 +862,14 @@ class GraphDatabase(BlueprintsGraphDatabase):
             has_distinct = False
         if has_distinct:
             distinct = u" DISTINCT"
-        q = u"START {0} {1}{2}RETURN{3}{4}".format(origins, match, where,
-                                                   distinct, results)
+        if count:
+            # The results are projected through WITH, so aggregates and
+            # distinct rows are grouped the same way, and only counted
+            q = u"START {0} {1}{2}WITH{3}{4} RETURN count(*)".format(
+                origins, match, where, distinct, results)
+        else:
+            q = u"START {0} {1}{2}RETURN{3}{4}".format(origins, match, where,
+                                                       distinct, results)
 
         return q, query_params
 
@@ -665,7 +1100,7 @@ class GraphDatabase(BlueprintsGraphDatabase):
         origins = u", ".join(origins_set)
         return origins
 
-    def _query_generator_results(self, results_dict, only_ids):
+    def _query_generator_results(self, results_dict, only_ids, count=False):
         results_set = set()
 
         for result_dict in results_dict:
@@ -704,6 +1139,10 @@ class GraphDatabase(BlueprintsGraphDatabase):
                                 unicode(alias).replace(u"`", u"\\`")
                             )
                             results_set.add(result)
+        if count:
+            # WITH needs every expression to be named
+            results_set = [u"{0} AS `_c{1}`".format(expression, i)
+                           for i, expression in enumerate(results_set)]
         properties_results = u", ".join(results_set)
 
         results = u" {0}".format(properties_results)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Thread-safe in-process cache that discards the least recently used
+    entries once there are more than "max_size" of them.
+    It also counts the hits and misses.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # Move it to the end as the most recently used
+            self._entries[key] = value
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while self.max_size and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """
+        Return a dictionary with the number of entries, hits and misses.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self):
+        return len(self._entries)
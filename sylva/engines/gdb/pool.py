@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from urlparse import urlparse
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_POOL_BLOCK = False
+DEFAULT_TIMEOUT = None
+DEFAULT_MAX_RETRIES = 0
+
+
+class PooledSession(Session):
+    """
+    HTTP session that keeps a pool of persistent (keep-alive) connections per
+    graph database server, applies the timeout configured for that server to
+    every request and collects some statistics.
+
+    There is only one session per process, so every web worker keeps its
+    own pools, limited to "pool_size" connections per server.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(PooledSession, self).__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._timeouts = {}
+        self._stats = {}
+
+    def _get_prefix(self, url):
+        parsed = urlparse(url)
+        if parsed.port:
+            netloc = u"%s:%s" % (parsed.hostname, parsed.port)
+        else:
+            netloc = parsed.hostname
+        return u"%s://%s/" % (parsed.scheme, netloc)
+
+    def mount_pool(self, url, pool_size=None, pool_block=None, timeout=None,
+                   max_retries=None):
+        """
+        Create the pool of connections for the server of "url", if it
+        doesn't exist yet. Return the prefix used to identify the pool.
+        """
+        prefix = self._get_prefix(url)
+        with self._lock:
+            if prefix not in self._timeouts:
+                if pool_size is None:
+                    pool_size = DEFAULT_POOL_SIZE
+                if pool_block is None:
+                    pool_block = DEFAULT_POOL_BLOCK
+                if timeout is None:
+                    timeout = DEFAULT_TIMEOUT
+                if max_retries is None:
+                    max_retries = DEFAULT_MAX_RETRIES
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=pool_size,
+                                      max_retries=max_retries,
+                                      pool_block=pool_block)
+                self.mount(prefix, adapter)
+                self._timeouts[prefix] = timeout
+                self._stats[prefix] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "time": 0.0,
+                    "pool_size": pool_size,
+                }
+        return prefix
+
+    def request(self, method, url, **kwargs):
+        prefix = self._get_prefix(url)
+        if prefix not in self._timeouts:
+            return super(PooledSession, self).request(method, url, **kwargs)
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self._timeouts[prefix]
+        start = time.time()
+        try:
+            response = super(PooledSession, self).request(method, url,
+                                                          **kwargs)
+        except:
+            self._update_stats(prefix, start, error=True)
+            raise
+        self._update_stats(prefix, start,
+                           error=(response.status_code >= 500))
+        return response
+
+    def _update_stats(self, prefix, start, error=False):
+        elapsed = time.time() - start
+        with self._lock:
+            stats = self._stats[prefix]
+            stats["requests"] += 1
+            stats["time"] += elapsed
+            if error:
+                stats["errors"] += 1
+
+    def get_stats(self):
+        """
+        Return a dictionary with the statistics of every pool: number of
+        requests, errors, time spent and open and idle connections.
+        """
+        pools_stats = {}
+        with self._lock:
+            for prefix, stats in self._stats.iteritems():
+                pool_stats = stats.copy()
+                connections = 0
+                idle = 0
+                pools = self.adapters[prefix].poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None and pool.pool is not None:
+                        connections += pool.num_connections
+                        idle += pool.pool.qsize()
+                pool_stats["connections"] = connections
+                pool_stats["idle"] = idle
+                pools_stats[prefix] = pool_stats
+        return pools_stats
+
+
+session = PooledSession()
+
+
+def mount_pool(url, params=None):
+    """
+    Create the pool for the server of "url" using the pool options in the
+    connection "params".
+    """
+    params = params or {}
+    return session.mount_pool(url,
+                              pool_size=params.get("pool_size"),
+                              pool_block=params.get("pool_block"),
+                              timeout=params.get("timeout"),
+                              max_retries=params.get("max_retries"))
+
+
+def get_stats():
+    return session.get_stats()
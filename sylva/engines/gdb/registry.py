@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class GraphDatabaseRegistry(object):
+    """
+    Process-wide registry of live graph database objects.
+
+    Graph databases are kept by (using, graph id) and the least recently
+    used ones are discarded once there are more than "max_size" of them.
+    Client connections are kept by URL, so all the graph databases of the
+    same server share them.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        self._gdbs = OrderedDict()
+        self._connections = {}
+
+    def get(self, using, graph_id):
+        key = (using, graph_id)
+        with self._lock:
+            gdb = self._gdbs.pop(key, None)
+            if gdb is not None:
+                # Move it to the end as the most recently used
+                self._gdbs[key] = gdb
+        return gdb
+
+    def register(self, using, graph_id, gdb):
+        with self._lock:
+            self._gdbs.pop((using, graph_id), None)
+            self._gdbs[(using, graph_id)] = gdb
+            while self.max_size and len(self._gdbs) > self.max_size:
+                self._gdbs.popitem(last=False)
+
+    def get_all(self, graph_id):
+        with self._lock:
+            return [gdb for (using, key), gdb in self._gdbs.items()
+                    if key == graph_id]
+
+    def unregister(self, graph_id):
+        with self._lock:
+            for using, key in self._gdbs.keys():
+                if key == graph_id:
+                    del self._gdbs[(using, key)]
+
+    def get_connection(self, url, connection_class):
+        """
+        Return the client connection for "url", creating it with
+        "connection_class" if there is none yet.
+        """
+        key = (url, connection_class)
+        connection = self._connections.get(key)
+        if connection is None:
+            connection = connection_class(url)
+            with self._lock:
+                connection = self._connections.setdefault(key, connection)
+        return connection
+
+    def clear(self):
+        with self._lock:
+            self._gdbs.clear()
+            self._connections.clear()
+
+    def __len__(self):
+        return len(self._gdbs)
+
+
+registry = GraphDatabaseRegistry(
+    max_size=getattr(settings, "GDB_REGISTRY_SIZE", 100))
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import string
+from itertools import islice
 from random import choice
 
 from django.conf import settings
-from django.core.cache import get_cache
 from django.utils.importlib import import_module
 
+from engines.gdb.registry import registry
+
 BACKENDS_DEPLOYMENT = {
     "engines.gdb.backends.neo4j": "engines.gdb.deployments.neo4j",
 }
@@ -14,9 +16,7 @@ BACKENDS_DEPLOYMENT.update(getattr(settings, "BACKENDS_DEPLOYMENT", {}))
 
 def get_gdb(graph, using="default"):
     # TODO: Add connection_props like cert_file and key_file
-    gdb_key = u"GDB_%s_%s_%s" % (using.upper(), graph.slug, graph.id)
-    cache = get_cache("gdb")
-    gdb = cache.get(gdb_key, None)
+    gdb = registry.get(using, graph.id)
     if not gdb:
         gdb_properties = settings.GRAPHDATABASES[using]
         connection_string = get_connection_string(gdb_properties)
@@ -24,12 +24,24 @@ def get_gdb(graph, using="default"):
         engine = gdb_properties["ENGINE"]
         module = import_module(engine)
         gdb = module.GraphDatabase(connection_string, connection_params,
-                                   graph=graph)
-        # We cache all public instances gdb objects
-        cache.set(gdb_key, gdb)
+                                   graph=detach(graph))
+        # We keep alive all public instances gdb objects
+        registry.register(using, graph.id, gdb)
     return gdb
 
 
+def detach(instance):
+    """
+    Copy of the fields of the model "instance", without its cached related
+    objects, so objects kept by the process don't share the instances of a
+    request, which can be changed under them.
+    """
+    fields = instance._meta.concrete_fields
+    return type(instance)(**dict((field.attname,
+                                  getattr(instance, field.attname))
+                                 for field in fields))
+
+
 def get_connection_string(properties):
     schema = properties["SCHEMA"]
     host = properties["HOST"]
@@ -61,6 +73,10 @@ def get_connection_params(properties):
         "key_file": properties.get("KEY_FILE", None),
         "cert_file": properties.get("CERT_FILE", None),
         "options": properties.get("OPTIONS", None),
+        "pool_size": properties.get("POOL_SIZE", None),
+        "pool_block": properties.get("POOL_BLOCK", None),
+        "timeout": properties.get("TIMEOUT", None),
+        "max_retries": properties.get("MAX_RETRIES", None),
     }
 
 
@@ -96,3 +112,14 @@ def generate_password(length=14, punctuation=False, extra_chars=""):
     if punctuation:
         chars += string.punctuation
     return ''.join(choice(chars) for x in range(length))
+
+
+def chunked(iterable, size):
+    """
+    Split "iterable" into lists of, at most, "size" elements.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
@@ -20,6 +20,12 @@ class Command(BaseCommand):
             default=False,
             help='Also takes into account partial totals per type and per '
                  'allowed relationship. It can be really slow.'),
+        make_option('--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='Only shows the differences between the totals and the '
+                 'graph database, without fixing them.'),
     )
     help = "\tSynchronize total nodes and total relationships denormalized " \
            "fields to the actual valies in the graph database."
@@ -47,20 +53,32 @@ class Command(BaseCommand):
         if not graphs:
             graphs = Graph.objects.all()
         self.stdout.write("Processing %s graphs...\n" % len(graphs))
+        dry_run = options.get("dry_run", False)
         for graph in graphs:
             self.stdout.write("\tGraph [%s] '%s': " % (graph.id, graph.slug))
+            # Only the totals are written, so the last modification dates
+            # and other fields changed meanwhile are kept
+            data = graph.data
+            total_nodes = graph.nodes.count()
+            total_relationships = graph.relationships.count()
+            self.stdout.write("%s nodes (%+d), %s relationships (%+d)\n" \
+                              % (total_nodes, total_nodes - data.total_nodes,
+                                 total_relationships,
+                                 total_relationships
+                                 - data.total_relationships))
+            if dry_run:
+                continue
             with transaction.atomic():
-                graph.data.total_nodes = graph.nodes.count()
-                graph.data.total_relationships = graph.relationships.count()
-                self.stdout.write("%s nodes, %s relationships\n" \
-                                  % (graph.data.total_nodes,
-                                     graph.data.total_relationships))
-                graph.data.save()
+                type(data).objects.filter(pk=data.pk).update(
+                    total_nodes=total_nodes,
+                    total_relationships=total_relationships)
                 if graph.schema and options.get("include_types", False):
                     for nodetype in graph.schema.nodetype_set.all():
-                        nodetype.total = nodetype.count()
-                        nodetype.save()
+                        nodetype.total = graph.nodes.count(
+                            label=nodetype.id)
+                        nodetype.save(update_fields=["total"])
                     for reltype in graph.schema.relationshiptype_set.all():
-                        reltype.total = reltype.count()
-                        reltype.save()
+                        reltype.total = graph.relationships.count(
+                            label=reltype.id)
+                        reltype.save(update_fields=["total"])
         self.stdout.write("Done\n")
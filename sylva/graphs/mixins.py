@@ -73,9 +73,73 @@ class GraphMixin(object):
         return self._q
     Q = property(_get_q)
 
-    def query(self, query_dict, order_by=None, headers=None, only_ids=None):
+    def query(self, query_dict, order_by=None, headers=None, only_ids=None,
+              limit=None, offset=None, lazy=False):
         return self.gdb.query(query_dict, order_by=order_by,
-                              headers=headers, only_ids=only_ids)
+                              headers=headers, only_ids=only_ids,
+                              limit=limit, offset=offset, lazy=lazy)
+
+    def query_count(self, query_dict, only_ids=None):
+        return self.gdb.query_count(query_dict, only_ids=only_ids)
+
+    def paginated_query(self, query_dict, order_by=None, only_ids=None,
+                        max_count=None):
+        """Return a lazy sequence of the rows of the query, which only fetches
+        the rows of the pages requested"""
+        return QuerySequence(self, query_dict, order_by=order_by,
+                             only_ids=only_ids, max_count=max_count)
+
+    def expand(self, node_ids, depth=1, fan_out=None, node_types=None,
+               relationship_types=None, max_neighbors=None):
+        """Return a tuple with the lists of nodes and relationships reached
+        from the nodes "node_ids" in at most "depth" hops, without repeated
+        elements. Every node only expands to "fan_out" neighbors, and only
+        the nodes and relationships of "node_types" and "relationship_types"
+        are followed, if provided. The expansion is done hop by hop, reading
+        at most "fan_out" neighbors per node and "max_neighbors" in total"""
+        nodes = {}
+        relationships = {}
+        # Only the nodes of the graph that exist are expanded
+        frontier = list(self.gdb.get_nodes_labels(node_ids))
+        reached = set(frontier)
+        read = 0
+        for hop in range(depth):
+            if not frontier or (max_neighbors is not None
+                                and read >= max_neighbors):
+                break
+            # The neighbors of every node are limited by the database
+            hop_neighbors = self.gdb.get_neighbors(
+                frontier, node_label=node_types,
+                relationship_label=relationship_types, limit=fan_out)
+            next_frontier = []
+            for node_tuple, rel_tuple, neighbor_tuple in hop_neighbors:
+                if max_neighbors is not None and read >= max_neighbors:
+                    break
+                read += 1
+                parent, child = [{"id": node_id, "properties": initial,
+                                  "label": node_label}
+                                 for node_id, initial, node_label
+                                 in (node_tuple, neighbor_tuple)]
+                if child["id"] not in reached:
+                    reached.add(child["id"])
+                    next_frontier.append(child["id"])
+                for node_dict in (parent, child):
+                    if node_dict["id"] not in nodes:
+                        nodes[node_dict["id"]] = Node(
+                            node_dict["id"], self,
+                            initial=node_dict["properties"],
+                            label=node_dict["label"])
+                rel_id, properties, label, source_id, target_id = rel_tuple
+                if rel_id not in relationships:
+                    if source_id == parent["id"]:
+                        source, target = parent, child
+                    else:
+                        source, target = child, parent
+                    relationships[rel_id] = Relationship(
+                        rel_id, self, initial=properties, label=label,
+                        source_dict=source, target_dict=target)
+            frontier = next_frontier
+        return nodes.values(), relationships.values()
 
     def destroy(self):
         """Delete nodes, relationships, internal indices, data, schema and
@@ -95,10 +159,11 @@ class BaseManager(object):
         self.schema = graph.schema
         self.data = graph.data
 
-    def _filter_dict(self, properties, itemtype):
+    def _filter_dict(self, properties, itemtype, property_keys=None):
         if properties:
             if self.schema:
-                property_keys = [p.key for p in itemtype.properties.all()]
+                if property_keys is None:
+                    property_keys = [p.key for p in itemtype.properties.all()]
                 popped = [properties.pop(k) for k in properties.keys()
                                             if (k not in property_keys
                                                 or unicode(k).startswith("_"))]
@@ -111,6 +176,31 @@ class BaseManager(object):
         else:
             return {}
 
+    def _bulk_prepare(self, elements, itemtypes):
+        """
+        Filter the properties of every tuple in "elements", whose two last
+        items are the label and the properties, fetching every type from
+        "itemtypes" just once. Return the list of tuples and a dictionary
+        with the number of elements per type.
+        """
+        prepared = []
+        totals = {}
+        cached_types = {}
+        for element in elements:
+            label, properties = element[-2:]
+            if self.schema:
+                if label not in cached_types:
+                    itemtype = itemtypes.get(pk=label)
+                    property_keys = [p.key for p in itemtype.properties.all()]
+                    cached_types[label] = (itemtype, property_keys)
+                itemtype, property_keys = cached_types[label]
+                if not self.graph.relaxed:
+                    properties = self._filter_dict(properties, itemtype,
+                                                   property_keys)
+                totals[itemtype] = totals.get(itemtype, 0) + 1
+            prepared.append(tuple(element[:-1]) + (properties, ))
+        return prepared, totals
+
     def get(self, node_id, *args, **kwargs):
         try:
             return self._get(node_id)
@@ -124,35 +214,55 @@ class BaseManager(object):
 
 
 class BaseSequence(Sequence):
+    """
+    Lazy sequence of elements returned by "iterator_func".
+    If "count_func" is provided, the length is calculated with it, receiving
+    the same "lookups" and "label", instead of fetching all the elements.
+    """
 
     def __init__(self, graph, iterator_func, *args, **kwargs):
         self.graph = graph
         self.func = iterator_func
+        self.count_func = kwargs.pop("count_func", None)
         self.args = args
         self.kwargs = kwargs
         self.elements = None
+        self._count = None
 
-    def __len__(self):
-        if not self.elements:
+    def _fetch(self):
+        if self.elements is None:
             eltos = self.func(*self.args, **self.kwargs)
             self.elements = self.create_list(eltos, with_labels=True)
-        return len(self.elements)
+        return self.elements
+
+    def __len__(self):
+        if self.elements is not None:
+            return len(self.elements)
+        if self.count_func is None:
+            return len(self._fetch())
+        if self._count is None:
+            self._count = self.count_func(self.kwargs.get("lookups", None),
+                                          label=self.kwargs.get("label", None))
+        return self._count
 
     def __getitem__(self, key):
         if isinstance(key, (int, float, long)):
-            if not self.elements:
-                eltos = self.func(*self.args, **self.kwargs)
-                self.elements = self.create_list(eltos, with_labels=True)
-            return self.elements[key]
+            return self._fetch()[key]
         elif isinstance(key, slice):
-            if not self.elements:
-                self.kwargs.update({
-                    "offset": key.start or 0,
-                    "limit": (key.start or 0) + (key.stop or 1),
-                })
-                eltos = self.func(*self.args, **self.kwargs)
-                return self.create_list(eltos, with_labels=True)[:]
-            return self.elements[key]
+            if self.elements is not None:
+                return self.elements[key]
+            start = key.start or 0
+            if start < 0 or (key.stop is not None and key.stop < 0):
+                return self._fetch()[key]
+            if key.stop is not None and key.stop <= start:
+                return []
+            # Only the window of the slice is fetched
+            kwargs = self.kwargs.copy()
+            kwargs["offset"] = start
+            if key.stop is not None:
+                kwargs["limit"] = key.stop - start
+            eltos = self.func(*self.args, **kwargs)
+            return self.create_list(eltos, with_labels=True)[::key.step]
         else:
             raise TypeError("key must be a number or a slice")
 
@@ -200,41 +310,65 @@ class NodesManager(BaseManager):
 
     def create(self, label, properties=None):
         if self.data.can_add_nodes():
-            with transaction.atomic():
-                if self.schema:
-                    nodetype = self.schema.nodetype_set.get(pk=label)
-                    if not self.graph.relaxed:
-                        properties = self._filter_dict(properties, nodetype)
-                    nodetype.total += 1
-                    nodetype.save()
-                self.data.total_nodes += 1
-                self.data.last_modified_nodes = datetime.now()
-                self.data.save()
+            if self.schema:
+                nodetype = self.schema.nodetype_set.get(pk=label)
+                if not self.graph.relaxed:
+                    properties = self._filter_dict(properties, nodetype)
             node_id = self.gdb.create_node(label=label, properties=properties)
+            self.data.counters.add_nodes(1, label=self.schema and label)
             node = Node(node_id, self.graph, initial=properties, label=label)
             return node
         else:
             raise NodesLimitReachedException
 
+    def bulk_create(self, nodes):
+        """
+        Create the nodes in the iterable "nodes" of tuples (label,
+        properties) sending them to the graph database in batches.
+        Return the list of nodes created.
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return []
+        if not self.data.can_add_nodes(len(nodes)):
+            raise NodesLimitReachedException
+        nodetypes = self.schema and self.schema.nodetype_set
+        nodes, totals = self._bulk_prepare(nodes, nodetypes)
+        node_ids = self.gdb.create_nodes(nodes)
+        counters = self.data.counters
+        with counters.batch():
+            for nodetype, total in totals.items():
+                counters.add_nodes(total, label=nodetype.pk)
+            untyped = len(nodes) - sum(totals.values())
+            if untyped:
+                counters.add_nodes(untyped)
+        return [Node(node_id, self.graph, initial=properties or {},
+                     label=label)
+                for node_id, (label, properties) in zip(node_ids, nodes)]
+
     def all(self):
         node_types = self.graph.schema.nodetype_set.all()
         node_labels = [str(node_type.id) for node_type in node_types]
         return NodeSequence(graph=self.graph,
                             iterator_func=self.gdb.get_filtered_nodes,
+                            count_func=self.gdb.get_filtered_nodes_count,
                             lookups=None,
                             label=node_labels,
                             include_properties=True)
 
     def filter(self, *lookups, **options):
+        count_func = self.gdb.get_filtered_nodes_count
         if "label" in options:
             label = options.get("label")
             if not lookups:
                 eltos = NodeSequence(graph=self.graph,
                                      iterator_func=self.gdb.get_nodes_by_label,
+                                     count_func=count_func,
                                      label=label, include_properties=True)
             else:
                 eltos = NodeSequence(graph=self.graph,
                                      iterator_func=self.gdb.get_filtered_nodes,
+                                     count_func=count_func,
                                      lookups=lookups,
                                      label=label,
                                      include_properties=True)
@@ -242,6 +376,7 @@ class NodesManager(BaseManager):
             eltos = NodeSequence(graph=self.graph,
                                  lookups=lookups,
                                  iterator_func=self.gdb.get_filtered_nodes,
+                                 count_func=count_func,
                                  include_properties=True)
         # We call __len__() to create the list of elements
         # eltos.__len__()
@@ -267,30 +402,32 @@ class NodesManager(BaseManager):
             label = options.get("label")
             eltos = self.gdb.get_nodes_by_label(label, include_properties=False)
             nodes_id = []
-            for node_id, n_props, n_label in eltos:
-                for relationship in self.get(node_id).relationships.all():
-                    relationship.delete()
-                nodes_id.append(node_id)
+            with self.data.counters.batch():
+                for node_id, n_props, n_label in eltos:
+                    for relationship in self.get(node_id).relationships.all():
+                        relationship.delete()
+                    nodes_id.append(node_id)
             count = self.gdb.delete_nodes(nodes_id)
             with transaction.atomic():
-                self.data.total_nodes -= count
-                self.data.last_modified_nodes = datetime.now()
-                self.data.save()
+                self.data.counters.log_deleted_nodes(nodes_id)
+                self.data.counters.add_nodes(-count)
                 if self.schema:
                     schema = self.schema
                     nodetype = schema.nodetype_set.get(pk=label)
                     nodetype.total = 0
-                    nodetype.save()
+                    nodetype.save(update_fields=["total"])
         elif "id" in options:
             node_ids = options.get("id")
             if isinstance(node_ids, (list, tuple)):
                 node_ids = list(node_ids)
-            for node_id in node_ids:
-                Node(node_id, self.graph).delete()
+            with self.data.counters.batch():
+                for node_id in node_ids:
+                    Node(node_id, self.graph).delete()
         else:
             eltos = self.gdb.get_all_nodes(include_properties=False)
             self.gdb.delete_nodes([node_id
                                    for node_id, n_props, n_label in eltos])
+            self.data.counters.log_reset_relationships()
             with transaction.atomic():
                 self.data.total_relationships = 0
                 self.data.total_nodes = 0
@@ -302,10 +439,10 @@ class NodesManager(BaseManager):
                     schema = self.schema
                     for nodetype in schema.nodetype_set.all():
                         nodetype.total = 0
-                        nodetype.save()
+                        nodetype.save(update_fields=["total"])
                     for reltype in schema.relationshiptype_set.all():
                         reltype.total = 0
-                        reltype.save()
+                        reltype.save(update_fields=["total"])
 
     def count(self, label=None):
         return self.gdb.get_nodes_count(label=label)
@@ -334,6 +471,62 @@ class RelationshipSequence(BaseSequence):
         return relationships
 
 
+class QuerySequence(Sequence):
+    """
+    Lazy sequence over the rows of a query, meant to be paginated.
+    The length is calculated with a count query and slicing only fetches
+    the rows of the slice. The columns are available after the first slice.
+    If "max_count" is provided, the rows after it are ignored.
+    """
+
+    def __init__(self, graph, query_dict, order_by=None, only_ids=None,
+                 max_count=None):
+        self.graph = graph
+        self.query_dict = query_dict
+        self.order_by = order_by
+        self.only_ids = only_ids
+        self.max_count = max_count
+        self.columns = None
+        self._total = None
+
+    def total(self):
+        """Return the number of rows of the query, without "max_count"."""
+        if self._total is None:
+            self._total = self.graph.gdb.query_count(self.query_dict,
+                                                     only_ids=self.only_ids)
+        return self._total
+
+    def count(self):
+        if self.max_count is not None:
+            return min(self.total(), self.max_count)
+        return self.total()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, long)):
+            if key < 0:
+                key += self.count()
+            rows = self[key:key + 1]
+            if not rows:
+                raise IndexError("query sequence index out of range")
+            return rows[0]
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(self.count())
+            if stop <= start:
+                return []
+            rows = self.graph.gdb.query(self.query_dict,
+                                        limit=stop - start, offset=start,
+                                        order_by=self.order_by,
+                                        headers=True, only_ids=self.only_ids)
+            if rows:
+                self.columns = rows[0]
+            return rows[1:][::step]
+        else:
+            raise TypeError("key must be a number or a slice")
+
+
 class RelationshipsManager(BaseManager):
     RelationshipDoesNotExist = RelationshipDoesNotExist
 
@@ -347,24 +540,91 @@ class RelationshipsManager(BaseManager):
         else:
             target_id = target
         if self.data.can_add_relationships():
-            with transaction.atomic():
-                if self.schema:
-                    reltype = self.schema.relationshiptype_set.get(pk=label)
-                    if not self.graph.relaxed:
-                        properties = self._filter_dict(properties, reltype)
-                    reltype.total += 1
-                    reltype.save()
-                self.data.total_relationships += 1
-                self.data.last_modified_relationships = datetime.now()
-                self.data.save()
+            if self.schema:
+                reltype = self.schema.relationshiptype_set.get(pk=label)
+                if not self.graph.relaxed:
+                    properties = self._filter_dict(properties, reltype)
             relationship_id = self.gdb.create_relationship(source_id, target_id,
                                                            label, properties)
+            self.data.counters.log_created_relationships(
+                [(relationship_id, source_id, target_id)])
+            self.data.counters.add_relationships(
+                1, label=self.schema and label)
             relationship = Relationship(relationship_id, self.graph,
                                         initial=properties)
             return relationship
         else:
             raise RelationshipsLimitReachedException
 
+    def bulk_create(self, relationships):
+        """
+        Create the relationships in the iterable "relationships" of tuples
+        (source, target, label, properties) sending them to the graph
+        database in batches. Source and target can be nodes or node ids.
+        Return the list of relationships created.
+        """
+        relationships = [
+            (isinstance(source, Node) and source.id or source,
+             isinstance(target, Node) and target.id or target,
+             label, properties)
+            for source, target, label, properties in relationships]
+        if not relationships:
+            return []
+        if not self.data.can_add_relationships(len(relationships)):
+            raise RelationshipsLimitReachedException
+        reltypes = self.schema and self.schema.relationshiptype_set
+        relationships, totals = self._bulk_prepare(relationships, reltypes)
+        relationship_ids = self.gdb.create_relationships(relationships)
+        counters = self.data.counters
+        with counters.batch():
+            counters.log_created_relationships(
+                (relationship_id, source, target)
+                for relationship_id, (source, target, label, properties)
+                in zip(relationship_ids, relationships))
+            for reltype, total in totals.items():
+                counters.add_relationships(total, label=reltype.pk)
+            untyped = len(relationships) - sum(totals.values())
+            if untyped:
+                counters.add_relationships(untyped)
+        return [Relationship(relationship_id, self.graph,
+                             initial=properties or {}, label=label)
+                for relationship_id, (source, target, label, properties)
+                in zip(relationship_ids, relationships)]
+
+    def bulk_create_by_type(self, relationships):
+        """
+        Create the relationships in the iterable "relationships" of tuples
+        (source_id, target_id, type_name, properties), checking at once
+        that all the endpoints are nodes of the graph and that the types
+        allow them, without fetching the nodes.
+        Return the list of relationships created.
+        """
+        relationships = [(int(source_id), int(target_id), type_name,
+                          properties or {})
+                         for source_id, target_id, type_name, properties
+                         in relationships]
+        if not relationships:
+            return []
+        node_ids = set()
+        for source_id, target_id, type_name, properties in relationships:
+            node_ids.update([source_id, target_id])
+        labels = self.gdb.get_nodes_labels(node_ids)
+        missing = node_ids.difference(labels)
+        if missing:
+            raise NodeDoesNotExist(min(missing))
+        reltypes = dict(((reltype.name, unicode(reltype.source_id),
+                          unicode(reltype.target_id)), reltype)
+                        for reltype in self.schema.relationshiptype_set.all())
+        prepared = []
+        for source_id, target_id, type_name, properties in relationships:
+            key = (type_name, unicode(labels[source_id]),
+                   unicode(labels[target_id]))
+            if key not in reltypes:
+                raise RelationshipType.DoesNotExist(type_name)
+            prepared.append((source_id, target_id, unicode(reltypes[key].id),
+                             properties))
+        return self.bulk_create(prepared)
+
     def all(self):
         relationship_types = self.graph.schema.relationshiptype_set.all()
         relationship_labels = [
@@ -373,26 +633,31 @@ class RelationshipsManager(BaseManager):
         return RelationshipSequence(
             graph=self.graph,
             iterator_func=self.gdb.get_filtered_relationships,
+            count_func=self.gdb.get_filtered_relationships_count,
             lookups=None,
             label=relationship_labels,
             include_properties=True)
 
     def filter(self, *lookups, **options):
+        count_func = self.gdb.get_filtered_relationships_count
         if "label" in options:
             label = options.get("label")
             if not lookups:
                 eltos = RelationshipSequence(graph=self.graph, label=label,
                             iterator_func=self.gdb.get_relationships_by_label,
+                            count_func=count_func,
                             include_properties=True)
             else:
                 eltos = RelationshipSequence(graph=self.graph, label=label,
                             lookups=lookups,
                             iterator_func=self.gdb.get_filtered_relationships,
+                            count_func=count_func,
                             include_properties=True)
         else:
-            eltos = RelationshipSequence(graph=self.graph, label=label,
+            eltos = RelationshipSequence(graph=self.graph,
                             lookups=lookups,
                             iterator_func=self.gdb.get_filtered_relationships,
+                            count_func=count_func,
                             include_properties=True)
         return eltos
 
@@ -422,27 +687,28 @@ class RelationshipsManager(BaseManager):
                 label,
                 include_properties=False
             )
-            count = self.gdb.delete_relationships(
-                [relationship_id for relationship_id, r_props, r_label in eltos]
-            )
+            relationship_ids = [relationship_id
+                                for relationship_id, r_props, r_label in eltos]
+            count = self.gdb.delete_relationships(relationship_ids)
             with transaction.atomic():
-                self.data.total_relationships -= count
-                self.data.last_modified_relationships = datetime.now()
-                self.data.save()
+                self.data.counters.log_deleted_relationships(relationship_ids)
+                self.data.counters.add_relationships(-count)
                 if self.schema:
                     schema = self.schema
                     reltype = schema.relationshiptype_set.get(pk=label)
                     reltype.total = 0
-                    reltype.save()
+                    reltype.save(update_fields=["total"])
         elif "id" in options:
             relationship_ids = options.get("id")
             if not isinstance(relationship_ids, (list, tuple)):
                 relationship_ids = [relationship_ids]
-            for relationship_id in relationship_ids:
-                Relationship(relationship_id, self.graph).delete()
+            with self.data.counters.batch():
+                for relationship_id in relationship_ids:
+                    Relationship(relationship_id, self.graph).delete()
         else:
             eltos = self.gdb.get_all_relationships(include_properties=False)
             self.gdb.delete_relationships(eltos)
+            self.data.counters.log_reset_relationships()
             with transaction.atomic():
                 self.data.total_relationships = 0
                 self.data.last_modified_relationships = datetime.now()
@@ -451,7 +717,7 @@ class RelationshipsManager(BaseManager):
                     schema = self.schema
                     for reltype in schema.relationshiptype_set.all():
                         reltype.total = 0
-                        reltype.save()
+                        reltype.save(update_fields=["total"])
 
     def count(self, label=None):
         return self.gdb.get_relationships_count(label=label)
@@ -475,19 +741,18 @@ class NodeRelationshipsManager(BaseManager):
             source_id = target.id
             target_id = self.node_id
         if self.data.can_add_relationships():
-            with transaction.atomic():
-                if self.schema:
-                    reltype = self.schema.relationshiptype_set.get(pk=label)
-                    if not self.graph.relaxed:
-                        properties = self._filter_dict(properties, reltype)
-                    reltype.total += 1
-                    reltype.save()
-                self.data.total_relationships += 1
-                self.data.save()
+            if self.schema:
+                reltype = self.schema.relationshiptype_set.get(pk=label)
+                if not self.graph.relaxed:
+                    properties = self._filter_dict(properties, reltype)
             relationship_id = self.gdb.create_relationship(source_id,
                                                            target_id,
                                                            label,
                                                            properties)
+            self.data.counters.log_created_relationships(
+                [(relationship_id, source_id, target_id)])
+            self.data.counters.add_relationships(
+                1, label=self.schema and label)
             relationship = Relationship(relationship_id, self.graph,
                                         initial=properties)
             return relationship
@@ -499,57 +764,48 @@ class NodeRelationshipsManager(BaseManager):
         relationship_labels = [
             str(relationship_type.id)
             for relationship_type in relationship_types]
-        relationships = []
         eltos = self.gdb.get_node_relationships(self.node_id,
                                                 include_properties=True,
                                                 label=relationship_labels)
-        for relationship_id, relationship_properties in eltos:
-            relationship = Relationship(relationship_id, self.graph,
-                                        initial=relationship_properties)
-            relationships.append(relationship)
-        return relationships
+        return self._create_relationship_list(eltos)
 
     def filter(self, **options):
         label = None
         if "label" in options:
             label = options.get("label")
-        relationships = []
         eltos = self.gdb.get_node_relationships(self.node_id,
                                                 include_properties=True,
                                                 label=label)
-        for relationship_id, relationship_properties in eltos:
-            relationship = Relationship(relationship_id, self.graph,
-                                        initial=relationship_properties)
-            relationships.append(relationship)
-        return relationships
+        return self._create_relationship_list(eltos)
 
     def _create_relationship_list(self, eltos):
+        # Backends able to fetch the endpoints along with the relationships
+        # return them too, so the relationships don't have to ask for them
         relationships = []
-        for relationship_id, relationship_properties in eltos:
-            relationship = Relationship(relationship_id, self.graph,
-                                        initial=relationship_properties)
+        for elto in eltos:
+            if len(elto) > 2:
+                rel_id, rel_props, rel_label, source, target = elto
+                relationship = Relationship(rel_id, self.graph,
+                                            initial=rel_props,
+                                            label=rel_label,
+                                            source_dict=source,
+                                            target_dict=target)
+            else:
+                rel_id, rel_props = elto
+                relationship = Relationship(rel_id, self.graph,
+                                            initial=rel_props)
             relationships.append(relationship)
         return relationships
 
     def incoming(self):
-        relationships = []
         eltos = self.gdb.get_node_relationships(self.node_id, incoming=True,
                                                 include_properties=True)
-        for relationship_id, relationship_properties in eltos:
-            relationship = Relationship(relationship_id, self.graph,
-                                        initial=relationship_properties)
-            relationships.append(relationship)
-        return relationships
+        return self._create_relationship_list(eltos)
 
     def outgoing(self):
-        relationships = []
         eltos = self.gdb.get_node_relationships(self.node_id, outgoing=True,
                                                 include_properties=True)
-        for relationship_id, relationship_properties in eltos:
-            relationship = Relationship(relationship_id, self.graph,
-                                        initial=relationship_properties)
-            relationships.append(relationship)
-        return relationships
+        return self._create_relationship_list(eltos)
 
     def iterator(self):
         iterator = self.gdb.get_node_relationships(include_properties=True)
@@ -590,6 +846,7 @@ class PropertyDict(dict):
             elif isinstance(self.element, Relationship):
                 self.element.gdb.update_relationship_properties(self.element.id,
                                                         properties=properties)
+            self.element._update_last_modified()
 
 
 class BaseElement(object):
@@ -732,22 +989,20 @@ class Node(BaseElement):
             self.__delitem__(key)
         else:
             label = self.label
-            with transaction.atomic():
-                self.data.total_nodes -= 1
-                self.data.last_modified_nodes = datetime.now()
-                self.data.save()
-                if self.schema:
-                    nodetype = self.schema.nodetype_set.get(pk=label)
-                    nodetype.total -= 1
-                    nodetype.save()
-                try:
-                    self.gdb.delete_node(self.id)
-                except:
-                    transaction.rollback()
+            try:
+                self.gdb.delete_node(self.id)
+            except:
+                pass
+            else:
+                self.data.counters.log_deleted_nodes([self.id])
+                self.data.counters.add_nodes(-1, label=self.schema and label)
             del self
 
     def get_type(self):
-        return NodeType.objects.get(id=self.label)
+        nodetype = self.schema.get_metadata().get_nodetype(self.label)
+        if nodetype is None:
+            return NodeType.objects.get(id=self.label)
+        return nodetype
 
     def _label_display(self):
         if self.schema:
@@ -756,13 +1011,14 @@ class Node(BaseElement):
             return self.label
 
     def to_json(self):
+        nodetype = self.get_type()
         return {
             'id': str(self.id),
             'nodetype': self.label_display,
             'properties': self.properties.copy(),
-            'nodetypeId': self.get_type().id,
+            'nodetypeId': nodetype.id,
             'label': self.display + ' (' + str(self.id) + ')',
-            'color': self.get_type().get_color(),
+            'color': self.schema.get_metadata().get_color(nodetype),
             'x': random.uniform(0, 1),
             'y': random.uniform(0, 1),
             'size': 1
@@ -777,10 +1033,15 @@ class Node(BaseElement):
     def __setitem__(self, key, value):
         self.gdb.set_node_property(self.id, key, value)
         self._properties[key] = value
+        self._update_last_modified()
 
     def __delitem__(self, key):
         self.gdb.delete_node_property(self.id, key)
         del self._properties[key]
+        self._update_last_modified()
+
+    def _update_last_modified(self):
+        self.data.counters.touch_nodes()
 
     def _get_label(self):
         if not self._label:
@@ -819,12 +1080,8 @@ class Node(BaseElement):
         return self._properties_to_display
 
     def _get_property_keys(self):
-        itemtypes = self.schema.nodetype_set.filter(pk=self.label)
-        if itemtypes:
-            property_keys = [p.key for p in itemtypes[0].properties.all()]
-        else:
-            property_keys = []
-        return property_keys
+        metadata = self.schema.get_metadata()
+        return metadata.get_node_property_keys(self.label)
 
     def _get_properties(self):
         if self._inital is None and self._properties is None:
@@ -837,11 +1094,13 @@ class Node(BaseElement):
         properties = self._filter_dict(properties)
         self.gdb.set_node_properties(self.id, properties=properties)
         self._properties = PropertyDict(self, properties)
+        self._update_last_modified()
         return self._properties
 
     def _del_properties(self):
         self.gdb.delete_node_properties()
         self._properties = {}
+        self._update_last_modified()
 
     properties = property(_get_properties, _set_properties, _del_properties)
     label_display = property(_label_display)
@@ -856,22 +1115,23 @@ class Relationship(BaseElement):
         if key:
             self.__delitem__(key)
         else:
-            with transaction.atomic():
-                self.data.total_relationships -= 1
-                self.data.save()
-                if self.schema:
-                    schema = self.schema
-                    reltype = schema.relationshiptype_set.get(pk=self.label)
-                    reltype.total -= 1
-                    reltype.save()
-                try:
-                    self.gdb.delete_relationship(self.id)
-                except:
-                    transaction.rollback()
+            label = self.label
+            try:
+                self.gdb.delete_relationship(self.id)
+            except:
+                pass
+            else:
+                self.data.counters.log_deleted_relationships([self.id])
+                self.data.counters.add_relationships(
+                    -1, label=self.schema and label)
             del self
 
     def get_type(self):
-        return RelationshipType.objects.get(id=self.label)
+        metadata = self.schema.get_metadata()
+        reltype = metadata.get_relationshiptype(self.label)
+        if reltype is None:
+            return RelationshipType.objects.get(id=self.label)
+        return reltype
 
     def _label_display(self):
         if self.schema:
@@ -880,14 +1140,16 @@ class Relationship(BaseElement):
             return self.label
 
     def to_json(self):
+        reltype = self.get_type()
+        metadata = self.schema.get_metadata()
         return {
             'id': str(self.id),
             'source': str(self.source.id),
             'target': str(self.target.id),
-            'reltypeId': self.get_type().id,
+            'reltypeId': reltype.id,
             'reltype': self.label_display,
-            'fullReltype': self.get_type().__unicode__(),
-            'color': self.get_type().get_color(),
+            'fullReltype': metadata.get_full_name(reltype),
+            'color': metadata.get_color(reltype),
             'properties': self.properties
         }
 
@@ -901,10 +1163,15 @@ class Relationship(BaseElement):
     def __setitem__(self, key, value):
         self.gdb.set_relationship_property(self.id, key, value)
         self._properties[key] = value
+        self._update_last_modified()
 
     def __delitem__(self, key):
         self.gdb.delete_relationship_property(self.id, key)
         del self._properties[key]
+        self._update_last_modified()
+
+    def _update_last_modified(self):
+        self.data.counters.touch_relationships()
 
     def _get_source(self):
         if not self._source:
@@ -914,6 +1181,9 @@ class Relationship(BaseElement):
 
     def _set_source(self, node):
         self.gdb.set_relationship_source(self.id, node.id)
+        # The relationship is created again with another id
+        self.data.counters.log_reset_relationships()
+        self._update_last_modified()
 
     source = property(_get_source, _set_source)
 
@@ -925,6 +1195,8 @@ class Relationship(BaseElement):
 
     def _set_target(self, node):
         self.gdb.set_relationship_target(self.id, node.id)
+        self.data.counters.log_reset_relationships()
+        self._update_last_modified()
 
     target = property(_get_target, _set_target)
 
@@ -935,12 +1207,8 @@ class Relationship(BaseElement):
     label = property(_get_label)
 
     def _get_property_keys(self):
-        itemtypes = self.schema.relationshiptype_set.filter(pk=self.label)
-        if itemtypes:
-            property_keys = [p.key for p in itemtypes[0].properties.all()]
-        else:
-            property_keys = []
-        return property_keys
+        metadata = self.schema.get_metadata()
+        return metadata.get_relationship_property_keys(self.label)
 
     def _get_properties(self):
         if self._inital is None and self._properties is None:
@@ -954,11 +1222,13 @@ class Relationship(BaseElement):
         self.gdb.set_relationship_properties(self.id,
                                              properties=properties)
         self._properties = PropertyDict(self, properties)
+        self._update_last_modified()
         return self._properties
 
     def _del_properties(self):
         self.gdb.delete_relationship_properties()
         self._properties = {}
+        self._update_last_modified()
 
     properties = property(_get_properties, _set_properties, _del_properties)
     label_display = property(_label_display)
@@ -8,11 +8,12 @@ from django.contrib.auth.models import User
 from django.utils.translation import gettext as _
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from guardian.shortcuts import assign_perm, get_users_with_perms, remove_perm
 
+from engines.gdb.registry import registry
 from sylva.fields import AutoSlugField
 from schemas.models import (Schema, NodeType, NodeProperty, RelationshipType,
                             RelationshipProperty)
@@ -179,29 +180,31 @@ class Graph(models.Model, GraphMixin):
         nodes_map = {}  # map old/new nodes IDs
         data = self.data
         new_data = new_graph.data
-        nodes = self.nodes.all()
-        for n in nodes:
+        old_ids = []
+        nodes = []
+        for n in self.nodes.all():
             node_label = int(n.label)
             if node_label in nodetypes_map:
-                nt = NodeType.objects.get(pk=nodetypes_map[node_label])
-                new_node = new_graph.nodes.create(label=unicode(nt.id),
-                                                  properties=n.properties)
-                nodes_map[n.id] = new_node
-        relations = self.relationships.all()
-        for r in relations:
+                old_ids.append(n.id)
+                nodes.append((unicode(nodetypes_map[node_label]),
+                              n.properties))
+        new_nodes = new_graph.nodes.bulk_create(nodes)
+        for old_id, new_node in zip(old_ids, new_nodes):
+            nodes_map[old_id] = new_node.id
+        relationships = []
+        for r in self.relationships.all():
             rel_label = int(r.label)
             if rel_label in relationtypes_map:
-                rt = RelationshipType.objects.get(
-                    pk=relationtypes_map[rel_label])
-                new_graph.relationships.create(nodes_map[r.source.id],
-                                               nodes_map[r.target.id],
-                                               label=unicode(rt.id),
-                                               properties=r.properties)
+                relationships.append((nodes_map[r.source.id],
+                                      nodes_map[r.target.id],
+                                      unicode(relationtypes_map[rel_label]),
+                                      r.properties))
+        new_graph.relationships.bulk_create(relationships)
         media_nodes = data.data.all()
         for mn in media_nodes:
             node_id = int(mn.node_id)
             if node_id in nodes_map:
-                new_mn = MediaNode(node_id=nodes_map[node_id].id,
+                new_mn = MediaNode(node_id=nodes_map[node_id],
                                    data=new_data)
                 new_mn.save()
                 media_links = mn.links.all()
@@ -294,3 +297,22 @@ def assign_permissions_to_owner(*args, **kwargs):
                 assign_perm(permission, anonymous, obj)
             elif anonymous.has_perm(permission, obj):
                 remove_perm(permission, anonymous, obj)
+
+
+@receiver(post_save, sender=Graph)
+def unregister_renamed_gdb(*args, **kwargs):
+    graph = kwargs.get("instance", None)
+    if graph:
+        # The registered graph databases have their own copy of the graph
+        # as it was when they were created
+        for gdb in registry.get_all(graph.id):
+            if gdb.graph.slug != graph.slug or gdb.graph.name != graph.name:
+                registry.unregister(graph.id)
+                break
+
+
+@receiver(post_delete, sender=Graph)
+def unregister_deleted_gdb(*args, **kwargs):
+    graph = kwargs.get("instance", None)
+    if graph:
+        registry.unregister(graph.id)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import csv
+import heapq
+import random
+
+from analytics.models import Analytic
+from engines.gdb.analysis.results import AnalyticResults
+from graphs.mixins import Node, Relationship
+
+DEGREE = "degree"
+STRATIFIED = "stratified"
+ANALYTIC = "analytic"
+STRATEGIES = (DEGREE, STRATIFIED, ANALYTIC)
+
+
+def sample_graph(graph, max_nodes, strategy=DEGREE, algorithm=None,
+                 max_relationships=None):
+    """
+    Returns a tuple with a sample of at most "max_nodes" nodes of the graph,
+    the relationships among them, at most "max_relationships", and a list of
+    dictionaries with the number of nodes left out per node type.
+    The nodes are chosen by "strategy":
+      - "degree": at random, weighted by their number of relationships.
+      - "stratified": at random, as many of every type as its share of the
+        graph.
+      - "analytic": those with the highest values in the last results of
+        the analytic "algorithm", falling back to "degree" without them.
+    """
+    nodetypes = list(graph.schema.nodetype_set.all())
+    node_ids = None
+    if strategy == ANALYTIC:
+        node_ids = _sample_by_analytic(graph, max_nodes, algorithm)
+    elif strategy == STRATIFIED:
+        node_ids = _sample_stratified(graph, max_nodes, nodetypes)
+    if node_ids is None:
+        node_ids = _sample_by_degree(graph, max_nodes, nodetypes)
+    nodes = [Node(node_id, graph, initial=properties, label=label)
+             for node_id, properties, label
+             in graph.gdb.get_nodes_by_ids(node_ids)]
+    relationships = [
+        Relationship(rel_id, graph, initial=properties, label=label,
+                     source_dict=source, target_dict=target)
+        for rel_id, properties, label, source, target
+        in graph.gdb.get_relationships_between(
+            [node.id for node in nodes], limit=max_relationships)]
+    sampled = {}
+    for node in nodes:
+        sampled[unicode(node.label)] = sampled.get(unicode(node.label), 0) + 1
+    collapsed = []
+    metadata = graph.schema.get_metadata()
+    for nodetype in nodetypes:
+        count = nodetype.count() - sampled.get(unicode(nodetype.id), 0)
+        if count > 0:
+            collapsed.append({
+                'id': u"collapsed-%s" % nodetype.id,
+                'nodetypeId': nodetype.id,
+                'nodetype': nodetype.name,
+                'label': u"%s (%s)" % (nodetype.name, count),
+                'color': metadata.get_color(nodetype),
+                'count': count,
+            })
+    return nodes, relationships, collapsed
+
+
+def _sample_by_degree(graph, max_nodes, nodetypes):
+    # Weighted random sampling without replacement, keeping just the
+    # "max_nodes" highest keys while the degrees are read
+    labels = [nodetype.id for nodetype in nodetypes]
+    keys = ((random.random() ** (1.0 / (degree + 1)), node_id)
+            for node_id, degree in graph.gdb.get_nodes_degrees(label=labels))
+    return [node_id for key, node_id in heapq.nlargest(max_nodes, keys)]
+
+
+def _sample_stratified(graph, max_nodes, nodetypes):
+    counts = [(nodetype, nodetype.count()) for nodetype in nodetypes]
+    total = sum(count for nodetype, count in counts)
+    if not total:
+        return []
+    node_ids = []
+    for nodetype, count in counts:
+        share = int(round(float(max_nodes) * count / total))
+        if count and not share:
+            share = 1
+        eltos = graph.gdb.get_nodes_by_label(nodetype.id,
+                                             include_properties=False)
+        node_ids.extend(_reservoir((elto[0] for elto in eltos), share))
+    return node_ids[:max_nodes]
+
+
+def _sample_by_analytic(graph, max_nodes, algorithm):
+    analytics = Analytic.objects.filter(dump__graph=graph,
+                                        algorithm=algorithm,
+                                        task_status="Ready").exclude(raw="")
+    try:
+        analytic = analytics.latest()
+    except Analytic.DoesNotExist:
+        return None
+    if analytic.values:
+        # Analytics saved before the results were binary
+        return _sample_by_analytic_csv(analytic, max_nodes)
+    try:
+        with analytic.get_raw_path() as raw_path:
+            top = AnalyticResults(raw_path).top(max_nodes)
+    except ValueError:
+        return None
+    return [node_id for node_id, value in top]
+
+
+def _sample_by_analytic_csv(analytic, max_nodes):
+    analytic.raw.open("r")
+    try:
+        reader = csv.reader(analytic.raw)
+        next(reader, None)  # Header
+        values = ((float(value), int(node_id)) for node_id, value in reader)
+        top = heapq.nlargest(max_nodes, values)
+    except (csv.Error, ValueError):
+        return None
+    finally:
+        analytic.raw.close()
+    return [node_id for value, node_id in top]
+
+
+def _reservoir(iterable, size):
+    """
+    Returns a random sample of "size" elements of "iterable" reading it
+    just once.
+    """
+    sample = []
+    for index, element in enumerate(iterable):
+        if index < size:
+            sample.append(element)
+        else:
+            position = random.randint(0, index)
+            if position < size:
+                sample[position] = element
+    return sample
@@ -121,14 +121,9 @@ var initAnalytics = function($) {
             point: {
               events: {
                 mouseOver: function() {
-                  var id = this.x, sylvaList;
-                  if(id in sylva.analyticAffectedNodes) {
-                    sylvaList = sylva.analyticAffectedNodes[id].map(String);
+                  getAffectedNodes(this.x, function(sylvaList) {
                     sylva.Sigma.changeSigmaTypes("aura", sylvaList);
-                  } else {
-                    // We have an error and do nothing
-                    console.log("There's an error highlighting the nodes");
-                  }
+                  });
                 },
                 mouseOut: function() {
                   var point = this;
@@ -144,16 +139,11 @@ var initAnalytics = function($) {
                   var point = this;
                   sylva.Sigma.cleanSigmaTypes();
                   if(!point.selected) {
-                    var id = this.x, sylvaList;
-                    if(id in sylva.analyticAffectedNodes) {
-                      sylvaList = sylva.analyticAffectedNodes[id].map(String);
+                    getAffectedNodes(this.x, function(sylvaList) {
                       sylva.Sigma.changeSigmaTypes("aura", sylvaList);
-                    } else {
-                      sylva.listClickNodes = [];
-                      console.log("There's an error highlighting nodes on click");
-                    }
-                    // We store the list of nodes
-                    sylva.listClickNodes = sylvaList;
+                      // We store the list of nodes
+                      sylva.listClickNodes = sylvaList;
+                    });
                   } else {
                     // We reset the list of nodes
                     sylva.listClickNodes = [];
@@ -202,14 +192,9 @@ var initAnalytics = function($) {
             point: {
               events: {
                 mouseOver: function() {
-                  var id = this.x, sylvaList;
-                  if(id in sylva.analyticAffectedNodes) {
-                    sylvaList = sylva.analyticAffectedNodes[id].map(String);
+                  getAffectedNodes(this.x, function(sylvaList) {
                     sylva.Sigma.changeSigmaTypes("aura", sylvaList);
-                  } else {
-                    // We have an error and do nothing
-                    console.log("There's an error highlighting the nodes on point over");
-                  }
+                  });
                 },
                 mouseOut: function() {
                   var point = this;
@@ -224,16 +209,11 @@ var initAnalytics = function($) {
                 click: function() {
                   var point = this;
                   if(!point.selected) {
-                    var id = this.x, sylvaList;
-                    if(id in sylva.analyticAffectedNodes) {
-                      sylvaList = sylva.analyticAffectedNodes[id].map(String);
+                    getAffectedNodes(this.x, function(sylvaList) {
                       sylva.Sigma.changeSigmaTypes("aura", sylvaList);
-                    } else {
-                      sylvaList = [];
-                      console.log("There's an error highlighting the nodes on point click");
-                    }
-                    // We store the list of nodes
-                    sylva.listClickNodes = sylvaList;
+                      // We store the list of nodes
+                      sylva.listClickNodes = sylvaList;
+                    });
                   } else {
                     sylva.Sigma.cleanSigmaTypes();
                     // We reset the list of nodes
@@ -256,6 +236,25 @@ var initAnalytics = function($) {
     return highchartsOptions;
   };
 
+  // get the nodes with the value of a point of the charts, only once
+  var getAffectedNodes = function(value, callback) {
+    if(value in sylva.analyticAffectedNodes) {
+      callback(sylva.analyticAffectedNodes[value]);
+    } else {
+      $.ajax({
+        type: "GET",
+        dataType: 'json',
+        url: sylva.analyticValuesUrl,
+        data: {"value": value}
+      }).done(function(data) {
+        sylva.analyticAffectedNodes[value] = data.map(String);
+        callback(sylva.analyticAffectedNodes[value]);
+      }).fail(function(e) {
+        console.log("There's an error getting the nodes of the analytic");
+      });
+    }
+  };
+
   // get results of the analytic
   var getResults = function(resultsUrl, algorithm, analyticId, analyticTaskStart, valuesUrl) {
     $.ajax({
@@ -321,25 +320,9 @@ var initAnalytics = function($) {
             });
           }
 
-          // We get the values data
-          $.ajax({
-            type: "GET",
-            dataType: 'json',
-            url: valuesUrl,
-            success: function(data) {
-              var sylvaKey;
-              sylva.analyticAffectedNodes = {}
-              for(var key in data) {
-                if(data.hasOwnProperty(key)) {
-                  sylvaKey = parseFloat(key);
-                  sylva.analyticAffectedNodes[sylvaKey] = data[key];
-                }
-              }
-            },
-            error: function(e) {
-              alert("Error: " + e);
-            }
-          });
+          // The nodes of every value are requested when needed
+          sylva.analyticValuesUrl = valuesUrl;
+          sylva.analyticAffectedNodes = {};
 
           // We remove the values in localStorage
           localStorage.clear()
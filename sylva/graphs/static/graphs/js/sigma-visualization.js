@@ -30,6 +30,8 @@
   var paperTool = null;
   // Layout algorithm state.
   var isDrawing = false;
+  // True when nodes of a streamed graph are added with the layout stopped.
+  var isLayoutOutdated = false;
   // True when the "Analytics" button is clicked.
   var isAnalyticsMode = false;
   // True when the "Fullscreen" button is clicked.
@@ -3049,6 +3051,94 @@
       $('#graph-rels-count').text(counter);
     },
 
+    // Function used while the graph is streamed, once it's already drawn.
+    addElements: function(nodes, relationships) {
+      sigInst = sigma.instances(0);
+      that = this;
+
+      /* The new nodes are selected if the whole graph was selected. While
+       * the graph is loaded, 'selectedNodes' may be 'nodeIds' itself.
+       */
+      var allSelected = sylva.size == sylva.selectedNodes.length;
+      var addSelected = allSelected && sylva.selectedNodes !== sylva.nodeIds;
+      // The visibility of every type is looked up just once per chunk.
+      var isVisible = function(kind, typeId, cache) {
+        if (!(typeId in cache)) {
+          var visibilityButton = $('.show-hide-' + kind + 's[data-' + kind + 'type-id="' + typeId + '"]');
+          cache[typeId] = visibilityButton.attr('data-action') == 'hide';
+        }
+        return cache[typeId];
+      };
+      var visibleNodetypes = {};
+      var visibleReltypes = {};
+
+      for (var i = 0; i < nodes.length; i++) {
+        var node = nodes[i];
+        sylva.nodeIds.push(node.id);
+        if (addSelected) {
+          sylva.selectedNodes.push(node.id);
+        }
+        sylva.nodetypes[node.nodetypeId].nodes.push(node.id);
+
+        if (isVisible('node', node.nodetypeId, visibleNodetypes)) {
+          node.hidden = false;
+          visibleNodeIds.push(node.id);
+        } else {
+          node.hidden = true;
+        }
+        sigInst.graph.addNode(node);
+      }
+
+      for (var i = 0; i < relationships.length; i++) {
+        var rel = relationships[i];
+        if (isVisible('rel', rel.reltypeId, visibleReltypes)) {
+          rel.hidden = false;
+          visibleRelIds.push(rel.id);
+        } else {
+          rel.hidden = true;
+        }
+        sylva.reltypes[rel.reltypeId].relationships.push(rel);
+        sigInst.graph.addEdge(rel);
+      }
+
+      /* The layout algorithm places the new nodes in its next iteration,
+       * and the edges are colored by their nodes once all of them are added.
+       */
+      sylva.size += nodes.length;
+      if (nodes.length && !isDrawing) {
+        isLayoutOutdated = true;
+      }
+      if (!allSelected) {
+        that.grayfyNonListedNodes(sylva.selectedNodes);
+      }
+      sigInst.refresh();
+
+      $('#graph-nodes-count').text(sylva.size);
+
+      var counter = 0;
+      for(var i in sylva.reltypes) {
+        counter += sylva.reltypes[i].relationships.length;
+      }
+      $('#graph-rels-count').text(counter);
+    },
+
+    // Function used when the streamed graph is complete.
+    finishElements: function() {
+      sigInst = sigma.instances(0);
+      that = this;
+
+      that.coloringEdges();
+
+      // The layout is resumed for the nodes added after it stopped.
+      if (isLayoutOutdated && !isDrawing) {
+        var drawHidden = $('#sigma-hidden-layout').prop('checked');
+        that.start(drawHidden);
+        that.addTimeout(timeout);
+      }
+      isLayoutOutdated = false;
+      sigInst.refresh();
+    },
+
     changeSigmaTypes: function(type, nodeList) {
       sigInst = sigma.instances(0);
 
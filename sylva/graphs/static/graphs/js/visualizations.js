@@ -21,6 +21,105 @@ sylva:true, alert:true */
   // the graph.
   var isAnalyticsMode = false;
 
+  /* It requests the graph as newline delimited JSON. The graph is drawn with
+   * the first chunk of nodes, and the next chunks of nodes and relationships
+   * are added to it as they are received.
+   */
+  var loadGraphStream = function(url, draw, error) {
+    var xhr = new XMLHttpRequest();
+    var graph = {nodes: [], edges: []};
+    var offset = 0;
+    var drawn = false;
+    var failed = false;
+
+    var fail = function() {
+      if (!failed) {
+        failed = true;
+        error();
+      }
+    };
+
+    var drawOnce = function() {
+      if (!drawn) {
+        drawn = true;
+        sylva.graph = graph;
+        draw();
+      }
+    };
+
+    var readLine = function(line) {
+      var data = JSON.parse(line);
+      if (data.type == 'meta') {
+        sylva.nodetypes = data.nodetypes;
+        sylva.reltypes = data.reltypes;
+        sylva.nodeIds = [];
+        sylva.size = 0;
+        sylva.collapsibles = data.collapsibles;
+        sylva.positions = data.positions;
+        sylva.searchLoadingImage = data.searchLoadingImage;
+        sylva.queries = data.queries;
+      } else if (data.type == 'nodes' && !drawn) {
+        for (var i = 0; i < data.nodes.length; i++) {
+          var node = data.nodes[i];
+          graph.nodes.push(node);
+          sylva.nodeIds.push(node.id);
+          sylva.nodetypes[node.nodetypeId].nodes.push(node.id);
+        }
+        sylva.size += data.nodes.length;
+        drawOnce();
+      } else if (data.type == 'nodes') {
+        sylva.Sigma.addElements(data.nodes, []);
+      } else if (data.type == 'edges') {
+        sylva.Sigma.addElements([], data.edges);
+      } else if (data.type == 'end') {
+        if (drawn) {
+          sylva.Sigma.finishElements();
+        }
+        drawOnce();
+      }
+    };
+
+    // Only the complete lines received so far are read.
+    var readLines = function() {
+      var text = xhr.responseText;
+      var end = text.lastIndexOf('\n');
+      if (failed || end < offset) {
+        return;
+      }
+      var lines = text.substring(offset, end).split('\n');
+      offset = end + 1;
+      try {
+        for (var i = 0; i < lines.length; i++) {
+          if (lines[i]) {
+            readLine(lines[i]);
+          }
+        }
+      } catch (e) {
+        console.log('Sylva: Error reading the graph: ' + e);
+        fail();
+      }
+    };
+
+    xhr.open('GET', url, true);
+    xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+    xhr.onprogress = function() {
+      if (xhr.status == 200) {
+        readLines();
+      }
+    };
+    xhr.onload = function() {
+      if (xhr.status == 200) {
+        readLines();
+      }
+      // The stream ended before the graph could be drawn.
+      if (!drawn) {
+        fail();
+      }
+    };
+    xhr.onerror = fail;
+    xhr.send();
+  };
+
   // DOM
   $(function() {
 
@@ -78,23 +177,10 @@ sylva:true, alert:true */
 
       // Graph rendering
 
-      var jqxhr = $.getJSON(sylva.urls.viewGraphAjax, function(data) {
+      var drawGraph = function() {
         $('#graph-loading').remove();
         spinner.stop();
 
-        // Full graph
-        sylva.graph = data.graph
-
-        // Other data
-        sylva.nodetypes = data.nodetypes;
-        sylva.reltypes = data.reltypes;
-        sylva.nodeIds = data.nodeIds;
-        sylva.size = data.size;
-        sylva.collapsibles = data.collapsibles;
-        sylva.positions = data.positions;
-        sylva.searchLoadingImage = data.searchLoadingImage;
-        sylva.queries = data.queries;
-
         $('#graph-support').hide();
         $('#graph-node-types').show();
         $('#sigma-wrapper').removeAttr('style');
@@ -132,10 +218,10 @@ sylva:true, alert:true */
 
           $('#sigma-go-analytics').click();
         }
-      });
+      };
 
       // Error handling.
-      jqxhr.error(function() {
+      var showError = function() {
         $('#graph-loading').remove();
         spinner.stop();
 
@@ -143,7 +229,31 @@ sylva:true, alert:true */
 
         var msg = gettext("Oops! Something went wrong with the server. Please, reload the page.");
         $('#sigma-container').html('<div class="graph-empty-message">' + msg + '</div>');
-      });
+      };
+
+      if (sylva.urls.viewGraphStreamAjax) {
+        // The whole graph is drawn while it's received.
+        loadGraphStream(sylva.urls.viewGraphStreamAjax, drawGraph, showError);
+      } else {
+        var jqxhr = $.getJSON(sylva.urls.viewGraphAjax, function(data) {
+          // Full graph
+          sylva.graph = data.graph
+
+          // Other data
+          sylva.nodetypes = data.nodetypes;
+          sylva.reltypes = data.reltypes;
+          sylva.nodeIds = data.nodeIds;
+          sylva.size = data.size;
+          sylva.collapsibles = data.collapsibles;
+          sylva.positions = data.positions;
+          sylva.searchLoadingImage = data.searchLoadingImage;
+          sylva.queries = data.queries;
+
+          drawGraph();
+        });
+
+        jqxhr.error(showError);
+      }
 
     }
 
@@ -1,4 +1,8 @@
 #-*- coding:utf-8 -*-
+import json
+import pandas as pd
+
+from datetime import datetime
 
 from django.test import TestCase
 
@@ -6,11 +10,17 @@ from django.contrib.auth import authenticate
 from django.test.client import Client, RequestFactory
 from django.contrib.auth.models import User
 
+from engines.gdb.backends.neo4j import compiled_queries
+from analytics.models import Analytic, Dump
+from data.counters import EDGE_CREATED, EDGE_DELETED, EDGES_RESET
+from data.models import Data
+from graphs import sampling
 from graphs.models import Graph
 from graphs.mixins import RelationshipDoesNotExist
 from graphs.mixins import NodeDoesNotExist
 from schemas.models import Schema, NodeType, RelationshipType
 
+import graphs.views
 import tools.views
 
 
@@ -32,6 +42,16 @@ class GraphTest(TestCase):
         self.graphName = "graphTest"
         self.graph = Graph.objects.create(name=self.graphName,
             schema=mySchema, owner=self.u)
+        self.query_dict = {
+            "conditions": [],
+            "origins": [{"alias": "test1", "type": "node", "type_id": 1}],
+            "results": [{"alias": "test1",
+                         "properties": [{"property": "property",
+                                         "aggregate": False,
+                                         "distinct": False}]}],
+            "patterns": [],
+            "meta": {"has_distinct": False, "with_statement": {}},
+        }
 
     def test_graph_creation(self):
         """
@@ -129,6 +149,168 @@ class GraphTest(TestCase):
             self.assertEqual(self.properties[key], value)
         Graph.objects.get(name=self.graphName).destroy()
 
+    def test_nodes_bulk_create(self):
+        """
+        Tests node creation in bulk
+        """
+        nodes = self.graph.nodes.bulk_create([
+            (self.label, self.properties),
+            (self.unicode_label, self.unicode_properties),
+            (self.label, None)])
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(self.graph.nodes.count(), 3)
+        self.assertEqual(self.graph.data.total_nodes, 3)
+        node = self.graph.nodes.get(nodes[0].id)
+        self.assertEqual(node.label, self.label)
+        self.assertEqual(node.properties, self.properties)
+        node = self.graph.nodes.get(nodes[2].id)
+        self.assertEqual(node.properties, {})
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_counters_batch(self):
+        """
+        Tests that the totals are written at the end of a batch
+        """
+        data = self.graph.data
+        with data.counters.batch():
+            node = self.graph.nodes.create(self.label, self.properties)
+            self.graph.nodes.create(self.label, self.properties)
+            node.delete()
+            self.assertEqual(Data.objects.get(pk=data.pk).total_nodes, 0)
+        self.assertEqual(data.total_nodes, 1)
+        data = Data.objects.get(pk=data.pk)
+        self.assertEqual(data.total_nodes, 1)
+        self.assertIsNotNone(data.last_modified_nodes)
+        self.assertEqual(NodeType.objects.get(pk=self.label).total, 1)
+        graph = Graph.objects.get(pk=self.graph.pk)
+        self.assertEqual(graph.last_modified, data.last_modified_nodes)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_counters_out_of_batch(self):
+        """
+        Tests that the totals are written as soon as a node is created
+        """
+        self.graph.nodes.create(self.label, self.properties)
+        data = Data.objects.get(pk=self.graph.data.pk)
+        self.assertEqual(data.total_nodes, 1)
+        self.assertIsNone(data.last_modified_relationships)
+        graph = Graph.objects.get(pk=self.graph.pk)
+        self.assertEqual(graph.last_modified, data.last_modified_nodes)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_graph_paginated_query(self):
+        """
+        Tests that a paginated query only fetches the rows of the slice
+        """
+        self.graph.nodes.bulk_create([(self.label, {"property": i})
+                                      for i in range(5)])
+        query_dict = self.query_dict
+        self.assertEqual(self.graph.query_count(query_dict), 5)
+        rows = self.graph.query(query_dict, limit=2, offset=1, headers=True,
+                                order_by=("test1", "property", "asc"))
+        self.assertEqual(rows, [[u"test1.property"], [1], [2]])
+        results = self.graph.paginated_query(query_dict, max_count=4)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results.total(), 5)
+        self.assertEqual(len(results[2:10]), 2)
+        self.assertEqual(results.columns, [u"test1.property"])
+        rows = self.graph.query(query_dict, headers=True, lazy=True)
+        self.assertNotIsInstance(rows, list)
+        self.assertEqual(next(rows), [u"test1.property"])
+        self.assertEqual(len(list(rows)), 5)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_graph_compiled_query(self):
+        """
+        Tests that compiled queries are reused until the schema changes
+        """
+        gdb = self.graph.gdb
+        script, params = gdb._compile_query(self.query_dict)
+        stats = compiled_queries.get_stats()
+        self.assertEqual(gdb._compile_query(self.query_dict),
+                         (script, params))
+        self.assertEqual(compiled_queries.get_stats()["hits"],
+                         stats["hits"] + 1)
+        nodetype = self.graph.schema.nodetype_set.get(pk=1)
+        nodetype.properties.create(key="property")
+        misses = compiled_queries.get_stats()["misses"]
+        gdb._compile_query(self.query_dict)
+        self.assertEqual(compiled_queries.get_stats()["misses"], misses + 1)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_nodes_sequence_count(self):
+        """
+        Tests that the length of a sequence doesn't fetch the nodes
+        """
+        self.graph.nodes.bulk_create([(self.label, {"property": i})
+                                      for i in range(5)])
+        nodes = self.graph.nodes.filter(label=self.label)
+        self.assertEqual(len(nodes), 5)
+        self.assertIsNone(nodes.elements)
+        self.assertEqual(len(nodes[1:3]), 2)
+        self.assertEqual(len(nodes[3:]), 2)
+        self.assertIsNone(nodes.elements)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_graph_data_stream(self):
+        """
+        Tests that the graph data is streamed in chunks of elements
+        """
+        self.graph.nodes.bulk_create([(self.label, {"property": i})
+                                      for i in range(3)])
+        chunk_size = graphs.views.GRAPH_DATA_CHUNK_SIZE
+        graphs.views.GRAPH_DATA_CHUNK_SIZE = 2
+        try:
+            lines = [json.loads(line) for line in
+                     graphs.views._stream_graph_data(self.graph)]
+        finally:
+            graphs.views.GRAPH_DATA_CHUNK_SIZE = chunk_size
+        self.assertEqual([line["type"] for line in lines],
+                         ["meta", "nodes", "nodes", "end"])
+        self.assertIn(self.label, lines[0]["nodetypes"])
+        self.assertEqual(len(lines[1]["nodes"]), 2)
+        self.assertEqual(len(lines[2]["nodes"]), 1)
+        self.assertEqual(lines[3]["size"], 3)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_graph_sample(self):
+        """
+        Tests that a sample of the graph collapses the rest of the nodes
+        """
+        self.graph.nodes.bulk_create([(self.label, {"property": i})
+                                      for i in range(5)])
+        for strategy in (sampling.DEGREE, sampling.STRATIFIED,
+                         sampling.ANALYTIC):
+            nodes, relationships, collapsed = sampling.sample_graph(
+                self.graph, 2, strategy=strategy, algorithm="pagerank")
+            self.assertEqual(len(nodes), 2)
+            self.assertEqual(len(set(node.id for node in nodes)), 2)
+            self.assertEqual(relationships, [])
+            self.assertEqual(len(collapsed), 1)
+            self.assertEqual(collapsed[0]["count"], 3)
+        Graph.objects.get(name=self.graphName).destroy()
+
+    def test_graph_sample_analytic(self):
+        """
+        Tests that a sample by an analytic takes the nodes with the highest
+        values in its results
+        """
+        nodes = self.graph.nodes.bulk_create([(self.label, {"property": i})
+                                              for i in range(5)])
+        dump = Dump.objects.create(graph=self.graph, data_hash="")
+        analytic = Analytic.objects.create(dump=dump, algorithm="pagerank",
+                                           task_status="Ready",
+                                           task_start=datetime.now())
+        results = pd.DataFrame({"__id": [node.id for node in nodes],
+                                "pagerank": [0.1, 0.5, 0.2, 0.4, 0.3]},
+                               columns=["__id", "pagerank"])
+        self.graph.gdb.analysis().save(results, analytic)
+        sampled, relationships, collapsed = sampling.sample_graph(
+            self.graph, 2, strategy=sampling.ANALYTIC, algorithm="pagerank")
+        self.assertEqual(set(node.id for node in sampled),
+                         set([nodes[1].id, nodes[3].id]))
+        Graph.objects.get(name=self.graphName).destroy()
+
     def test_nodes_set_properties(self):
         """
         Tests node creation
@@ -268,6 +450,153 @@ class RelationshipTest(TestCase):
         self.assertEqual(self.relationship.label, self.relationship_label)
         Graph.objects.get(name="Bob's graph").destroy()
 
+    def test_relationship_bulk_create(self):
+        """
+        Tests Relationship creation in bulk.
+        """
+        source, target = self.graph.nodes.bulk_create([
+            (self.node_label, None), (self.node_label, None)])
+        properties = {self.property_key: self.property_value}
+        relationships = self.graph.relationships.bulk_create([
+            (source, target, self.relationship_label, properties),
+            (source.id, target.id, self.relationship_label, None)])
+        self.assertEqual(len(relationships), 2)
+        relationship = self.graph.relationships.get(relationships[0].id)
+        self.assertEqual(relationship.label, self.relationship_label)
+        self.assertEqual(relationship.source.id, source.id)
+        self.assertEqual(relationship.target.id, target.id)
+        self.assertEqual(relationship.properties, properties)
+        self.assertEqual(self.graph.relationships.count(), 3)
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_node_relationships(self):
+        """
+        Tests the relationships of a node are fetched with their endpoints.
+        """
+        source = self.relationship.source
+        target = self.relationship.target
+        relationships = source.relationships.all()
+        self.assertEqual(len(relationships), 1)
+        relationship = relationships[0]
+        self.assertEqual(relationship.id, self.relationship_id)
+        self.assertEqual(relationship.label, self.relationship_label)
+        self.assertIsNotNone(relationship._source)
+        self.assertIsNotNone(relationship._target)
+        self.assertEqual(relationship.source.id, source.id)
+        self.assertEqual(relationship.target.id, target.id)
+        self.assertEqual(len(target.relationships.incoming()), 1)
+        self.assertEqual(len(target.relationships.outgoing()), 0)
+        self.assertEqual(
+            len(source.relationships.filter(label=self.relationship_label)),
+            1)
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_relationship_bulk_create_by_type(self):
+        """
+        Tests the bulk creation of relationships from node ids and type
+        names, checking the endpoints and the types.
+        """
+        nodetype = NodeType.objects.get(id=self.node_label)
+        RelationshipType.objects.create(
+            id=3, name="knows", schema=self.graph.schema, source=nodetype,
+            target=nodetype)
+        source = self.relationship.source
+        target = self.relationship.target
+        relationships = self.graph.relationships.bulk_create_by_type([
+            (source.id, target.id, "knows", {}),
+            (str(target.id), str(source.id), "knows", None)])
+        self.assertEqual(len(relationships), 2)
+        self.assertEqual(relationships[0].label, "3")
+        self.assertRaises(NodeDoesNotExist,
+                          self.graph.relationships.bulk_create_by_type,
+                          [(source.id, -1, "knows", {})])
+        self.assertRaises(RelationshipType.DoesNotExist,
+                          self.graph.relationships.bulk_create_by_type,
+                          [(source.id, target.id, "unknown", {})])
+        self.assertEqual(len(self.graph.relationships.all()), 3)
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_relationship_edge_changes(self):
+        """
+        Tests that the relationships created and deleted are logged for
+        patching the dumps.
+        """
+        relationship = self.graph.relationships.create(
+            self.relationship.source, self.relationship.target,
+            self.relationship_label)
+        relationship.delete()
+        changes = self.graph.edge_changes.order_by("id").values_list(
+            "action", "element_id", "source_id", "target_id")
+        self.assertEqual(list(changes)[-2:], [
+            (EDGE_CREATED, relationship.id, self.relationship.source.id,
+             self.relationship.target.id),
+            (EDGE_DELETED, relationship.id, None, None)])
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_relationship_edge_reset(self):
+        """
+        Tests that deleting all the relationships logs a reset.
+        """
+        self.graph.relationships.delete()
+        change = self.graph.edge_changes.latest("id")
+        self.assertEqual(change.action, EDGES_RESET)
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_graph_expand(self):
+        """
+        Tests the expansion of a node with a limited fan-out.
+        """
+        source = self.relationship.source
+        target = self.relationship.target
+        other = self.graph.nodes.create(label=self.node_label)
+        self.graph.relationships.create(source, other,
+                                        self.relationship_label)
+        nodes, relationships = self.graph.expand([source.id], depth=2)
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(len(relationships), 2)
+        nodes, relationships = self.graph.expand([source.id], fan_out=1)
+        self.assertEqual(len(nodes), 2)
+        self.assertEqual(len(relationships), 1)
+        self.assertEqual(relationships[0].source.id, source.id)
+        # Every node expands to its own neighbors
+        nodes, relationships = self.graph.expand([target.id, other.id],
+                                                 fan_out=1)
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(len(relationships), 2)
+        nodes, relationships = self.graph.expand([source.id], depth=2,
+                                                 max_neighbors=1)
+        self.assertEqual(len(relationships), 1)
+        nodes, relationships = self.graph.expand(
+            [source.id, target.id], relationship_types=["0"])
+        self.assertEqual(nodes, [])
+        Graph.objects.get(name="Bob's graph").destroy()
+
+    def test_schema_metadata(self):
+        """
+        Tests the types of the elements are taken from the schema metadata.
+        """
+        source = self.relationship.source
+        schema = self.graph.schema
+        version = schema.get_version()
+        source.to_json()
+        self.relationship.to_json()
+        with self.assertNumQueries(0):
+            node_json = source.to_json()
+            relationship_json = self.relationship.to_json()
+        # Reading the colors of the types doesn't save them
+        self.assertEqual(schema.get_version(), version)
+        # The version is checked again once the metadata expires
+        metadata = schema.get_metadata()
+        metadata.checked = 0
+        with self.assertNumQueries(1):
+            self.assertIs(schema.get_metadata(), metadata)
+        self.assertEqual(node_json["nodetypeId"], int(self.node_label))
+        self.assertEqual(relationship_json["reltypeId"],
+                         int(self.relationship_label))
+        self.assertEqual(self.relationship.label_display,
+                         "Bob's relationship type")
+        Graph.objects.get(name="Bob's graph").destroy()
+
     def test_relationship_edition(self):
         """
         Test Relationship edition from the created one.
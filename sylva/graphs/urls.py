@@ -39,9 +39,17 @@ urlpatterns = patterns('graphs.views',
     url(r'^(?P<graph_slug>[\w-]+)/nodes/(?P<node_id>\d+)/expand/$',
         'expand_node', name="expand_node"),
 
+    # expand several nodes some hops ajax request (JSON)
+    url(r'^(?P<graph_slug>[\w-]+)/nodes/expand/$', 'expand_nodes',
+        name="expand_nodes"),
+
     # graph data (JSON)
     url(r'^(?P<graph_slug>[\w-]+)/data/$', 'graph_data', name="graph_data"),
 
+    # graph data streamed in chunks (newline delimited JSON)
+    url(r'^(?P<graph_slug>[\w-]+)/data/stream/$', 'graph_data_stream',
+        name="graph_data_stream"),
+
     # nodes data (JSON)
     url(r'^(?P<graph_slug>[\w-]+)/data/(?P<node_id>\d+)/$', 'graph_data',
         name="nodes_data"),
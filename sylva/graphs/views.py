@@ -13,7 +13,7 @@ from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.shortcuts import (get_object_or_404, render_to_response, redirect,
                               HttpResponse)
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.utils.translation import gettext as _
 from django.views.decorators.http import condition
 from django.template import RequestContext
@@ -27,22 +27,23 @@ from data.models import Data
 from graphs.forms import (GraphForm, GraphDeleteConfirmForm, GraphCloneForm,
                           AddCollaboratorForm)
 from graphs.models import Graph, PERMISSIONS
+from graphs import sampling
 from graphs.utils import graph_last_modified
 from queries.models import Query
 from schemas.models import Schema
 from sylva.decorators import is_enabled
 
 
-def _jsonify_graph(graph, nodes_list, relations_list):
+GRAPH_DATA_CHUNK_SIZE = getattr(settings, "GRAPH_DATA_CHUNK_SIZE", 500)
+
+
+def _jsonify_types(graph):
     """
-    Returns a tuple with the elements of a graph jsonified. The 'graph'
-    parameter is used for obtain all the types.
+    Returns a tuple with the node types and the relationship types of the
+    graph jsonified, with empty lists for their elements.
     """
-    nodes = []
-    rels = []
     nodetypes = {}
     reltypes = {}
-    node_ids = []
     for nodetype in graph.schema.nodetype_set.all():
         nodetypes[nodetype.id] = {
             'id': nodetype.id,
@@ -61,15 +62,29 @@ def _jsonify_graph(graph, nodes_list, relations_list):
             'colorMode': reltype.get_color_mode(),
             'relationships': []
         }
+    return nodetypes, reltypes
+
+
+def _jsonify_graph(graph, nodes_list, relations_list):
+    """
+    Returns a tuple with the elements of a graph jsonified. The 'graph'
+    parameter is used for obtain all the types.
+    """
+    nodes = []
+    rels = []
+    node_ids = []
+    nodetypes, reltypes = _jsonify_types(graph)
+    node_ids_set = set()
     for node in nodes_list:
         nodes.append(node.to_json())
         node_ids.append(str(node.id))
+        node_ids_set.add(node.id)
         nodetype = node.get_type()
         nodetypes[nodetype.id]['nodes'].append(str(node.id))
     for rel in relations_list:
         source_id = rel.source.id
         target_id = rel.target.id
-        if (str(source_id) in node_ids and str(target_id) in node_ids):
+        if source_id in node_ids_set and target_id in node_ids_set:
             rel_json = rel.to_json()
             rels.append(rel_json)
             reltype = rel.get_type()
@@ -78,6 +93,78 @@ def _jsonify_graph(graph, nodes_list, relations_list):
     return (graph, nodetypes, reltypes, node_ids)
 
 
+def _jsonify_graph_options(graph):
+    """
+    Returns a dictionary with the options of the visualization of the graph.
+    """
+    collapsibles = []
+    positions = {}
+    if 'collapsibles' in graph.get_options():
+        collapsibles = graph.get_option('collapsibles')
+        positions = graph.get_option('positions')
+    search_loading_image = static('img/loading_24.gif')
+    queries = {query.id: query.name
+               for query in graph.queries.order_by('-id')[:10].reverse()}
+    # Maybe we can change the previous line if the query object would have
+    # a mod_date.
+    return {
+        'collapsibles': collapsibles,
+        'positions': positions,
+        'searchLoadingImage': search_loading_image,
+        'queries': queries
+    }
+
+
+def _stream_graph_data(graph):
+    """
+    Generator of the lines of the graph data as newline delimited JSON.
+    The first line has the types and the options, then the nodes and the
+    relationships come in chunks of GRAPH_DATA_CHUNK_SIZE elements as they
+    are read from the graph database, and the last line has the size.
+    Only the ids of the nodes are kept for filtering the relationships.
+    """
+    nodetypes, reltypes = _jsonify_types(graph)
+    meta = _jsonify_graph_options(graph)
+    meta.update({
+        'type': 'meta',
+        'nodetypes': nodetypes,
+        'reltypes': reltypes,
+    })
+    yield _ndjson_line(meta)
+    node_ids = set()
+    chunk = []
+    for node in graph.nodes.iterator():
+        node_ids.add(node.id)
+        chunk.append(node.to_json())
+        if len(chunk) >= GRAPH_DATA_CHUNK_SIZE:
+            yield _ndjson_line({'type': 'nodes', 'nodes': chunk})
+            chunk = []
+    if chunk:
+        yield _ndjson_line({'type': 'nodes', 'nodes': chunk})
+    chunk = []
+    for rel in graph.relationships.iterator():
+        if rel.source.id in node_ids and rel.target.id in node_ids:
+            chunk.append(rel.to_json())
+            if len(chunk) >= GRAPH_DATA_CHUNK_SIZE:
+                yield _ndjson_line({'type': 'edges', 'edges': chunk})
+                chunk = []
+    if chunk:
+        yield _ndjson_line({'type': 'edges', 'edges': chunk})
+    yield _ndjson_line({'type': 'end', 'size': len(node_ids)})
+
+
+def _ndjson_line(data):
+    return json.dumps(data) + "\n"
+
+
+def _get_positive_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
 @permission_required("graphs.view_graph", (Graph, "slug", "graph_slug"),
                      return_403=True)
 def graph_view(request, graph_slug, node_id=None):
@@ -85,6 +172,8 @@ def graph_view(request, graph_slug, node_id=None):
     is_graph_empty = graph.is_empty()
     is_schema_empty = graph.schema.is_empty()
     view_graph_ajax_url = ''
+    # The whole graph is streamed, so it's drawn while it's received
+    view_graph_stream_ajax_url = ''
     edit_nodetype_color_ajax_url = reverse(
         'schemas.views.schema_nodetype_edit_color', args=[graph.slug])
     edit_reltype_color_ajax_url = reverse(
@@ -99,6 +188,8 @@ def graph_view(request, graph_slug, node_id=None):
                                       args=[graph.slug, node_id])
     else:
         view_graph_ajax_url = reverse('graph_data', args=[graph.slug])
+        view_graph_stream_ajax_url = reverse('graph_data_stream',
+                                             args=[graph.slug])
     return render_to_response('graphs_view.html',
                               {"graph": graph,
                                "is_graph_empty": is_graph_empty,
@@ -107,6 +198,8 @@ def graph_view(request, graph_slug, node_id=None):
                                "node": node,
                                "view_graph_ajax_url":
                                   view_graph_ajax_url,
+                               "view_graph_stream_ajax_url":
+                                  view_graph_stream_ajax_url,
                                "edit_nodetype_color_ajax_url":
                                   edit_nodetype_color_ajax_url,
                                "edit_reltype_color_ajax_url":
@@ -385,6 +478,34 @@ def expand_node(request, graph_slug, node_id):
     return HttpResponse(json.dumps(node_neighbors))
 
 
+@permission_required("graphs.view_graph", (Graph, "slug", "graph_slug"),
+                     return_403=True)
+def expand_nodes(request, graph_slug):
+    """
+    Returns the nodes and relationships reached from the nodes "id" in at
+    most "depth" hops, following only the "nodetype" and "reltype" given,
+    and with at most "fan_out" neighbors per node.
+    """
+    graph = get_object_or_404(Graph, slug=graph_slug)
+    node_ids = [node_id for node_id in request.GET.getlist("id")
+                if node_id.isdigit()][:settings.EXPAND_MAX_NODES]
+    depth = _get_positive_int(request.GET.get("depth")) or 1
+    depth = min(depth, settings.EXPAND_MAX_DEPTH)
+    fan_out = _get_positive_int(request.GET.get("fan_out"))
+    node_types = request.GET.getlist("nodetype") or None
+    relationship_types = request.GET.getlist("reltype") or None
+    nodes, relationships = graph.expand(
+        node_ids, depth=depth, fan_out=fan_out, node_types=node_types,
+        relationship_types=relationship_types,
+        max_neighbors=settings.EXPAND_MAX_NEIGHBORS)
+    node_neighbors = {
+        "nodes": [node.to_json() for node in nodes],
+        "edges": [relationship.to_json() for relationship in relationships],
+    }
+    return HttpResponse(json.dumps(node_neighbors),
+                        content_type='application/json')
+
+
 @condition(last_modified_func=graph_last_modified)
 @permission_required("graphs.view_graph", (Graph, "slug", "graph_slug"),
                      return_403=True)
@@ -394,6 +515,15 @@ def graph_data(request, graph_slug, node_id=None):
         node = None
         nodes_list = []
         relations_list = []
+        collapsed = []
+        # Only a sample of the nodes is sent if there are more than the
+        # "max_nodes" requested, and the rest are collapsed by type
+        max_nodes = _get_positive_int(request.GET.get("max_nodes"))
+        max_relationships = _get_positive_int(
+            request.GET.get("max_relationships"))
+        strategy = request.GET.get("sampling", sampling.DEGREE)
+        if strategy not in sampling.STRATEGIES:
+            strategy = sampling.DEGREE
         if node_id:
             node = graph.nodes.get(node_id)
             nodes_list = [node]
@@ -403,38 +533,42 @@ def graph_data(request, graph_slug, node_id=None):
                     nodes_list.append(rel.target)
                 else:
                     nodes_list.append(rel.source)
+        elif max_nodes and graph.data.total_nodes > max_nodes:
+            nodes_list, relations_list, collapsed = sampling.sample_graph(
+                graph, max_nodes, strategy=strategy,
+                algorithm=request.GET.get("analytic"),
+                max_relationships=max_relationships)
         else:
             nodes_list = graph.nodes.all()
             relations_list = graph.relationships.all()
         graph_json, nodetypes, reltypes, node_ids = _jsonify_graph(
             graph, nodes_list, relations_list)
         size = len(nodes_list)
-        collapsibles = []
-        positions = {}
-        if 'collapsibles' in graph.get_options():
-            collapsibles = graph.get_option('collapsibles')
-            positions = graph.get_option('positions')
-        search_loading_image = static('img/loading_24.gif')
-        queries = {query.id: query.name
-                   for query in graph.queries.order_by('-id')[:10].reverse()}
-        # Maybe we can change the previous line if the query object would have
-        # a mod_date.
-        json_data = {
+        json_data = _jsonify_graph_options(graph)
+        json_data.update({
             'graph': graph_json,
             'nodetypes': nodetypes,
             'reltypes': reltypes,
             'nodeIds': node_ids,
             'size': size,
-            'collapsibles': collapsibles,
-            'positions': positions,
-            'searchLoadingImage': search_loading_image,
-            'queries': queries
-        }
+            'collapsed': collapsed,
+        })
         return HttpResponse(json.dumps(json_data), status=200,
                             content_type='application/json')
     raise Http404(_("Error: Invalid request (expected an AJAX request)"))
 
 
+@condition(last_modified_func=graph_last_modified)
+@permission_required("graphs.view_graph", (Graph, "slug", "graph_slug"),
+                     return_403=True)
+def graph_data_stream(request, graph_slug):
+    if (request.is_ajax() or settings.DEBUG):
+        graph = get_object_or_404(Graph, slug=graph_slug)
+        return StreamingHttpResponse(_stream_graph_data(graph), status=200,
+                                     content_type='application/x-ndjson')
+    raise Http404(_("Error: Invalid request (expected an AJAX request)"))
+
+
 @permission_required("graphs.view_graph", (Graph, "slug", "graph_slug"),
                      return_403=True)
 def graph_analytics_boxes_edit_position(request, graph_slug):
@@ -1,13 +1,25 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext as _
 from jsonfield import JSONField
 
+from engines.gdb.cache import LRUCache
 from graphs.models import Graph
 
 
 NUMBER_TYPES = ['number', 'float', 'auto_increment', 'auto_increment_update']
 AGGREGATES = ["Count", "Max", "Min", "Sum", "Average", "Deviation"]
+RESULTS_CACHE_SIZE = getattr(settings, "QUERY_RESULTS_CACHE_SIZE", 100)
+RESULTS_CACHE_MAX_ROWS = getattr(settings, "QUERY_RESULTS_CACHE_MAX_ROWS",
+                                 10000)
+
+# Results of the saved queries, valid while the graph is not modified.
+# Use results_cache.get_stats() for the number of hits and misses
+results_cache = LRUCache(max_size=RESULTS_CACHE_SIZE)
 
 
 class QueryManager(models.Manager):
@@ -59,5 +71,45 @@ class Query(models.Model):
                     break
         super(Query, self).save(*args, **kwargs)
 
-    def execute(self, order_by=None, headers=None, only_ids=None):
-        return self.graph.query(self.query_dict, order_by, headers, only_ids)
+    def execute(self, order_by=None, headers=None, only_ids=None,
+                limit=None, offset=None, lazy=False):
+        """Run the query. Results up to RESULTS_CACHE_MAX_ROWS rows are cached
+        until the graph or the query are modified"""
+        if not self.pk:
+            return self.graph.query(self.query_dict, order_by, headers,
+                                    only_ids, limit, offset, lazy)
+        key = self._get_results_key(order_by, headers, only_ids, limit,
+                                    offset)
+        results = results_cache.get(key)
+        if results is not None:
+            if lazy:
+                return iter(results)
+            return list(results)
+        results = self.graph.query(self.query_dict, order_by, headers,
+                                   only_ids, limit, offset, lazy)
+        if lazy:
+            return self._cache_results(key, results)
+        if len(results) <= RESULTS_CACHE_MAX_ROWS:
+            results_cache.set(key, list(results))
+        return results
+
+    def _get_results_key(self, *options):
+        # The graph could have been modified since it was fetched
+        last_modified = Graph.objects.filter(pk=self.graph_id).values_list(
+            "last_modified", flat=True).first()
+        query_hash = hashlib.sha1(json.dumps(self.query_dict, sort_keys=True))
+        return (self.pk, unicode(last_modified), query_hash.hexdigest(),
+                json.dumps(options))
+
+    def _cache_results(self, key, results):
+        rows = []
+        for row in results:
+            if rows is not None:
+                if len(rows) < RESULTS_CACHE_MAX_ROWS:
+                    rows.append(row)
+                else:
+                    # Too many rows to be cached
+                    rows = None
+            yield row
+        if rows is not None:
+            results_cache.set(key, rows)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+try:
+    import ujson as json
+except ImportError:
+    import json  # NOQA
+import hashlib
+import os
+# The keys are hashed from the standard JSON, since ujson can't sort keys
+from json import dumps as sorted_dumps
+import re
+import tempfile
+import time
+
+from django.conf import settings
+
+SNAPSHOTS_ROOT = getattr(settings, "QUERY_SNAPSHOTS_ROOT",
+                         os.path.join(tempfile.gettempdir(),
+                                      "sylva-snapshots"))
+SNAPSHOTS_TTL = getattr(settings, "QUERY_SNAPSHOTS_TTL", 60 * 60)
+KEY_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+class ResultsSnapshot(object):
+    """
+    Snapshot of the results of a query, kept out of the session in
+    SNAPSHOTS_ROOT for SNAPSHOTS_TTL seconds.
+
+    The snapshot stores the query and its headers when it is created. The
+    rows are spooled into a file, one JSON list per line, the first time
+    they are read, so later exports don't run the query again.
+    """
+
+    def __init__(self, key, graph_id=None, query_dict=None, order_by=None,
+                 query_name=None, headers_formatted=None, headers_raw=None):
+        self.key = key
+        self.graph_id = graph_id
+        self.query_dict = query_dict
+        self.order_by = order_by
+        self.query_name = query_name
+        self.headers_formatted = headers_formatted
+        self.headers_raw = headers_raw
+
+    @classmethod
+    def _get_path(cls, key, extension):
+        return os.path.join(SNAPSHOTS_ROOT, u"%s.%s" % (key, extension))
+
+    @classmethod
+    def _is_expired(cls, path):
+        return os.path.getmtime(path) + SNAPSHOTS_TTL < time.time()
+
+    @classmethod
+    def create(cls, graph, query_dict, order_by=None, query_name=None,
+               headers_formatted=None, headers_raw=None):
+        """
+        Create the snapshot for the results of "query_dict" sorted by
+        "order_by" in "graph", and return it. Its "key" is the handle to
+        get it later.
+        """
+        cls.purge()
+        key = hashlib.sha1(sorted_dumps([
+            graph.id, unicode(graph.last_modified), query_dict, order_by,
+            query_name, headers_formatted, headers_raw,
+        ], sort_keys=True)).hexdigest()
+        snapshot = cls(key, graph_id=graph.id, query_dict=query_dict,
+                       order_by=order_by, query_name=query_name,
+                       headers_formatted=headers_formatted,
+                       headers_raw=headers_raw)
+        if not os.path.isdir(SNAPSHOTS_ROOT):
+            try:
+                os.makedirs(SNAPSHOTS_ROOT)
+            except OSError:
+                # Created by another process in the meantime
+                pass
+        meta = {
+            "graph_id": snapshot.graph_id,
+            "query_dict": snapshot.query_dict,
+            "order_by": snapshot.order_by,
+            "query_name": snapshot.query_name,
+            "headers_formatted": snapshot.headers_formatted,
+            "headers_raw": snapshot.headers_raw,
+        }
+        cls._write(cls._get_path(key, "json"), json.dumps(meta))
+        return snapshot
+
+    @classmethod
+    def get(cls, key):
+        """
+        Return the snapshot for "key", or None if it doesn't exist or has
+        expired.
+        """
+        if not key or not KEY_RE.match(key):
+            return None
+        path = cls._get_path(key, "json")
+        try:
+            if cls._is_expired(path):
+                return None
+            with open(path) as meta_file:
+                meta = json.loads(meta_file.read())
+        except (IOError, OSError, ValueError):
+            return None
+        return cls(key, **dict((str(k), v) for k, v in meta.iteritems()))
+
+    @classmethod
+    def purge(cls):
+        """
+        Remove the files of the expired snapshots.
+        """
+        try:
+            filenames = os.listdir(SNAPSHOTS_ROOT)
+        except OSError:
+            return
+        for filename in filenames:
+            path = os.path.join(SNAPSHOTS_ROOT, filename)
+            try:
+                if cls._is_expired(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @classmethod
+    def _write(cls, path, content):
+        # Files are written under a temporary name and then renamed, so
+        # they are never read half written
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOTS_ROOT)
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                tmp_file.write(content)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def rows(self, graph):
+        """
+        Return a generator over the rows of the snapshot, being the first
+        one the list of columns. If they are not spooled yet, the query is
+        run on "graph" and they are spooled while consumed.
+        """
+        path = self._get_path(self.key, "rows")
+        try:
+            rows_file = open(path)
+        except IOError:
+            rows_file = None
+        if rows_file is not None:
+            with rows_file:
+                for line in rows_file:
+                    yield json.loads(line)
+            return
+        rows = graph.query(self.query_dict, order_by=self.order_by,
+                           headers=True, lazy=True)
+        # The rows are spooled while they are yielded to the caller, and the
+        # file is renamed only once all of them have been written
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOTS_ROOT)
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                for row in rows:
+                    tmp_file.write(json.dumps(row))
+                    tmp_file.write("\n")
+                    yield row
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -5,8 +5,14 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
+from django.contrib.auth.models import User
 from django.test import TestCase
 
+from graphs.models import Graph
+from queries.models import Query, results_cache
+from queries.snapshots import ResultsSnapshot
+from schemas.models import Schema, NodeType
+
 
 class SimpleTest(TestCase):
     def test_basic_addition(self):
@@ -14,3 +20,67 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class ResultsSnapshotTest(TestCase):
+    def setUp(self):
+        self.u = User.objects.create(username='john', password='doe',
+                                     is_active=True, is_staff=True)
+        schema = Schema.objects.create()
+        nt = NodeType(id=1, name="test", schema=schema)
+        nt.save()
+        self.graph = Graph.objects.create(name="graphTest", schema=schema,
+                                          owner=self.u)
+        self.query_dict = {
+            "conditions": [],
+            "origins": [{"alias": "test1", "type": "node", "type_id": 1}],
+            "results": [{"alias": "test1",
+                         "properties": [{"property": "property",
+                                         "aggregate": False,
+                                         "distinct": False}]}],
+            "patterns": [],
+            "meta": {"has_distinct": False, "with_statement": {}},
+        }
+
+    def tearDown(self):
+        self.graph.destroy()
+
+    def test_snapshot_rows(self):
+        """
+        Tests that the rows are spooled the first time they are read
+        """
+        self.graph.nodes.create("1", {"property": "value"})
+        headers = {u"test1.property": u"test1.property"}
+        snapshot = ResultsSnapshot.create(self.graph, self.query_dict,
+                                          query_name=u"query",
+                                          headers_formatted=headers,
+                                          headers_raw=headers.keys())
+        snapshot = ResultsSnapshot.get(snapshot.key)
+        self.assertEqual(snapshot.query_name, u"query")
+        self.assertEqual(snapshot.headers_formatted, headers)
+        rows = [[u"test1.property"], [u"value"]]
+        self.assertEqual(list(snapshot.rows(self.graph)), rows)
+        # The second time, the rows come from the spool file
+        self.graph.nodes.create("1", {"property": "other"})
+        self.assertEqual(list(snapshot.rows(self.graph)), rows)
+        self.assertIsNone(ResultsSnapshot.get("../" + snapshot.key))
+
+    def test_query_results_cache(self):
+        """
+        Tests that the results are cached until the graph is modified
+        """
+        self.graph.nodes.create("1", {"property": "value"})
+        query = Query.objects.create(graph=self.graph, name="query",
+                                     query_dict=self.query_dict,
+                                     query_aliases={}, query_fields={})
+        stats = results_cache.get_stats()
+        results = query.execute(headers=True)
+        self.assertEqual(results, [[u"test1.property"], [u"value"]])
+        self.assertEqual(query.execute(headers=True), results)
+        self.assertEqual(list(query.execute(headers=True, lazy=True)),
+                         results)
+        new_stats = results_cache.get_stats()
+        self.assertEqual(new_stats["misses"], stats["misses"] + 1)
+        self.assertEqual(new_stats["hits"], stats["hits"] + 2)
+        self.graph.nodes.create("1", {"property": "other"})
+        self.assertEqual(len(query.execute(headers=True)), 3)
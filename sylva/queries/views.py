@@ -25,6 +25,7 @@ from guardian.decorators import permission_required
 from sylva.decorators import is_enabled
 from graphs.models import Data, Graph
 from queries.grammar import QueryParser
+from queries.snapshots import ResultsSnapshot
 from schemas.models import NodeType, RelationshipType
 from queries.forms import (SaveQueryForm, QueryDeleteConfirmForm,
                            QueryOptionsForm)
@@ -336,10 +337,17 @@ def queries_new_results(request, graph_slug):
             dir_order_by = form.cleaned_data["dir_order_by"]
 
     headers = True
+    # The rows after "rows_number" are ignored unless showing them per page
+    if show_mode == DEFAULT_SHOW_MODE:
+        max_count = None
+    else:
+        max_count = rows_number
     if order_by_field == DEFAULT and select_order_by == DEFAULT:
-        query_results = graph.query(query_dict, headers=headers)
+        query_results = graph.paginated_query(query_dict,
+                                              max_count=max_count)
     elif order_by_field == NO_ORDER:
-        query_results = graph.query(query_dict, headers=headers)
+        query_results = graph.paginated_query(query_dict,
+                                              max_count=max_count)
     else:
         if order_by_field == DEFAULT and select_order_by != DEFAULT:
             order_by_field = select_order_by
@@ -361,29 +369,44 @@ def queries_new_results(request, graph_slug):
             alias = order_by_values[0]
             prop = order_by_values[1]
             order_by = (alias, prop, order_dir)
-        query_results = graph.query(query_dict,
-                                    order_by=order_by, headers=headers)
-        if not query_results:
+        query_results = graph.paginated_query(query_dict, order_by=order_by,
+                                              max_count=max_count)
+        # Sorting fails if the column has some none values
+        if query_results.count() and not query_results[:1]:
             messages.error(request,
                            _("Error: You are trying to sort a \
                               column with some none values"))
-            query_results = graph.query(query_dict, headers=headers)
+            query_results = graph.paginated_query(query_dict,
+                                                  max_count=max_count)
         # We need the order_dir for the icons in the frontend
         if order_dir == ASC:
             order_dir = DESC
         elif order_dir == DESC:
             order_dir = ASC
 
-    # We save the values to export as CSV
-    request.session["csv_results"] = query_results
-    request.session["query_name"] = NEW_QUERY
     # We store the results count in the session variable.
-    query_results_length = len(query_results)
-    request.session['results_count'] = query_results_length
+    request.session['results_count'] = query_results.total()
+
+    # We add pagination for the list of queries. Only the rows of the
+    # requested page are fetched from the graph database
+    page = request.GET.get('page', 1)
+    if show_mode == DEFAULT_SHOW_MODE:
+        page_size = rows_number
+    else:
+        page_size = settings.DATA_PAGE_SIZE
+    paginator = Paginator(query_results, page_size)
+    try:
+        paginated_results = paginator.page(page)
+    except PageNotAnInteger:
+        # If page is not an integer, deliver first page.
+        paginated_results = paginator.page(1)
+    except EmptyPage:
+        # If page is out of range (e.g. 9999), deliver last page of results.
+        paginated_results = paginator.page(paginator.num_pages)
 
     headers_final_results = dict()
     headers_query_results = []
-    if query_results_length > 1:
+    if query_results.columns and paginated_results:
         # We treat the headers
         if headers:
             # If the results have headers, we create a dictionary to have
@@ -399,7 +422,7 @@ def queries_new_results(request, graph_slug):
                 aliases = aliases['types']
             else:
                 aliases = query_aliases['types']
-            headers_query_results = query_results[0]
+            headers_query_results = query_results.columns
             # We need to split the headers by '.' to separate the alias from
             # the property
             for header in headers_query_results:
@@ -459,32 +482,15 @@ def queries_new_results(request, graph_slug):
                                                         show_alias)
                 # Finally, we add the key-value to our dictionary
                 headers_final_results[header] = show_alias
-        request.session['results_count'] = query_results_length - 1
-        query_results = query_results[1:]
-    else:
-        query_results = []
 
-    # We add the headers to the session to use them if we export the results
-    request.session["headers_formatted"] = headers_final_results
-    request.session["headers_raw"] = headers_query_results
-
-    # We add pagination for the list of queries
-    page = request.GET.get('page', 1)
-    try:
-        if show_mode == "per_page":
-            page_size = rows_number
-            paginator = Paginator(query_results, page_size)
-        else:
-            page_size = settings.DATA_PAGE_SIZE
-            query_results = query_results[:rows_number]
-            paginator = Paginator(query_results, page_size)
-        paginated_results = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page.
-        paginated_results = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range (e.g. 9999), deliver last page of results.
-        paginated_results = paginator.page(paginator.num_pages)
+    # We keep the query and the headers out of the session to export the
+    # results, and the session only keeps the handle of the snapshot
+    snapshot = ResultsSnapshot.create(graph, query_results.query_dict,
+                                      order_by=query_results.order_by,
+                                      query_name=NEW_QUERY,
+                                      headers_formatted=headers_final_results,
+                                      headers_raw=headers_query_results)
+    request.session["csv_snapshot"] = snapshot.key
 
     if as_modal:
         base_template = 'empty.html'
@@ -742,6 +748,11 @@ def queries_query_results(request, graph_slug, query_id):
             dir_order_by = form.cleaned_data["dir_order_by"]
 
     headers = True
+    # The rows after "rows_number" are ignored unless showing them per page
+    if show_mode == DEFAULT_SHOW_MODE:
+        max_count = None
+    else:
+        max_count = rows_number
     # This part of the code is similar to the same part in the
     # "queries_new_results". The main difference are the blocks
     # to check if we have modify the query or the sorting params
@@ -752,7 +763,8 @@ def queries_query_results(request, graph_slug, query_id):
             # We check if the type of query_dict is appropiate
             if not isinstance(query_dict, dict):
                 query_dict = json.loads(query_dict)
-            query_results = graph.query(query_dict, headers=headers)
+            query_results = graph.paginated_query(query_dict,
+                                                  max_count=max_count)
             request.session['query'] = json.dumps(query_dict)
             request.session['query_aliases'] = query_aliases
             request.session['query_fields'] = query_fields
@@ -764,7 +776,8 @@ def queries_query_results(request, graph_slug, query_id):
                 request.session['query_fields'] = query_fields
             query_has_changed = True
         else:
-            query_results = query.execute(headers=headers)
+            query_results = graph.paginated_query(query.query_dict,
+                                                  max_count=max_count)
             request.session['query'] = query.query_dict
             request.session['query_aliases'] = query.query_aliases
             request.session['query_fields'] = query.query_fields
@@ -774,7 +787,8 @@ def queries_query_results(request, graph_slug, query_id):
             # We check if the type of query_dict is appropiate
             if not isinstance(query_dict, dict):
                 query_dict = json.loads(query_dict)
-            query_results = graph.query(query_dict, headers=headers)
+            query_results = graph.paginated_query(query_dict,
+                                                  max_count=max_count)
             request.session['query'] = json.dumps(query_dict)
             request.session['query_aliases'] = query_aliases
             request.session['query_fields'] = query_fields
@@ -786,7 +800,8 @@ def queries_query_results(request, graph_slug, query_id):
                 request.session['query_fields'] = query_fields
             query_has_changed = True
         else:
-            query_results = query.execute(headers=headers)
+            query_results = graph.paginated_query(query.query_dict,
+                                                  max_count=max_count)
             request.session['query'] = query.query_dict
             request.session['query_aliases'] = query.query_aliases
             request.session['query_fields'] = query.query_fields
@@ -816,8 +831,9 @@ def queries_query_results(request, graph_slug, query_id):
             # We check if the type of query_dict is appropiate
             if not isinstance(query_dict, dict):
                 query_dict = json.loads(query_dict)
-            query_results = graph.query(query_dict, order_by=order_by,
-                                        headers=headers)
+            query_results = graph.paginated_query(query_dict,
+                                                  order_by=order_by,
+                                                  max_count=max_count)
             request.session['query'] = json.dumps(query_dict)
             if query_aliases == "" or query_fields == "":
                 query_aliases = request.session['query_aliases']
@@ -830,7 +846,9 @@ def queries_query_results(request, graph_slug, query_id):
                 request.session['query_fields'] = query_fields
             query_has_changed = True
         else:
-            query_results = query.execute(order_by=order_by, headers=headers)
+            query_results = graph.paginated_query(query.query_dict,
+                                                  order_by=order_by,
+                                                  max_count=max_count)
             # Let's check if the sorting params are different
             if different_sorting_params:
                 # We check if the type of query_field is appropiate
@@ -838,11 +856,13 @@ def queries_query_results(request, graph_slug, query_id):
                     query_fields = json.dumps(query_fields)
                 request.session['query_fields'] = query_fields
                 query_has_changed = True
-        if not query_results:
+        # Sorting fails if the column has some none values
+        if query_results.count() and not query_results[:1]:
             messages.error(request,
                            _("Error: You are trying to sort a \
                               column with some none values"))
-            query_results = query.execute(headers=headers)
+            query_results = graph.paginated_query(query.query_dict,
+                                                  max_count=max_count)
         if order_dir == ASC:
             order_dir = DESC
         elif order_dir == DESC:
@@ -850,19 +870,32 @@ def queries_query_results(request, graph_slug, query_id):
 
     # We assign the query id to the query_id of the session
     request.session['query_id'] = query.id
-    # We save the values to export as CSV
-    request.session["csv_results"] = query_results
-    request.session["query_name"] = query.name
 
     # We store the results count in the session variable.
-    query_results_length = len(query_results)
-    request.session['results_count'] = query_results_length
+    request.session['results_count'] = query_results.total()
     # We store the datetime of execution
     query.last_run = datetime.now()
 
+    # We add pagination for the list of queries. Only the rows of the
+    # requested page are fetched from the graph database
+    page = request.GET.get('page', 1)
+    if show_mode == DEFAULT_SHOW_MODE:
+        page_size = rows_number
+    else:
+        page_size = settings.DATA_PAGE_SIZE
+    paginator = Paginator(query_results, page_size)
+    try:
+        paginated_results = paginator.page(page)
+    except PageNotAnInteger:
+        # If page is not an integer, deliver first page.
+        paginated_results = paginator.page(1)
+    except EmptyPage:
+        # If page is out of range (e.g. 9999), deliver last page of results.
+        paginated_results = paginator.page(paginator.num_pages)
+
     headers_final_results = dict()
     headers_query_results = []
-    if query_results_length > 1:
+    if query_results.columns and paginated_results:
         # We treat the headers
         if headers:
             # If the results have headers, we create a dictionary to have
@@ -878,7 +911,7 @@ def queries_query_results(request, graph_slug, query_id):
                 aliases = aliases['types']
             else:
                 aliases = query_aliases['types']
-            headers_query_results = query_results[0]
+            headers_query_results = query_results.columns
             # We need to split the headers by '.' to separate the alias from
             # the property
             for header in headers_query_results:
@@ -956,37 +989,19 @@ def queries_query_results(request, graph_slug, query_id):
                                                         show_alias)
                 # Finally, we add the key-value to our dictionary
                 headers_final_results[header] = show_alias
-        request.session['results_count'] = query_results_length - 1
-        query_results = query_results[1:]
-    else:
-        query_results = []
 
-    # We add the headers to the session to use them if we export the results
-    request.session["headers_formatted"] = headers_final_results
-    request.session["headers_raw"] = headers_query_results
+    # We keep the query and the headers out of the session to export the
+    # results, and the session only keeps the handle of the snapshot
+    snapshot = ResultsSnapshot.create(graph, query_results.query_dict,
+                                      order_by=query_results.order_by,
+                                      query_name=query.name,
+                                      headers_formatted=headers_final_results,
+                                      headers_raw=headers_query_results)
+    request.session["csv_snapshot"] = snapshot.key
 
     # We save the new changes of the query
     query.save()
 
-    # We add pagination for the list of queries
-    page = request.GET.get('page', 1)
-    page_size = rows_number
-    try:
-        if show_mode == DEFAULT_SHOW_MODE:
-            page_size = rows_number
-            paginator = Paginator(query_results, page_size)
-        else:
-            page_size = settings.DATA_PAGE_SIZE
-            query_results = query_results[:rows_number]
-            paginator = Paginator(query_results, page_size)
-        paginated_results = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page.
-        paginated_results = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range (e.g. 9999), deliver last page of results.
-        paginated_results = paginator.page(paginator.num_pages)
-
     if as_modal:
         base_template = 'empty.html'
         render = render_to_string
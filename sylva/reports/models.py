@@ -60,9 +60,11 @@ class ReportTemplate(models.Model):
         return self.name
 
     def execute(self):
-        queries = self.queries.all()
-        query_dicts = {query.id: (query.execute(headers=True), query.name)
-                       for query in queries}
+        queries = {query.id: query for query in self.queries.all()}
+        # Only the queries displayed are run, and just once. Their rows are
+        # fetched page by page, but every series is kept whole in the table
+        # of the report, so the memory used grows with the rows of the queries
+        series = {}
         table = []
         for row in self.layout["layout"]:
             new_row = []
@@ -70,9 +72,10 @@ class ReportTemplate(models.Model):
                 query = cell.get('displayQuery', '')
                 if query:
                     query = int(query)
-                    attrs = query_dicts[query]
-                    cell['series'] = attrs[0]
-                    cell['name'] = attrs[1]
+                    if query not in series:
+                        series[query] = queries[query].execute(headers=True)
+                    cell['series'] = series[query]
+                    cell['name'] = queries[query].name
                 new_row.append(cell)
             table.append(new_row)
         table = {"pagebreaks": self.layout["pagebreaks"], "layout": table}
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.conf import settings
+
+from engines.gdb.cache import LRUCache
+
+METADATA_CACHE_SIZE = getattr(settings, "SCHEMA_METADATA_CACHE_SIZE", 100)
+# Seconds the metadata is used before checking the version of its schema
+# again, since other processes may have changed it
+METADATA_TTL = getattr(settings, "SCHEMA_METADATA_TTL", 5)
+
+# Metadata of the schemas by schema id, shared by all the elements of the
+# graphs in the process
+metadata_cache = LRUCache(max_size=METADATA_CACHE_SIZE)
+
+
+class SchemaMetadata(object):
+    """
+    Node types, relationship types, property keys and display properties of
+    a schema, fetched at once so the elements of its graph don't have to
+    query them one by one. Colors and full names of the types are kept the
+    first time they are asked for. "version" is the version of the schema
+    they were read from, last checked at "checked".
+    """
+
+    def __init__(self, schema, version=None):
+        if version is None:
+            version = schema.get_version()
+        self.version = version
+        self.checked = time.time()
+        self.nodetypes = {}
+        self.relationshiptypes = {}
+        self.property_keys = {}
+        self.displays = {}
+        self._colors = {}
+        self._full_names = {}
+        nodetypes = schema.nodetype_set.all().prefetch_related("properties")
+        for nodetype in nodetypes:
+            label = unicode(nodetype.id)
+            properties = list(nodetype.properties.all())
+            self.nodetypes[label] = nodetype
+            self.property_keys[("node", label)] = [p.key for p in properties]
+            displays = [p for p in properties if p.display]
+            self.displays[label] = displays or properties[:2]
+        reltypes = schema.relationshiptype_set.all().select_related(
+            "source", "target").prefetch_related("properties")
+        for reltype in reltypes:
+            label = unicode(reltype.id)
+            self.relationshiptypes[label] = reltype
+            self.property_keys[("relationship", label)] = [
+                p.key for p in reltype.properties.all()]
+
+    def is_expired(self):
+        return time.time() - self.checked > METADATA_TTL
+
+    def get_nodetype(self, label):
+        return self.nodetypes.get(unicode(label))
+
+    def get_relationshiptype(self, label):
+        return self.relationshiptypes.get(unicode(label))
+
+    def get_node_property_keys(self, label):
+        return self.property_keys.get(("node", unicode(label)), [])
+
+    def get_relationship_property_keys(self, label):
+        return self.property_keys.get(("relationship", unicode(label)), [])
+
+    def get_displays(self, label):
+        return self.displays.get(unicode(label), [])
+
+    def get_node_name(self, label):
+        nodetype = self.get_nodetype(label)
+        return nodetype.name if nodetype else u""
+
+    def get_relationship_name(self, label):
+        reltype = self.get_relationshiptype(label)
+        return reltype.name if reltype else u""
+
+    def get_full_name(self, reltype):
+        if reltype.id not in self._full_names:
+            self._full_names[reltype.id] = reltype.__unicode__()
+        return self._full_names[reltype.id]
+
+    def get_color(self, itemtype):
+        # Types without a color yet get one that isn't saved, since saving
+        # them would change the version of the schema
+        from schemas.models import COLORS, RelationshipType
+        key = (itemtype.__class__.__name__, itemtype.id)
+        if key not in self._colors:
+            if itemtype.has_color():
+                color = itemtype.get_option('color')
+            elif (isinstance(itemtype, RelationshipType)
+                    and itemtype.target_id is not None):
+                color = self.get_color(itemtype.target)
+            else:
+                color = COLORS[itemtype.id % len(COLORS)]
+            self._colors[key] = color
+        return self._colors[key]
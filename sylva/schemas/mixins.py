@@ -1,43 +1,39 @@
 # -*- coding: utf-8 -*-
+import time
 
 
 class SchemaMixin(object):
 
     def __init__(self, *args, **kwargs):
         super(SchemaMixin, self).__init__(*args, **kwargs)
-        self._displays = {}
-        self._relationship_names = {}
-        self._node_names = {}
+        self._metadata = None
+
+    def get_metadata(self):
+        """
+        Return the metadata of the types of the schema, shared by all the
+        instances of the schema in the process while its version is the
+        same. The version is checked again every SCHEMA_METADATA_TTL seconds.
+        """
+        from schemas.metadata import SchemaMetadata, metadata_cache
+        metadata = self._metadata
+        cached = metadata_cache.get(self.pk)
+        # Saving types or properties removes the entry from the cache of this
+        # process, but other processes only notice it checking the version
+        if metadata is None or cached is not metadata or cached.is_expired():
+            version = self.get_version()
+            if cached is None or cached.version != version:
+                cached = SchemaMetadata(self, version)
+                metadata_cache.set(self.pk, cached)
+            else:
+                cached.checked = time.time()
+            self._metadata = metadata = cached
+        return metadata
 
     def get_displays(self, label):
-        from schemas.models import NodeType
-        if label not in self._displays:
-            try:
-                nodetype = self.nodetype_set.get(pk=label)
-                nodetype_properties = nodetype.properties.filter(display=True)
-                self._displays[label] = nodetype_properties
-                if not self._displays[label]:
-                    self._displays[label] = nodetype.properties.all()[:2]
-            except NodeType.DoesNotExist:
-                self._displays[label] = []
-        return self._displays[label]
+        return self.get_metadata().get_displays(label)
 
     def get_relationship_name(self, label):
-        from schemas.models import RelationshipType
-        if label not in self._relationship_names:
-            try:
-                name = self.relationshiptype_set.get(id=label).name
-                self._relationship_names[label] = name
-            except RelationshipType.DoesNotExist:
-                self._relationship_names[label] = u""
-        return self._relationship_names[label]
+        return self.get_metadata().get_relationship_name(label)
 
     def get_node_name(self, label):
-        from schemas.models import NodeType
-        if label not in self._node_names:
-            try:
-                name = self.nodetype_set.get(id=label).name
-                self._node_names[label] = name
-            except NodeType.DoesNotExist:
-                self._node_names[label] = u""
-        return self._node_names[label]
+        return self.get_metadata().get_node_name(label)
@@ -10,16 +10,36 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext as _
 from django.template.defaultfilters import slugify
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from sylva.fields import AutoSlugField
+from schemas.metadata import metadata_cache
 from schemas.mixins import SchemaMixin
 
+COLORS = ['#F70000', '#B9264F', '#990099', '#74138C', '#0000CE',
+          '#1F88A7', '#4A9586', '#FF2626', '#D73E68', '#B300B3',
+          '#8D18AB', '#5B5BFF', '#25A0C5', '#5EAE9E', '#FF5353',
+          '#DD597D', '#CA00CA', '#A41CC6', '#7373FF', '#29AFD6',
+          '#74BAAC', '#FF7373', '#E37795', '#D900D9', '#BA21E0',
+          '#8282FF', '#4FBDDD', '#8DC7BB', '#FF8E8E', '#E994AB',
+          '#FF2DFF', '#CB59E8', '#9191FF', '#67C7E2', '#A5D3CA',
+          '#FFA4A4', '#EDA9BC', '#F206FF', '#CB59E8', '#A8A8FF',
+          '#8ED6EA', '#C0E0DA', '#FFB5B5', '#F0B9C8', '#FF7DFF',
+          '#D881ED', '#B7B7FF', '#A6DEEE', '#CFE7E2', '#FFC8C8',
+          '#F4CAD6', '#FFA8FF', '#EFCDF8', '#C6C6FF', '#C0E7F3',
+          '#DCEDEA', '#FFEAEA', '#F8DAE2', '#FFC4FF', '#EFCDF8',
+          '#DBDBFF', '#D8F0F8', '#E7F3F1', '#FFEAEA', '#FAE7EC',
+          '#FFE3FF', '#F8E9FC', '#EEEEFF', '#EFF9FC', '#F2F9F8',
+          '#FFFDFD', '#FEFAFB', '#FFFDFF', '#FFFFFF', '#FDFDFF',
+          '#FAFDFE', '#F7FBFA']
+
 
 class Schema(models.Model, SchemaMixin):
     # graph = models.OneToOneField(Graph, verbose_name=_('graph'))
     options = models.TextField(_('options'), null=True, blank=True)
+    # Increased every time a type or a property of the schema changes
+    version = models.IntegerField(_('version'), default=0)
 
     class Meta:
         permissions = (
@@ -32,9 +52,25 @@ class Schema(models.Model, SchemaMixin):
         except ObjectDoesNotExist:
             return _(u"Schema \"%s\"") % (self.id)
 
+    def save(self, *args, **kwargs):
+        # The version is only increased in the database, since the one of
+        # this instance may be outdated
+        if (not self._state.adding and not kwargs.get("force_insert")
+                and kwargs.get("update_fields") is None):
+            kwargs["update_fields"] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != "version"]
+        super(Schema, self).save(*args, **kwargs)
+
     def is_empty(self):
         return not self.nodetype_set.exists()
 
+    def get_version(self):
+        """Return the current version from the database, since it can be
+        increased by other instances"""
+        return Schema.objects.filter(pk=self.pk).values_list(
+            "version", flat=True).first()
+
     def export(self):
 
         def get_property_fields(n):
@@ -153,22 +189,7 @@ class Schema(models.Model, SchemaMixin):
                     rp.save()
 
     def _create_colors(self):
-        colors = ['#F70000', '#B9264F', '#990099', '#74138C', '#0000CE',
-                  '#1F88A7', '#4A9586', '#FF2626', '#D73E68', '#B300B3',
-                  '#8D18AB', '#5B5BFF', '#25A0C5', '#5EAE9E', '#FF5353',
-                  '#DD597D', '#CA00CA', '#A41CC6', '#7373FF', '#29AFD6',
-                  '#74BAAC', '#FF7373', '#E37795', '#D900D9', '#BA21E0',
-                  '#8282FF', '#4FBDDD', '#8DC7BB', '#FF8E8E', '#E994AB',
-                  '#FF2DFF', '#CB59E8', '#9191FF', '#67C7E2', '#A5D3CA',
-                  '#FFA4A4', '#EDA9BC', '#F206FF', '#CB59E8', '#A8A8FF',
-                  '#8ED6EA', '#C0E0DA', '#FFB5B5', '#F0B9C8', '#FF7DFF',
-                  '#D881ED', '#B7B7FF', '#A6DEEE', '#CFE7E2', '#FFC8C8',
-                  '#F4CAD6', '#FFA8FF', '#EFCDF8', '#C6C6FF', '#C0E7F3',
-                  '#DCEDEA', '#FFEAEA', '#F8DAE2', '#FFC4FF', '#EFCDF8',
-                  '#DBDBFF', '#D8F0F8', '#E7F3F1', '#FFEAEA', '#FAE7EC',
-                  '#FFE3FF', '#F8E9FC', '#EEEEFF', '#EFF9FC', '#F2F9F8',
-                  '#FFFDFD', '#FEFAFB', '#FFFDFF', '#FFFFFF', '#FDFDFF',
-                  '#FAFDFE', '#F7FBFA']
+        colors = list(COLORS)
         self.set_option("colors", colors)
 
     def get_color(self):
@@ -563,3 +584,44 @@ def create_schema_colors(*args, **kwargs):
     schema = kwargs.get("instance", None)
     if schema and not schema.pk:
         schema._create_colors()
+
+
+@receiver(post_save, sender=NodeType)
+@receiver(post_save, sender=RelationshipType)
+@receiver(post_delete, sender=NodeType)
+@receiver(post_delete, sender=RelationshipType)
+def update_schema_version_from_type(*args, **kwargs):
+    element_type = kwargs.get("instance", None)
+    update_fields = kwargs.get("update_fields", None)
+    # Updating just the number of elements doesn't change the schema
+    if update_fields and set(update_fields) <= set(["total"]):
+        return
+    if element_type and element_type.schema_id:
+        Schema.objects.filter(pk=element_type.schema_id).update(
+            version=F("version") + 1)
+        metadata_cache.delete(element_type.schema_id)
+
+
+@receiver(post_save, sender=NodeProperty)
+@receiver(post_save, sender=RelationshipProperty)
+@receiver(post_delete, sender=NodeProperty)
+@receiver(post_delete, sender=RelationshipProperty)
+def update_schema_version_from_property(*args, **kwargs):
+    prop = kwargs.get("instance", None)
+    if isinstance(prop, NodeProperty):
+        element_types = NodeType.objects.filter(pk=prop.node_id)
+    else:
+        element_types = RelationshipType.objects.filter(
+            pk=prop.relationship_id)
+    schema_ids = list(element_types.values_list("schema_id", flat=True))
+    Schema.objects.filter(pk__in=schema_ids).update(version=F("version") + 1)
+    for schema_id in schema_ids:
+        metadata_cache.delete(schema_id)
+
+
+@receiver(post_save, sender=Schema)
+@receiver(post_delete, sender=Schema)
+def delete_schema_metadata(*args, **kwargs):
+    schema = kwargs.get("instance", None)
+    if schema:
+        metadata_cache.delete(schema.pk)
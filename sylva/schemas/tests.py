@@ -29,6 +29,28 @@ class SchemaTest(TestCase):
 
         self.assertEquals(schema.get_option('boolean'), True)
 
+    def test_schema_version(self):
+        """
+        Tests saving the schema doesn't undo the changes of its version.
+        """
+        schema = Schema.objects.create()
+        schema._import({
+            'nodeTypes': {
+                "Bob's type": {},
+                "Alice's type": {'name': {}},
+            },
+            'allowedEdges': [],
+        })
+        version = schema.get_version()
+        self.assertEqual(version, 3)
+        nodetype = NodeType.objects.create(name="Bob's new type",
+                                           schema=schema)
+        nodetype.create_color()
+        self.assertGreater(schema.get_version(), version)
+        schema.set_option('boolean', True)
+        schema.save()
+        self.assertGreater(schema.get_version(), version)
+
 
 def property_pre_setUp(property_test):
     """
@@ -35,6 +35,11 @@ GRAPHDATABASES = {
         'SCHEMA': 'http',
         'HOST': 'localhost',
         'PORT': '7373',  # Changed to avoid overwrites from testing
+        # Connection pool, per worker process
+        'POOL_SIZE': 10,  # Max number of keep-alive connections
+        'POOL_BLOCK': False,  # Wait for a free connection if pool is full
+        'TIMEOUT': None,  # Seconds to wait for the server, None to wait
+        'MAX_RETRIES': 0,  # Retries for failed connections
     },
     'tests': {
         'ENGINE': 'engines.gdb.backends.neo4j',
@@ -216,13 +221,17 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     },
-    'gdb': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'gdb-cache',
-        'TIMEOUT': 7 * 24 * 60 * 60,  # One week. It's not changing a lot
-    }
 }
 
+# Max number of graph database objects kept alive per process
+GDB_REGISTRY_SIZE = 100
+
+# Max number of schemas whose types metadata is kept per process
+SCHEMA_METADATA_CACHE_SIZE = 100
+
+# Seconds the types metadata is used before checking if the schema changed
+SCHEMA_METADATA_TTL = 5
+
 # A sample logging configuration. The only tangible logging
 # performed by this configuration is to send an email to
 # the site admins on every HTTP 500 error.
@@ -262,7 +271,8 @@ DEFAULT_FROM_EMAIL = "\"SylvaDB\" <info@sylvadb.com>"
 # Celery
 BROKER_URL = 'amqp://guest@localhost//'
 CELERY_RESULT_BACKEND = "amqp"
-CELERY_IMPORTS = ("engines.gdb.analysis.neo4j", "reports.tasks")
+CELERY_IMPORTS = ("engines.gdb.analysis.neo4j", "reports.tasks",
+                  "tools.tasks")
 
 # Celery reports scheduler
 CELERYBEAT_SCHEDULE = {
@@ -331,8 +341,24 @@ DATA_PAGE_SIZE = 100  # Page size in nodes lists.
 PREVIEW_NODES = 200  # Size of the graph preview in the graph screen
 MAX_SIZE = 300  # If the number of nodes is above this value, Processing is
                 # disabled for graph visualization.
+GRAPH_DATA_CHUNK_SIZE = 500  # Number of nodes or relationships in every
+                            # chunk of the streamed graph data.
+EXPAND_MAX_NODES = 50  # Max number of nodes expanded at once.
+EXPAND_MAX_DEPTH = 3  # Max number of hops when expanding nodes.
+EXPAND_MAX_NEIGHBORS = 10000  # Max number of neighbors read when expanding.
 IMPORT_MAX_SIZE = 100  # The maximum number of nodes/edges to send in every
                       # AJAX request from the import tool.
+IMPORT_BATCH_SIZE = 1000  # Number of rows of the CSV files imported in the
+                          # server sent to the graph database at once.
+QUERY_SNAPSHOTS_TTL = 60 * 60  # Seconds that the results of the queries are
+                               # kept out of the session for exporting them.
+QUERY_RESULTS_CACHE_SIZE = 100  # Number of results of saved queries cached
+                                # per process until the graph changes.
+QUERY_RESULTS_CACHE_MAX_ROWS = 10000  # Results with more rows aren't cached.
+BETWEENNESS_ERROR = 0.05  # Max error of the normalized betweenness centrality
+                         # estimated from a sample of sources.
+BETWEENNESS_PROCESSES = 4  # Number of processes computing the betweenness
+                           # centrality from the sampled sources.
 
 # OPTIONS is a dictionary made available in templates
 OPTIONS = {
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import csv
+import itertools
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from tools.models import ImportedNode
+
+BATCH_SIZE = getattr(settings, "IMPORT_BATCH_SIZE", 1000)
+NODES_DIR = "nodes/"
+RELATIONSHIPS_DIR = "relationships/"
+NODES_HEADER = ["id", "type"]
+RELATIONSHIPS_HEADER = ["source id", "target id", "label"]
+
+
+class GraphImportError(Exception):
+    pass
+
+
+class CSVImporter(object):
+    """
+    Imports into a graph the ZIP files written by CSVConverter, with a CSV
+    file per node type in "nodes/" and a CSV file per relationship type in
+    "relationships/". The rows are read as a stream, checked against the
+    schema and sent to the graph database in batches of "batch_size". The
+    file and row reached are saved after every batch, so an interrupted
+    import goes on from there the next time it is run.
+    "progress" is called with the percentage done whenever it changes.
+    """
+
+    def __init__(self, graph_import, batch_size=BATCH_SIZE, progress=None):
+        self.graph_import = graph_import
+        self.graph = graph_import.graph
+        self.schema = self.graph.schema
+        self.batch_size = batch_size
+        self.progress = progress
+        self._nodetypes = None
+        self._reltypes = None
+        self._read = 0
+        self._total = 1
+
+    def run(self):
+        graph_import = self.graph_import
+        with self._open_zip() as zip_file:
+            members = self._get_members(zip_file)
+            names = [info.filename for info in members]
+            self._total = sum(info.file_size for info in members) or 1
+            if graph_import.current_file in names:
+                start = names.index(graph_import.current_file)
+            else:
+                start = 0
+                graph_import.current_row = 0
+            self._read = sum(info.file_size for info in members[:start])
+            for info in members[start:]:
+                if info.filename != graph_import.current_file:
+                    graph_import.current_file = info.filename
+                    graph_import.current_row = 0
+                csv_file = zip_file.open(info)
+                try:
+                    self._import_file(info.filename, csv_file)
+                finally:
+                    csv_file.close()
+
+    def _open_zip(self):
+        data_file = self.graph_import.data_file
+        try:
+            return zipfile.ZipFile(data_file.path)
+        except NotImplementedError:
+            # Storages without absolute paths are copied to a local file
+            temp_file = tempfile.TemporaryFile()
+            data_file.open("rb")
+            try:
+                shutil.copyfileobj(data_file, temp_file)
+            finally:
+                data_file.close()
+            return zipfile.ZipFile(temp_file)
+
+    def _get_members(self, zip_file):
+        # All the nodes go before the relationships that use them
+        infos = [info for info in zip_file.infolist()
+                 if info.filename.endswith(".csv")]
+        nodes = sorted((info for info in infos
+                        if info.filename.startswith(NODES_DIR)),
+                       key=lambda info: info.filename)
+        relationships = sorted(
+            (info for info in infos
+             if info.filename.startswith(RELATIONSHIPS_DIR)),
+            key=lambda info: info.filename)
+        return nodes + relationships
+
+    def _count_lines(self, csv_file):
+        for line in csv_file:
+            self._read += len(line)
+            yield line
+
+    def _import_file(self, filename, csv_file):
+        graph_import = self.graph_import
+        reader = csv.reader(self._count_lines(csv_file))
+        header = next(reader, None)
+        if header is None:
+            return
+        if filename.startswith(NODES_DIR):
+            expected, import_batch = NODES_HEADER, self._import_nodes
+        else:
+            expected, import_batch = (RELATIONSHIPS_HEADER,
+                                      self._import_relationships)
+        if header[:len(expected)] != expected:
+            raise GraphImportError(_("Wrong header in the file %s")
+                                   % filename)
+        keys = [key.decode("utf-8") for key in header[len(expected):]]
+        rows = itertools.islice(reader, graph_import.current_row, None)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                import_batch(filename, keys, batch)
+                graph_import.current_row += len(batch)
+                graph_import.progress = min(self._read * 100 // self._total,
+                                            99)
+                graph_import.save(update_fields=["current_file",
+                                                 "current_row", "progress"])
+            if self.progress is not None:
+                self.progress(graph_import.progress)
+
+    def _get_properties(self, keys, values):
+        # Empty values are properties missing in the exported element
+        return dict((key, value.decode("utf-8"))
+                    for key, value in zip(keys, values) if value)
+
+    def _get_nodetype(self, name, filename):
+        if self._nodetypes is None:
+            self._nodetypes = dict(
+                (nodetype.name, nodetype)
+                for nodetype in self.schema.nodetype_set.all())
+        try:
+            return self._nodetypes[name.decode("utf-8")]
+        except KeyError:
+            raise GraphImportError(_("Unknown node type %s in the file %s")
+                                   % (name.decode("utf-8"), filename))
+
+    def _get_reltype(self, name, source_label, target_label, filename):
+        if self._reltypes is None:
+            self._reltypes = dict(
+                ((reltype.name, unicode(reltype.source_id),
+                  unicode(reltype.target_id)), reltype)
+                for reltype in self.schema.relationshiptype_set.all())
+        key = (name.decode("utf-8"), unicode(source_label),
+               unicode(target_label))
+        try:
+            return self._reltypes[key]
+        except KeyError:
+            raise GraphImportError(
+                _("Unknown relationship type %s in the file %s")
+                % (key[0], filename))
+
+    def _import_nodes(self, filename, keys, batch):
+        nodes = []
+        source_ids = []
+        for row in batch:
+            if len(row) < len(NODES_HEADER):
+                raise GraphImportError(_("Wrong row in the file %s")
+                                       % filename)
+            nodetype = self._get_nodetype(row[1], filename)
+            properties = self._get_properties(keys, row[2:])
+            nodes.append((unicode(nodetype.id), properties))
+            source_ids.append(row[0].decode("utf-8"))
+        created = self.graph.nodes.bulk_create(nodes)
+        ImportedNode.objects.bulk_create([
+            ImportedNode(graph_import=self.graph_import, source_id=source_id,
+                         node_id=node.id, node_label=node.label)
+            for source_id, node in zip(source_ids, created)])
+
+    def _import_relationships(self, filename, keys, batch):
+        source_ids = set()
+        for row in batch:
+            if len(row) < len(RELATIONSHIPS_HEADER):
+                raise GraphImportError(_("Wrong row in the file %s")
+                                       % filename)
+            source_ids.update([row[0].decode("utf-8"),
+                               row[1].decode("utf-8")])
+        # The endpoints of the whole batch are read at once
+        imported = ImportedNode.objects.filter(
+            graph_import=self.graph_import, source_id__in=source_ids)
+        nodes = dict((node.source_id, node) for node in imported)
+        relationships = []
+        for row in batch:
+            source = nodes.get(row[0].decode("utf-8"))
+            target = nodes.get(row[1].decode("utf-8"))
+            if source is None or target is None:
+                raise GraphImportError(_("Unknown node in the file %s")
+                                       % filename)
+            reltype = self._get_reltype(row[2], source.node_label,
+                                        target.node_label, filename)
+            properties = self._get_properties(keys, row[3:])
+            relationships.append((source.node_id, target.node_id,
+                                  unicode(reltype.id), properties))
+        self.graph.relationships.bulk_create(relationships)
@@ -1,3 +1,105 @@
+# -*- coding: utf-8 -*-
 from django.db import models
+from django.utils.translation import gettext as _
 
-# Create your models here.
+from graphs.models import Graph
+
+GEXF = "gexf"
+CSV = "csv"
+EXPORT_FORMATS = (
+    (GEXF, _("GEXF")),
+    (CSV, _("CSV")),
+)
+EXPORT_EXTENSIONS = {
+    GEXF: "gexf",
+    CSV: "zip",
+}
+EXPORT_CONTENT_TYPES = {
+    GEXF: "application/xml",
+    CSV: "application/zip",
+}
+
+
+def get_upload_to_exports(self, filename):
+    return u"%s/exports/%s" % (self.graph.slug, filename)
+
+
+def get_upload_to_imports(self, filename):
+    return u"%s/imports/%s" % (self.graph.slug, filename)
+
+
+class GraphExport(models.Model):
+    graph = models.ForeignKey(Graph, verbose_name=_("graph"),
+                              related_name='exports')
+    format = models.CharField(_("format"), max_length=10,
+                              choices=EXPORT_FORMATS)
+    # Modification date of the graph when it was exported
+    last_modified = models.DateTimeField(_("last modified"), null=True,
+                                         blank=True)
+    data_file = models.FileField(_("data file"), null=True, blank=True,
+                                 upload_to=get_upload_to_exports,
+                                 max_length=255)
+    progress = models.IntegerField(_("progress"), default=0)
+    # tasks attributes
+    task_id = models.CharField(_("task_id"), max_length=255, null=True,
+                               blank=True)
+    task_start = models.DateTimeField(_("task_start"), null=True,
+                                      blank=True)
+    task_end = models.DateTimeField(_("task_end"), null=True,
+                                    blank=True)
+    task_status = models.CharField(_("task_status"), max_length=255,
+                                   null=True, blank=True)
+    task_error = models.CharField(_("task_error"), max_length=255,
+                                  null=True, blank=True)
+
+    class Meta:
+        get_latest_by = "id"
+
+    def get_file_name(self):
+        return u"%s_data.%s" % (self.graph.slug,
+                                EXPORT_EXTENSIONS[self.format])
+
+    def get_content_type(self):
+        return EXPORT_CONTENT_TYPES[self.format]
+
+
+class GraphImport(models.Model):
+    graph = models.ForeignKey(Graph, verbose_name=_("graph"),
+                              related_name='imports')
+    data_file = models.FileField(_("data file"), null=True, blank=True,
+                                 upload_to=get_upload_to_imports,
+                                 max_length=255)
+    # File of the archive being imported and number of its rows already
+    # imported, to continue from there
+    current_file = models.CharField(_("current file"), max_length=255,
+                                    null=True, blank=True)
+    current_row = models.IntegerField(_("current row"), default=0)
+    progress = models.IntegerField(_("progress"), default=0)
+    # tasks attributes
+    task_id = models.CharField(_("task_id"), max_length=255, null=True,
+                               blank=True)
+    task_start = models.DateTimeField(_("task_start"), null=True,
+                                      blank=True)
+    task_end = models.DateTimeField(_("task_end"), null=True,
+                                    blank=True)
+    task_status = models.CharField(_("task_status"), max_length=255,
+                                   null=True, blank=True)
+    task_error = models.CharField(_("task_error"), max_length=255,
+                                  null=True, blank=True)
+
+    class Meta:
+        get_latest_by = "id"
+
+
+class ImportedNode(models.Model):
+    """
+    Node created by an import, with its id in the imported files.
+    """
+    graph_import = models.ForeignKey(GraphImport, verbose_name=_("import"),
+                                     related_name='nodes')
+    source_id = models.CharField(_("source id"), max_length=255)
+    node_id = models.IntegerField(_("node id"))
+    node_label = models.CharField(_("node label"), max_length=255)
+
+    class Meta:
+        unique_together = (("graph_import", "source_id"), )
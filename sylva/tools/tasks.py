@@ -1,15 +1,198 @@
-from datetime import date, timedelta
-from celery.task import Task
+# -*- coding: utf-8 -*-
+import tempfile
+from datetime import datetime
 
+from django.core.files import File
 
-class ExportGraphTask(Task):
+from celery import states
+from celery.result import AsyncResult
+from celery.utils import uuid
+from celery.utils.log import get_task_logger
+
+from sylva.celery import app
+from tools.converters import GEXFConverter, CSVConverter
+from tools.importers import CSVImporter
+from tools.models import GraphExport, GraphImport, GEXF, CSV
+
+EXPORT_CONVERTERS = {
+    GEXF: GEXFConverter,
+    CSV: CSVConverter,
+}
+# Size of the writes to the temporary file of the export
+CHUNK_SIZE = 64 * 1024
+PROGRESS = "PROGRESS"
+
+
+logger = get_task_logger(__name__)
+
+
+class ExportProgress(object):
+    """
+    Counter of the elements exported that saves the percentage done in the
+    export and in the state of the task every time it changes.
+    """
+
+    def __init__(self, task, export, total):
+        self.task = task
+        self.export = export
+        self.total = max(total, 1)
+        self.count = 0
+        self.percentage = 0
+
+    def __call__(self):
+        self.count += 1
+        # The last percent is left for storing the file
+        percentage = min(self.count * 100 // self.total, 99)
+        if percentage > self.percentage:
+            self.percentage = percentage
+            GraphExport.objects.filter(id=self.export.id).update(
+                progress=percentage)
+            if not self.task.request.is_eager:
+                self.task.update_state(state=PROGRESS,
+                                       meta={'progress': percentage})
+
+
+class ExportGraphTask(app.Task):
     """
     A task that export a whole Sylva graph
     """
-    def run(self, graph_id, **kwargs):
-        logger = self.get_logger(**kwargs)
+    name = "tools.export_graph"
+
+    def run(self, export_id, **kwargs):
         logger.info("Running export graph task")
+        export = GraphExport.objects.get(id=export_id)
+        export.task_id = self.request.id
+        export.task_start = datetime.now()
+        export.task_status = "Starting"
+        export.save()
+        try:
+            graph = export.graph
+            total = graph.data.total_nodes + graph.data.total_relationships
+            progress = ExportProgress(self, export, total)
+            converter = EXPORT_CONVERTERS[export.format](graph=graph,
+                                                         progress=progress)
+            with tempfile.TemporaryFile() as temp_file:
+                buffer_ = []
+                buffer_size = 0
+                for chunk in converter.stream_export():
+                    if isinstance(chunk, unicode):
+                        chunk = chunk.encode("utf-8")
+                    buffer_.append(chunk)
+                    buffer_size += len(chunk)
+                    if buffer_size >= CHUNK_SIZE:
+                        temp_file.write("".join(buffer_))
+                        buffer_ = []
+                        buffer_size = 0
+                temp_file.write("".join(buffer_))
+                temp_file.seek(0)
+                export.data_file.save(export.get_file_name(),
+                                      File(temp_file), save=False)
+            export.progress = 100
+            export.task_status = "Ready"
+        except Exception as e:
+            logger.exception("Error exporting the graph")
+            export.task_status = "Failed"
+            export.task_error = unicode(e)[:255]
+        finally:
+            export.task_end = datetime.now()
+            export.save()
+        return export.task_status
+
+
+export_graph_task = ExportGraphTask()
+
+
+def export_graph(graph, export_format):
+    """
+    Returns the export of the graph in "export_format", starting it unless
+    there is already one, done or running, of the graph as it is now.
+    """
+    exports = graph.exports.filter(format=export_format,
+                                   last_modified=graph.last_modified)
+    try:
+        return exports.exclude(task_status="Failed").latest()
+    except GraphExport.DoesNotExist:
+        pass
+    export = GraphExport.objects.create(graph=graph, format=export_format,
+                                        last_modified=graph.last_modified)
+    task = export_graph_task.apply_async(kwargs={'export_id': export.id})
+    # The task may be already running, so just its id is saved
+    export.task_id = task.id
+    GraphExport.objects.filter(id=export.id).update(task_id=task.id)
+    return export
+
+
+class ImportGraphTask(app.Task):
+    """
+    A task that import into a Sylva graph a ZIP file of CSV files,
+    continuing from the last batch imported if it was interrupted
+    """
+    name = "tools.import_graph"
+
+    def run(self, import_id, **kwargs):
+        logger.info("Running import graph task")
+        # Only the task assigned by import_graph() runs the import, so two
+        # tasks never replay the same rows
+        claimed = GraphImport.objects.filter(
+            id=import_id, task_id=self.request.id
+        ).exclude(task_status="Ready").update(
+            task_status="Starting", task_start=datetime.now(),
+            task_error=None)
+        graph_import = GraphImport.objects.get(id=import_id)
+        if not claimed:
+            logger.info("The import is assigned to another task")
+            return graph_import.task_status
+
+        def progress(percentage):
+            if not self.request.is_eager:
+                self.update_state(state=PROGRESS,
+                                  meta={'progress': percentage})
+
+        try:
+            importer = CSVImporter(graph_import, progress=progress)
+            importer.run()
+            graph_import.progress = 100
+            graph_import.task_status = "Ready"
+        except Exception as e:
+            logger.exception("Error importing the graph")
+            graph_import.task_status = "Failed"
+            graph_import.task_error = unicode(e)[:255]
+        finally:
+            graph_import.task_end = datetime.now()
+            graph_import.save()
+        return graph_import.task_status
 
-        # TODO Code creating the file
 
-        return True
+import_graph_task = ImportGraphTask()
+
+
+def import_graph(graph_import):
+    """
+    Starts the import, or goes on with it if it was interrupted. Returns
+    False if another task was assigned to the import in the meantime.
+    """
+    # The new task is assigned before it's sent, and only if the import
+    # still has the task it had when it was read
+    task_id = uuid()
+    assigned = GraphImport.objects.filter(
+        id=graph_import.id, task_id=graph_import.task_id
+    ).update(task_id=task_id)
+    if not assigned:
+        return False
+    graph_import.task_id = task_id
+    import_graph_task.apply_async(kwargs={'import_id': graph_import.id},
+                                  task_id=task_id)
+    return True
+
+
+def is_import_running(graph_import):
+    """
+    Whether the task of the import may be still importing its rows.
+    """
+    if graph_import.task_status in ("Ready", "Failed"):
+        return False
+    if not graph_import.task_id:
+        return False
+    # A task stopped without saving the import, e.g. when it's revoked
+    state = AsyncResult(graph_import.task_id).state
+    return state not in states.READY_STATES
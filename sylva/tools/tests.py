@@ -5,8 +5,25 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
+import zipfile
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO  # NOQA
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
 from django.test import TestCase
 
+from graphs.models import Graph
+from schemas.models import Schema, NodeType, RelationshipType
+from tools.converters import GEXFConverter
+from tools.importers import CSVImporter, GraphImportError
+from tools.models import GraphExport, GraphImport, GEXF
+from tools.tasks import (export_graph, export_graph_task, import_graph_task,
+                         is_import_running)
+from tools.zipstream import ZipStream
+
 
 class SimpleTest(TestCase):
     def test_basic_addition(self):
@@ -14,3 +31,167 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class ZipStreamTest(TestCase):
+    """
+    A set of tests for the streamed ZIP files.
+    """
+
+    def test_zip_stream(self):
+        """
+        Tests that the chunks make a valid ZIP file.
+        """
+        zip_stream = ZipStream(chunk_size=1024)
+        rows = ("%s,\"value %s\"\n" % (i, i) for i in range(10000))
+        chunks = list(zip_stream.write_iter(u"nodes/type.csv", rows))
+        self.assertTrue(len(chunks) > 1)
+        chunks.extend(zip_stream.write_iter("relationships/type.csv", []))
+        chunks.extend(zip_stream.close())
+        zip_file = zipfile.ZipFile(StringIO("".join(chunks)))
+        self.assertIsNone(zip_file.testzip())
+        self.assertEqual(zip_file.namelist(),
+                         [u"nodes/type.csv", u"relationships/type.csv"])
+        content = zip_file.read("nodes/type.csv")
+        self.assertTrue(content.startswith('0,"value 0"\n1,"value 1"\n'))
+        self.assertEqual(zip_file.read("relationships/type.csv"), "")
+
+
+class GraphExportTest(TestCase):
+    """
+    A set of tests for the exports of graphs run in background.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='john', password='doe',
+                                        is_active=True, is_staff=True)
+        schema = Schema.objects.create()
+        nodetype = NodeType.objects.create(id=1, name="test", schema=schema)
+        RelationshipType.objects.create(id=1, name="knows", schema=schema,
+                                        source=nodetype, target=nodetype)
+        self.graph = Graph.objects.create(name="graphTest", schema=schema,
+                                          owner=self.user)
+
+    def tearDown(self):
+        self.graph.destroy()
+
+    def test_gexf_stream_export(self):
+        """
+        Tests that the GEXF file is yielded in big chunks with the endpoints
+        of the relationships.
+        """
+        nodes = self.graph.nodes.bulk_create([("1", {"property": i})
+                                              for i in range(3)])
+        self.graph.relationships.create(nodes[0], nodes[1], "1",
+                                        {"since": 2010})
+        chunks = list(GEXFConverter(graph=self.graph).stream_export())
+        self.assertEqual(len(chunks), 1)
+        content = chunks[0]
+        self.assertEqual(content.count(u'<node '), 3)
+        self.assertIn(u'source="%s" target="%s"' % (nodes[0].id, nodes[1].id),
+                      content)
+        self.assertIn(u'value="2010"', content)
+        self.assertTrue(content.endswith(u'</gexf>'))
+
+    def test_export_graph_task(self):
+        """
+        Tests that the export is stored and reused while the graph is the
+        same.
+        """
+        self.graph.nodes.bulk_create([("1", {"property": i})
+                                      for i in range(3)])
+        graph = Graph.objects.get(id=self.graph.id)
+        export = GraphExport.objects.create(
+            graph=graph, format=GEXF, last_modified=graph.last_modified)
+        export_graph_task.apply(kwargs={'export_id': export.id})
+        export = GraphExport.objects.get(id=export.id)
+        self.assertEqual(export.task_status, "Ready")
+        self.assertEqual(export.progress, 100)
+        export.data_file.open("rb")
+        content = export.data_file.read()
+        export.data_file.close()
+        self.assertTrue(content.startswith('<?xml'))
+        self.assertEqual(content.count('<node '), 3)
+        self.assertEqual(export_graph(graph, GEXF), export)
+        export.data_file.delete()
+
+
+class GraphImportTest(TestCase):
+    """
+    A set of tests for the imports of CSV files run in background.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='john', password='doe',
+                                        is_active=True, is_staff=True)
+        schema = Schema.objects.create()
+        nodetype = NodeType.objects.create(id=1, name="test", schema=schema)
+        RelationshipType.objects.create(id=1, name="knows", schema=schema,
+                                        source=nodetype, target=nodetype)
+        self.graph = Graph.objects.create(name="graphTest", schema=schema,
+                                          owner=self.user)
+        zip_buffer = StringIO()
+        zip_file = zipfile.ZipFile(zip_buffer, "w")
+        zip_file.writestr("nodes/test.csv",
+                          '"id","type","property"\n'
+                          '"10","test","a"\n"11","test","b"\n'
+                          '"12","test",""\n')
+        zip_file.writestr("relationships/knows.csv",
+                          '"source id","target id","label"\n'
+                          '"10","11","knows"\n')
+        zip_file.close()
+        self.graph_import = GraphImport(graph=self.graph)
+        self.graph_import.data_file.save("graph.zip",
+                                         ContentFile(zip_buffer.getvalue()))
+
+    def tearDown(self):
+        self.graph_import.data_file.delete()
+        self.graph.destroy()
+
+    def test_csv_importer(self):
+        """
+        Tests that the nodes and relationships are imported in batches.
+        """
+        CSVImporter(self.graph_import, batch_size=2).run()
+        graph = Graph.objects.get(id=self.graph.id)
+        self.assertEqual(graph.data.total_nodes, 3)
+        self.assertEqual(graph.data.total_relationships, 1)
+        self.assertEqual(self.graph_import.current_file,
+                         "relationships/knows.csv")
+        self.assertEqual(self.graph_import.nodes.count(), 3)
+        source = self.graph_import.nodes.get(source_id="10")
+        node = graph.nodes.get(source.node_id)
+        self.assertEqual(node.properties, {"property": u"a"})
+
+    def test_csv_importer_resume(self):
+        """
+        Tests that an interrupted import goes on from the last batch.
+        """
+        self.graph_import.current_file = "nodes/test.csv"
+        self.graph_import.current_row = 2
+        self.assertRaises(GraphImportError,
+                          CSVImporter(self.graph_import).run)
+        graph = Graph.objects.get(id=self.graph.id)
+        # The relationship uses a node imported before the interruption
+        self.assertEqual(graph.data.total_nodes, 1)
+        self.assertEqual(graph.data.total_relationships, 0)
+
+    def test_import_task_assigned(self):
+        """
+        Tests that only the task assigned to an import runs it.
+        """
+        self.graph_import.task_id = "assigned"
+        self.graph_import.save()
+        import_graph_task.apply(kwargs={'import_id': self.graph_import.id},
+                                task_id="other")
+        graph_import = GraphImport.objects.get(id=self.graph_import.id)
+        self.assertIsNone(graph_import.task_status)
+        self.assertEqual(Graph.objects.get(id=self.graph.id).data.total_nodes,
+                         0)
+        import_graph_task.apply(kwargs={'import_id': self.graph_import.id},
+                                task_id="assigned")
+        graph_import = GraphImport.objects.get(id=self.graph_import.id)
+        self.assertEqual(graph_import.task_status, "Ready")
+        self.assertFalse(is_import_running(graph_import))
+        self.assertEqual(Graph.objects.get(id=self.graph.id).data.total_nodes,
+                         3)
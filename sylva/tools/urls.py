@@ -5,6 +5,13 @@ urlpatterns = patterns('tools.views',
     # import tool
     url(r'^(?P<graph_slug>[\w-]+)/import/$', 'graph_import_tool',
         name="tool_import"),
+    # import in background
+    url(r'^(?P<graph_slug>[\w-]+)/import/csv/$', 'graph_import_csv',
+        name="graph_import_csv"),
+    url(r'^(?P<graph_slug>[\w-]+)/import/(?P<import_id>\d+)/status/$',
+        'graph_import_status', name="graph_import_status"),
+    url(r'^(?P<graph_slug>[\w-]+)/import/(?P<import_id>\d+)/resume/$',
+        'graph_import_resume', name="graph_import_resume"),
 
     # ajax creation methods
     url(r'^(?P<graph_slug>[\w-]+)/ajax-nodes/create/$',
@@ -18,6 +25,13 @@ urlpatterns = patterns('tools.views',
     # export CSV
     url(r'^(?P<graph_slug>[\w-]+)/export/csv/$', 'graph_export_csv',
         name="graph_export_csv"),
+    # export in background
+    url(r'^(?P<graph_slug>[\w-]+)/export/(?P<export_format>gexf|csv)/async/$',
+        'graph_export_async', name="graph_export_async"),
+    url(r'^(?P<graph_slug>[\w-]+)/export/(?P<export_id>\d+)/status/$',
+        'graph_export_status', name="graph_export_status"),
+    url(r'^(?P<graph_slug>[\w-]+)/export/(?P<export_id>\d+)/download/$',
+        'graph_export_download', name="graph_export_download"),
     # export table as CSV
     url(r'^(?P<graph_slug>[\w-]+)/export/csv/table$',
         'graph_export_table_csv',
@@ -3,7 +3,6 @@ try:
     import ujson as json
 except ImportError:
     import json  # NOQA
-from datetime import datetime
 
 from django.conf import settings
 from django.core.urlresolvers import reverse
@@ -15,16 +14,19 @@ from django.shortcuts import (get_object_or_404, render_to_response,
 from django.template import RequestContext
 from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
-from django.views.decorators.http import condition
+from django.views.decorators.http import condition, require_POST
 
 from guardian.decorators import permission_required
 
 from data.models import Data
 from graphs.models import Graph
 from graphs.utils import graph_last_modified
+from queries.snapshots import ResultsSnapshot
 from schemas.models import NodeType
 from tools.converters import (GEXFConverter, CSVConverter, CSVQueryConverter,
                               CSVTableConverter)
+from tools.models import GraphExport, GraphImport
+from tools.tasks import export_graph, import_graph, is_import_running
 
 
 @login_required()
@@ -63,22 +65,84 @@ def graph_import_tool(request, graph_slug):
         return response
 
 
+def _jsonify_import(graph_import):
+    return {
+        'id': graph_import.id,
+        'status': graph_import.task_status,
+        'progress': graph_import.progress,
+        'error': graph_import.task_error,
+    }
+
+
+@permission_required("data.change_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_import_csv(request, graph_slug):
+    graph = get_object_or_404(Graph, slug=graph_slug)
+    if request.method != "POST" or "file" not in request.FILES:
+        raise Http404(_("Error: Invalid request (expected a file)"))
+    if graph.schema.is_empty():
+        error = _("You are trying to import data into a graph with an "
+                  "empty schema")
+    elif not graph.is_empty():
+        error = _("You are trying to import data into a not empty graph")
+    else:
+        error = None
+    if error:
+        return HttpResponse(json.dumps({'error': error}), status=400,
+                            content_type='application/json')
+    graph_import = GraphImport(graph=graph)
+    graph_import.data_file.save(request.FILES["file"].name,
+                                request.FILES["file"])
+    import_graph(graph_import)
+    return HttpResponse(json.dumps(_jsonify_import(graph_import)),
+                        content_type='application/json')
+
+
+@permission_required("data.change_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_import_status(request, graph_slug, import_id):
+    graph_import = get_object_or_404(GraphImport, id=import_id,
+                                     graph__slug=graph_slug)
+    return HttpResponse(json.dumps(_jsonify_import(graph_import)),
+                        content_type='application/json')
+
+
+@require_POST
+@permission_required("data.change_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_import_resume(request, graph_slug, import_id):
+    # Imports interrupted without failing can be resumed as well, once
+    # their task is not running
+    imports = GraphImport.objects.exclude(task_status="Ready")
+    graph_import = get_object_or_404(imports, id=import_id,
+                                     graph__slug=graph_slug)
+    if is_import_running(graph_import) or not import_graph(graph_import):
+        error = _("The import is still running")
+        return HttpResponse(json.dumps({'error': error}), status=409,
+                            content_type='application/json')
+    return HttpResponse(json.dumps(_jsonify_import(graph_import)),
+                        content_type='application/json')
+
+
 @permission_required("data.change_data", (Data, "graph__slug", "graph_slug"),
                      return_403=True)
 def ajax_nodes_create(request, graph_slug):
     if request.is_ajax():
         graph = get_object_or_404(Graph, slug=graph_slug)
         elements = json.loads(request.POST['data'])
-        ids_dict = {}
+        labels = {}
+        nodes = []
         for elem in elements:
             elem_data = elem['data']
-            elem_id = elem['id']
-            label = graph.schema.nodetype_set.get(name=elem_data['type'])
-            properties = elem_data.get('properties', '{}')
-            node = graph.nodes.create(str(label.id), properties)
-            ids_dict[elem_id] = node.id
-        graph.last_modified = datetime.now()
-        graph.data.save()
+            elem_type = elem_data['type']
+            if elem_type not in labels:
+                nodetype = graph.schema.nodetype_set.get(name=elem_type)
+                labels[elem_type] = str(nodetype.id)
+            properties = elem_data.get('properties', {})
+            nodes.append((labels[elem_type], properties))
+        new_nodes = graph.nodes.bulk_create(nodes)
+        ids_dict = dict((elem['id'], node.id)
+                        for elem, node in zip(elements, new_nodes))
         return HttpResponse(json.dumps(ids_dict),
                             content_type='application/json')
     raise Http404(_("Error: Invalid request (expected an AJAX request)"))
@@ -90,17 +154,10 @@ def ajax_relationships_create(request, graph_slug):
     if request.is_ajax():
         graph = get_object_or_404(Graph, slug=graph_slug)
         elements = json.loads(request.POST["data"])
-        for elem in elements:
-            source = graph.nodes.get(elem["sourceId"])
-            target = graph.nodes.get(elem["targetId"])
-            label = graph.schema.relationshiptype_set.get(name=elem["type"],
-                                                          source=source.label,
-                                                          target=target.label)
-            properties = elem.get("properties", "{}")
-            graph.relationships.create(source, target, str(label.id),
-                                       properties)
-        graph.last_modified = datetime.now()
-        graph.data.save()
+        graph.relationships.bulk_create_by_type(
+            (elem["sourceId"], elem["targetId"], elem["type"],
+             elem.get("properties", {}))
+            for elem in elements)
         return HttpResponse(json.dumps({}), content_type='application/json')
     raise Http404(_("Error: Invalid request (expected an AJAX request)"))
 
@@ -128,12 +185,60 @@ def graph_export_gexf(request, graph_slug):
 def graph_export_csv(request, graph_slug):
     graph = get_object_or_404(Graph, slug=graph_slug)
     converter = CSVConverter(graph=graph)
-    zip_data, zip_name = converter.export()
-    response = HttpResponse(zip_data, content_type='application/zip')
+    zip_name = converter.get_zip_name()
+    response = StreamingHttpResponse(converter.stream_export(),
+                                     content_type='application/zip')
     response['Content-Disposition'] = 'attachment; filename="%s"' % zip_name
     return response
 
 
+def _jsonify_export(export):
+    data = {
+        'id': export.id,
+        'format': export.format,
+        'status': export.task_status,
+        'progress': export.progress,
+        'error': export.task_error,
+        'url': None,
+    }
+    if export.task_status == "Ready":
+        data['url'] = reverse("graph_export_download",
+                              args=[export.graph.slug, export.id])
+    return data
+
+
+@require_POST
+@permission_required("data.view_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_export_async(request, graph_slug, export_format):
+    graph = get_object_or_404(Graph, slug=graph_slug)
+    export = export_graph(graph, export_format)
+    return HttpResponse(json.dumps(_jsonify_export(export)),
+                        content_type='application/json')
+
+
+@permission_required("data.view_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_export_status(request, graph_slug, export_id):
+    export = get_object_or_404(GraphExport, id=export_id,
+                               graph__slug=graph_slug)
+    return HttpResponse(json.dumps(_jsonify_export(export)),
+                        content_type='application/json')
+
+
+@permission_required("data.view_data", (Data, "graph__slug", "graph_slug"),
+                     return_403=True)
+def graph_export_download(request, graph_slug, export_id):
+    export = get_object_or_404(GraphExport, id=export_id,
+                               graph__slug=graph_slug, task_status="Ready")
+    export.data_file.open("rb")
+    response = StreamingHttpResponse(export.data_file.chunks(),
+                                     content_type=export.get_content_type())
+    response['Content-Disposition'] = ('attachment; filename="%s"'
+                                       % export.get_file_name())
+    return response
+
+
 @condition(last_modified_func=graph_last_modified)
 @permission_required("data.view_data", (Data, "graph__slug", "graph_slug"),
                      return_403=True)
@@ -156,16 +261,18 @@ def graph_export_table_csv(request, graph_slug):
                      return_403=True)
 def graph_export_queries_csv(request, graph_slug):
     graph = get_object_or_404(Graph, slug=graph_slug)
-    csv_results = request.session.get('csv_results', None)
-    query_name = request.session.get('query_name', None)
-    headers_formatted = request.session.get('headers_formatted', None)
-    headers_raw = request.session.get('headers_raw', None)
+    snapshot = ResultsSnapshot.get(request.session.get('csv_snapshot', None))
+    if snapshot is None or snapshot.graph_id != graph.id:
+        raise Http404(_("There are no query results to export"))
+    # The rows are read from the snapshot, or spooled into it the first
+    # time, while the response is streamed
+    csv_results = snapshot.rows(graph)
+    query_name = snapshot.query_name
 
     converter = CSVQueryConverter(graph=graph, csv_results=csv_results,
                                   query_name=query_name,
-                                  headers_formatted=headers_formatted,
-                                  headers_raw=headers_raw)
-    query_name = query_name.decode('utf-8')
+                                  headers_formatted=snapshot.headers_formatted,
+                                  headers_raw=snapshot.headers_raw)
     csv_name = query_name + '.csv'
     export_name = graph_slug + '_' + csv_name
 
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import struct
+import time
+import zipfile
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+
+# Structures of the ZIP format, as in the module zipfile
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+LOCAL_HEADER_SIGNATURE = "PK\003\004"
+DATA_DESCRIPTOR = struct.Struct("<4sLLL")
+DATA_DESCRIPTOR64 = struct.Struct("<4sLQQ")
+DATA_DESCRIPTOR_SIGNATURE = "PK\007\010"
+CENTRAL_DIRECTORY = struct.Struct("<4s4B4HL2L5H2L")
+CENTRAL_DIRECTORY_SIGNATURE = "PK\001\002"
+END_ARCHIVE = struct.Struct("<4s4H2LH")
+END_ARCHIVE_SIGNATURE = "PK\005\006"
+END_ARCHIVE64 = struct.Struct("<4sQ2H2L4Q")
+END_ARCHIVE64_SIGNATURE = "PK\006\006"
+END_ARCHIVE64_LOCATOR = struct.Struct("<4sLQL")
+END_ARCHIVE64_LOCATOR_SIGNATURE = "PK\006\007"
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+# Sizes and CRC are written after the data of the file
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+
+class ZipStream(object):
+    """
+    Writer of ZIP archives that yields them in chunks of about "chunk_size"
+    bytes while the content of every file is produced, without seeking back,
+    so they can be sent in a streamed response in constant memory.
+    The sizes and CRC of every file go after its data, and ZIP64 records are
+    added only when the files or the archive are too big.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED,
+                 chunk_size=CHUNK_SIZE):
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self.entries = []
+        self.offset = 0
+
+    def write_iter(self, name, iterable):
+        """
+        Yield the chunks of the file "name" with the strings of "iterable"
+        as content.
+        """
+        if isinstance(name, unicode):
+            name = name.encode("utf-8")
+        date_time = time.localtime(time.time())[:6]
+        dos_date = ((date_time[0] - 1980) << 9 | date_time[1] << 5
+                    | date_time[2])
+        dos_time = (date_time[3] << 11 | date_time[4] << 5
+                    | (date_time[5] // 2))
+        flags = FLAG_DATA_DESCRIPTOR | FLAG_UTF8
+        entry = {
+            "name": name,
+            "flags": flags,
+            "date": dos_date,
+            "time": dos_time,
+            "offset": self.offset,
+        }
+        header = LOCAL_HEADER.pack(
+            LOCAL_HEADER_SIGNATURE, 20, 0, flags, self.compression,
+            dos_time, dos_date, 0, 0, 0, len(name), 0)
+        buffer_ = [header, name]
+        buffer_size = len(header) + len(name)
+        if self.compression == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                          zlib.DEFLATED, -15)
+        else:
+            compressor = None
+        crc = 0
+        size = 0
+        compressed_size = 0
+        for data in iterable:
+            if isinstance(data, unicode):
+                data = data.encode("utf-8")
+            if not data:
+                continue
+            crc = zlib.crc32(data, crc) & 0xFFFFFFFF
+            size += len(data)
+            if compressor:
+                data = compressor.compress(data)
+            compressed_size += len(data)
+            buffer_.append(data)
+            buffer_size += len(data)
+            if buffer_size >= self.chunk_size:
+                yield "".join(buffer_)
+                buffer_ = []
+                buffer_size = 0
+        if compressor:
+            data = compressor.flush()
+            compressed_size += len(data)
+            buffer_.append(data)
+        entry.update({
+            "crc": crc,
+            "size": size,
+            "compressed_size": compressed_size,
+        })
+        if size > ZIP64_LIMIT or compressed_size > ZIP64_LIMIT:
+            descriptor = DATA_DESCRIPTOR64.pack(
+                DATA_DESCRIPTOR_SIGNATURE, crc, compressed_size, size)
+        else:
+            descriptor = DATA_DESCRIPTOR.pack(
+                DATA_DESCRIPTOR_SIGNATURE, crc, compressed_size, size)
+        buffer_.append(descriptor)
+        self.entries.append(entry)
+        self.offset = (entry["offset"] + len(header) + len(name)
+                       + compressed_size + len(descriptor))
+        yield "".join(buffer_)
+
+    def close(self):
+        """
+        Yield the central directory of the archive, after all the files.
+        """
+        chunks = []
+        start = self.offset
+        for entry in self.entries:
+            extra = []
+            size = entry["size"]
+            compressed_size = entry["compressed_size"]
+            offset = entry["offset"]
+            if size > ZIP64_LIMIT or compressed_size > ZIP64_LIMIT:
+                extra.extend([size, compressed_size])
+                size = compressed_size = 0xFFFFFFFF
+            if offset > ZIP64_LIMIT:
+                extra.append(offset)
+                offset = 0xFFFFFFFF
+            if extra:
+                extra_data = struct.pack("<HH" + "Q" * len(extra), 1,
+                                         8 * len(extra), *extra)
+                version = 45
+            else:
+                extra_data = ""
+                version = 20
+            header = CENTRAL_DIRECTORY.pack(
+                CENTRAL_DIRECTORY_SIGNATURE, version, 0, version, 0,
+                entry["flags"], self.compression, entry["time"],
+                entry["date"], entry["crc"], compressed_size, size,
+                len(entry["name"]), len(extra_data), 0, 0, 0, 0, offset)
+            chunks.extend([header, entry["name"], extra_data])
+        directory = "".join(chunks)
+        count = len(self.entries)
+        directory_size = len(directory)
+        directory_offset = start
+        if (count > ZIP_FILECOUNT_LIMIT or directory_offset > ZIP64_LIMIT
+                or directory_size > ZIP64_LIMIT):
+            end64 = END_ARCHIVE64.pack(
+                END_ARCHIVE64_SIGNATURE, 44, 45, 45, 0, 0, count, count,
+                directory_size, directory_offset)
+            locator = END_ARCHIVE64_LOCATOR.pack(
+                END_ARCHIVE64_LOCATOR_SIGNATURE, 0,
+                directory_offset + directory_size, 1)
+            directory += end64 + locator
+            count = min(count, ZIP_FILECOUNT_LIMIT)
+            directory_size = min(directory_size, 0xFFFFFFFF)
+            directory_offset = min(directory_offset, 0xFFFFFFFF)
+        end = END_ARCHIVE.pack(END_ARCHIVE_SIGNATURE, 0, 0, count, count,
+                               directory_size, directory_offset, 0)
+        yield directory + end